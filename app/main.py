@@ -1,11 +1,46 @@
-from fastapi import FastAPI
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import resume, search
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.models import init_db
+from app.routes import resume, search, background
+from app.services.observability import REQUEST_DURATION, configure_logging, render_metrics
+from app.services.llm_telemetry import telemetry
+
+configure_logging()
+
+# Without warm-up the model and the vector index load on the first search
+WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "1") != "0"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize the database at startup, backfill embeddings and warm up the embedding model in the background and start the background workers."""
+    search.search_engine.initialize()
+    init_db()
+    background.background_checker.initialize()
+    search.outbox_sender.start()
+    search.insights_scheduler.start()
+    telemetry.start()
+    # The model loads in a worker thread so the server binds immediately;
+    # /readyz reports 503 until it is done. Either way, resumes stored without
+    # an embedding are backfilled here rather than on the request path.
+    startup = search.search_engine.warm_up if WARM_UP_ON_STARTUP else search.search_engine.verify_database
+    warm_up = asyncio.create_task(asyncio.to_thread(startup))
+    yield
+    if not warm_up.done():
+        warm_up.cancel()
+    search.outbox_sender.stop()
+    search.insights_scheduler.stop()
+    telemetry.stop()
 
 app = FastAPI(
     title="PeopleGPT API",
     description="AI-powered talent acquisition and screening platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 origins = [
@@ -19,12 +54,56 @@ app.add_middleware(
     allow_origins=origins,  # Or use ["*"] for all
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"]
 )
 
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    """Observe every request in the latency histogram, labelled by route template rather than raw path."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
 app.include_router(resume.router, prefix="/api/resume", tags=["resume"])
 app.include_router(search.router, prefix="/api/search", tags=["search"])
+app.include_router(background.router, prefix="/api/background", tags=["background"])
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to PeopleGPT API"}
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint: request and stage latency histograms and cache hit rates."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: the database is initialized, the embedding model is loaded and the vector index is built.
+
+    With WARM_UP_ON_STARTUP=0 only the database is required, since the model and
+    the index are not loaded until the first search; they are still reported.
+    """
+    checks = search.search_engine.readiness()
+    ready = all(checks.values()) if WARM_UP_ON_STARTUP else checks["database"]
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", **checks}
+    )
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional, Dict, Any
-from sqlalchemy import Column, Integer, String, JSON, create_engine
+from sqlalchemy import Column, Float, Integer, String, JSON, Index, create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -18,12 +18,32 @@ class Resume(Base):
     contact = Column(JSON, nullable=True)  # Store as JSON object
     summary = Column(String, nullable=True)
     created_at = Column(String)  # Store timestamp as string
+    # Derived from experience and contact at ingest (see services/profile_fields.py)
+    experience_years = Column(Float, nullable=True)
+    city = Column(String, nullable=True)
+    country = Column(String, nullable=True)
+    # Changes on every write; keys the resume detail cache (see services/detail_cache.py)
+    row_version = Column(Integer, nullable=False, default=1)
 
-# Create database engine and session
+class ResumeSkill(Base):
+    __tablename__ = "resume_skills"
+
+    # One row per (skill, resume); the primary key serves skill lookups
+    skill_canonical = Column(String, primary_key=True)
+    resume_id = Column(Integer, primary_key=True)
+
+    __table_args__ = (
+        Index("ix_resume_skills_resume", "resume_id", "skill_canonical"),
+    )
+
+# Create database engine and session; tables are created by init_db() at startup
 engine = create_engine("sqlite:///./data/resumes.db")
-Base.metadata.create_all(bind=engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def init_db():
+    """Create any missing tables for the SQLAlchemy models."""
+    Base.metadata.create_all(bind=engine)
+
 class ResumeUploadResponse(BaseModel):
     name: str
     skills: List[str]
@@ -32,10 +52,71 @@ class ResumeUploadResponse(BaseModel):
     contact: Optional[Dict[str, str]] = None
     summary: Optional[str] = None
 
+class ResumeUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=1)
+    skills: Optional[List[str]] = None
+    experience: Optional[str] = None
+    education: Optional[str] = None
+    contact: Optional[Dict[str, str]] = None
+    summary: Optional[str] = None
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def reject_null(cls, value):
+        # Fields are optional to allow partial updates, but an explicit null would be stored as is
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
 class SearchQuery(BaseModel):
     query: str
     location: Optional[str] = None
     experience_years: Optional[int] = None
+    rerank: Optional[bool] = Field(None, description="Re-rank with the cross-encoder (default: ENABLE_RERANKER)")
+    latency_budget_ms: Optional[float] = Field(None, gt=0, description="Budget for retrieval plus re-ranking")
+    top_k: int = Field(5, ge=1, le=500, description="Number of ranked results kept for paging")
+    page_size: Optional[int] = Field(None, ge=1, le=100, description="Results per page (default: top_k)")
+    deadline_ms: Optional[float] = Field(None, gt=0, description="End-to-end budget of the request (default: SEARCH_DEADLINE_MS)")
+    defer_analysis: bool = Field(True, description="Finish an analysis that misses the deadline in the background")
+
+class JobRequisitionCreate(BaseModel):
+    title: str = Field(..., min_length=1)
+    required_skills: List[str] = Field(..., min_length=1)
+    openings: int = Field(1, ge=1)
+
+class ShortlistRequest(BaseModel):
+    query: str = Field(..., min_length=1)
+    top_k: int = Field(10, ge=1, le=50)
+    rerank: Optional[bool] = None
+    latency_budget_ms: Optional[float] = Field(None, gt=0)
+    template: str = Field("initial_outreach", pattern="^(initial_outreach|interview_invitation|congratulations|regret)$")
+    include_analysis: bool = Field(False, description="Also stream the RAG analysis of the shortlist")
+
+class CandidateFilters(BaseModel):
+    skills: Optional[List[str]] = None
+    skill_mode: str = Field("any", pattern="^(any|all)$")
+    min_experience: Optional[float] = Field(None, ge=0)
+    max_experience: Optional[float] = Field(None, ge=0)
+    seniority: Optional[str] = Field(None, pattern="^(junior|mid|senior)$")
+    city: Optional[str] = None
+    country: Optional[str] = None
+
+    def filter_args(self) -> Dict[str, Any]:
+        """The filter fields, as keyword arguments for resume_listing.build_filters."""
+        return {name: getattr(self, name) for name in CandidateFilters.model_fields}
+
+class BatchSearchQuery(CandidateFilters):
+    query: str = Field(..., min_length=1)
+    top_k: int = Field(5, ge=1, le=100)
+
+class BatchSearchRequest(BaseModel):
+    queries: List[BatchSearchQuery] = Field(..., min_length=1, max_length=200)
+    include_analysis: bool = False
+
+class SavedSearchCreate(CandidateFilters):
+    name: str = Field(..., min_length=1)
+    query: str = Field(..., min_length=1)
+    threshold: Optional[float] = Field(None, ge=-1, le=1, description="Minimum cosine similarity (default SAVED_SEARCH_THRESHOLD)")
 
 class SearchResult(BaseModel):
     name: str
@@ -46,7 +127,12 @@ class SearchResult(BaseModel):
 
 class SearchResponse(BaseModel):
     matches: List[Dict[str, Any]]
-    analysis: str
+    analysis: Optional[str] = None
+    analysis_status: str = "complete"
+    timings: Dict[str, Any] = {}
+    search_token: Optional[str] = None
+    total: int = 0
+    next_cursor: Optional[int] = None
 
 class ScreeningRequest(BaseModel):
     skill: str
@@ -64,10 +150,30 @@ class EmailRequest(BaseModel):
 class EmailResponse(BaseModel):
     email: str
 
+class OutboxMessage(BaseModel):
+    to: str = Field(..., min_length=3)
+    subject: str = Field(..., min_length=1)
+    body: str = Field(..., min_length=1)
+    resume_id: Optional[int] = None
+
+class BulkEmailRequest(BaseModel):
+    messages: List[OutboxMessage] = Field(..., min_length=1, max_length=1000)
+
+class BulkRenderRequest(BaseModel):
+    resume_ids: List[int] = Field(..., min_length=1, max_length=10000)
+    template: str = Field("initial_outreach", pattern="^(initial_outreach|interview_invitation|congratulations|regret)$")
+    company_name: Optional[str] = None
+    position: Optional[str] = None
+    location: Optional[str] = None
+    format: str = Field("json", pattern="^(json|ndjson)$")
+
 class BackgroundCheckRequest(BaseModel):
     name: str
     location: str
 
 class BackgroundCheckResponse(BaseModel):
     status: str
-    details: str 
\ No newline at end of file
+    details: str
+
+class BatchBackgroundCheckRequest(BaseModel):
+    candidates: List[BackgroundCheckRequest] = Field(..., min_length=1, max_length=1000)
@@ -1,15 +1,21 @@
+import asyncio
 from fastapi import APIRouter, HTTPException
 from app.services.background_check import BackgroundChecker
-from app.models import BackgroundCheckRequest, BackgroundCheckResponse
+from app.services.observability import register_collector, cache_collector
+from app.models import BackgroundCheckRequest, BackgroundCheckResponse, BatchBackgroundCheckRequest
 
 router = APIRouter()
 background_checker = BackgroundChecker()
+register_collector(cache_collector(
+    "background_checks", lambda: (background_checker.cache_hits, background_checker.provider_calls)
+))
 
 @router.post("/check/", response_model=BackgroundCheckResponse)
 async def check_background(request: BackgroundCheckRequest):
     """Perform a background check on a candidate."""
     try:
-        result = background_checker.check(
+        result = await asyncio.to_thread(
+            background_checker.check,
             name=request.name,
             location=request.location
         )
@@ -20,14 +26,34 @@ async def check_background(request: BackgroundCheckRequest):
             detail=f"Error performing background check: {str(e)}"
         )
 
+@router.post("/check/batch")
+async def check_background_batch(request: BatchBackgroundCheckRequest):
+    """Check a whole shortlist; cached results are reused and the rest run concurrently."""
+    try:
+        return await background_checker.check_many(
+            [(candidate.name, candidate.location) for candidate in request.candidates]
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error performing background checks: {str(e)}"
+        )
+
+@router.get("/stats")
+async def background_check_stats():
+    """Cache hit and provider call counters of this worker."""
+    return background_checker.stats()
+
 @router.post("/add-record/")
 async def add_record(name: str, status: str, details: str):
     """Add a record to the mock background check database."""
     try:
         background_checker.add_record(name, status, details)
         return {"message": "Record added successfully"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error adding record: {str(e)}"
-        ) 
\ No newline at end of file
+        )
@@ -1,12 +1,16 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from app.services.resume_parser import ResumeParser
 from app.models import ResumeUploadResponse, SessionLocal
-from app.services.database import store_resume, get_resume, get_all_resumes, search_resumes
+from app.services.database import get_resume, get_all_resumes, search_resumes
+from app.services.observability import get_logger
+from app.routes.search import search_engine
+import asyncio
 import os
 import shutil
 from typing import Optional, List
 import time
 
+logger = get_logger(__name__)
 router = APIRouter()
 resume_parser = ResumeParser()
 
@@ -19,8 +23,13 @@ def get_db():
         db.close()
 
 @router.post("/upload/", response_model=ResumeUploadResponse)
-async def upload_resume(file: UploadFile = File(...), db = Depends(get_db)):
-    """Upload and parse a resume."""
+async def upload_resume(file: UploadFile = File(...)):
+    """Upload and parse a resume.
+
+    The parsed resume is stored through the search engine, so it is embedded,
+    checked for near-duplicates, added to the LSH index and matched against the
+    saved searches at ingest, like every other write.
+    """
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
         
@@ -40,11 +49,9 @@ async def upload_resume(file: UploadFile = File(...), db = Depends(get_db)):
             shutil.copyfileobj(file.file, buffer)
         file.file.close()  # Ensure the uploaded file is closed
         
-        # Parse the resume
-        result = resume_parser.parse_resume_text(file_path)
-        
-        # Store in database
-        store_resume(db, result)
+        # Parse the resume (LLM call) and store it (model encode) off the event loop
+        result = await asyncio.to_thread(resume_parser.parse_resume_text, file_path)
+        await asyncio.to_thread(search_engine.store_resume, {**result, "created_at": str(int(time.time()))})
         
         return result
         
@@ -57,7 +64,7 @@ async def upload_resume(file: UploadFile = File(...), db = Depends(get_db)):
             if os.path.exists(file_path):
                 os.remove(file_path)
         except Exception as e:
-            print(f"Warning: Could not delete temporary file {file_path}: {str(e)}")
+            logger.warning("Could not delete temporary file", extra={"path": file_path, "error": str(e)})
 
 @router.get("/resumes/{resume_id}", response_model=ResumeUploadResponse)
 def get_resume(resume_id: int, db = Depends(get_db)):
@@ -1,21 +1,45 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from app.services.search_engine import SearchEngine
-from app.models import SearchQuery, SearchResponse, SessionLocal
-from typing import List, Dict, Any
+from app.services.resume_listing import parse_fields, fetch_page, iter_resumes, build_filters, iter_rows_by_id
+from app.services.dashboard_aggregates import read_dashboard_metrics, rebuild_aggregates
+from app.services.skill_index import skill_facets
+from app.services.detail_cache import DetailCache, etag_matches
+from app.services.saved_searches import list_saved_searches, get_saved_search, delete_saved_search, read_matches
+from app.services.profile_fields import seniority_level
+from app.services.deadline import Deadline
+from app.services.observability import register_collector, cache_collector, span
+from app.services.talent_insights import (TalentInsightsScheduler, create_requisition, list_requisitions,
+                                          close_requisition, refresh_insights, read_skill_gaps, read_talent_insights)
+from app.services.outbox import OutboxSender, enqueue_messages, get_message, campaign_status
+from app.services.llm_telemetry import telemetry
+from app.models import (SearchQuery, SearchResponse, BatchSearchRequest, SavedSearchCreate, ResumeUpdate,
+                        BulkEmailRequest, BulkRenderRequest, ShortlistRequest, JobRequisitionCreate, SessionLocal)
+from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 import json
 import sqlite3
 from app.services.screening_generator import ScreeningGenerator
 from app.services.email_generator import EmailGenerator
+import asyncio
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import secrets
+import time
 
 router = APIRouter()
 search_engine = SearchEngine()
 screening_generator = ScreeningGenerator()
 email_generator = EmailGenerator()
+detail_cache = DetailCache(maxsize=int(os.getenv("RESUME_DETAIL_CACHE_SIZE", "1024")))
+# LLM calls in flight per shortlist request
+SHORTLIST_CONCURRENCY = int(os.getenv("SHORTLIST_CONCURRENCY", "5"))
+outbox_sender = OutboxSender(search_engine.db_path)
+insights_scheduler = TalentInsightsScheduler(search_engine.db_path)
+register_collector(cache_collector(
+    "search_results", lambda: (search_engine.result_cache.hits, search_engine.result_cache.misses)
+))
+register_collector(cache_collector("resume_detail", lambda: (detail_cache.hits, detail_cache.misses)))
 
 # Dependency to get database session
 def get_db():
@@ -26,56 +50,287 @@ def get_db():
         db.close()
 
 @router.get("/all/", response_model=List[Dict[str, Any]])
-async def get_all_resumes(db: Session = Depends(get_db)):
-    """Get all resumes from the database."""
+async def get_all_resumes(
+    response: Response,
+    cursor: Optional[int] = Query(None, description="Return resumes with an id greater than this cursor"),
+    limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Comma separated list of fields to return"),
+    skills: Optional[List[str]] = Query(None, description="Only return resumes with these skills"),
+    skill_mode: str = Query("any", pattern="^(any|all)$"),
+    min_experience: Optional[float] = Query(None, ge=0, description="Minimum years of experience"),
+    max_experience: Optional[float] = Query(None, ge=0, description="Maximum years of experience (exclusive)"),
+    seniority: Optional[str] = Query(None, pattern="^(junior|mid|senior)$"),
+    city: Optional[str] = None,
+    country: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """Get resumes from the database, paginated by id.
+
+    The cursor for the next page is returned in the `X-Next-Cursor` header. With
+    `format=ndjson` every resume after the cursor is streamed one JSON object per line.
+    """
     try:
-        conn = sqlite3.connect(search_engine.db_path)
-        c = conn.cursor()
-        c.execute("SELECT id, name, skills, experience, education, contact, summary FROM resumes")
-        rows = c.fetchall()
-        conn.close()
-        
-        results = []
-        for row in rows:
-            results.append({
-                "id": row[0],
-                "name": row[1],
-                "skills": json.loads(row[2]),
-                "experience": row[3],
-                "education": row[4],
-                "contact": json.loads(row[5]),
-                "summary": row[6]
-            })
+        selected_fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filters = build_filters(skills, skill_mode, min_experience, max_experience, seniority, city, country)
+
+    if format == "ndjson":
+        rows = iter_resumes(search_engine.db_path, selected_fields, after_id=cursor, filters=filters)
+        return StreamingResponse(
+            (json.dumps(row) + "\n" for row in rows),
+            media_type="application/x-ndjson"
+        )
+
+    try:
+        results, next_cursor = fetch_page(
+            search_engine.db_path, selected_fields, after_id=cursor, limit=limit, filters=filters
+        )
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = str(next_cursor)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving resumes: {str(e)}")
 
+@router.get("/skills/facets", response_model=List[Dict[str, Any]])
+async def get_skill_facets(
+    skills: Optional[List[str]] = Query(None, description="Only count resumes with these skills"),
+    skill_mode: str = Query("any", pattern="^(any|all)$"),
+    limit: int = Query(20, ge=1, le=500)
+):
+    """Count resumes per skill, optionally within the resumes matching a skill filter."""
+    try:
+        conn = sqlite3.connect(search_engine.db_path)
+        facets = skill_facets(conn, skills, skill_mode, limit)
+        conn.close()
+        return facets
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing skill facets: {str(e)}")
+
 @router.post("/search/", response_model=Dict[str, Any])
 async def search_candidates(query: SearchQuery, db: Session = Depends(get_db)):
-    """Search for candidates matching the query using RAG."""
+    """Search for candidates matching the query using RAG.
+
+    The request answers within `deadline_ms`: when the budget runs out the ranked
+    matches are returned with `analysis_status` "skipped" or "pending"; a pending
+    analysis is fetched later from /search/{search_token}/analysis.
+    """
     try:
         if not query.query:
             raise HTTPException(status_code=400, detail="Search query is required")
+        # The clock starts when the request arrives
+        deadline = Deadline.after_ms(query.deadline_ms)
         
-        # Verify database state before searching
-        search_engine.verify_database()
-            
-        results = search_engine.search(
+        results = await asyncio.to_thread(
+            search_engine.search,
             query=query.query,
             location=query.location,
-            experience_years=query.experience_years
+            experience_years=query.experience_years,
+            rerank=query.rerank,
+            latency_budget_ms=query.latency_budget_ms,
+            top_k=query.top_k,
+            page_size=query.page_size,
+            deadline=deadline,
+            defer_analysis=query.defer_analysis
         )
         
         if not results["matches"]:
             return {
                 "matches": [],
-                "analysis": "No matching resumes found for your query."
+                "analysis": "No matching resumes found for your query.",
+                "analysis_status": results.get("analysis_status", "complete"),
+                "timings": results.get("timings", {})
             }
             
-        return results
+        with span("serialize"):
+            return JSONResponse(content=jsonable_encoder(results))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching candidates: {str(e)}")
+
+@router.get("/search/{search_token}", response_model=Dict[str, Any])
+async def get_search_page(
+    search_token: str,
+    cursor: int = Query(0, ge=0, description="Offset into the ranking, from `next_cursor`"),
+    page_size: int = Query(5, ge=1, le=100)
+):
+    """Return another page of a previous search from its cached ranking.
+
+    No scoring or LLM call is made; the token expires after SEARCH_RESULT_TTL_SECONDS.
+    """
+    page = search_engine.search_page(search_token, cursor, page_size)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Search session expired or not found; run the search again")
+    return page
+
+@router.get("/search/{search_token}/analysis", response_model=Dict[str, Any])
+async def get_search_analysis(search_token: str):
+    """Status and text of a search's RAG analysis; poll while `analysis_status` is "pending"."""
+    analysis = search_engine.get_analysis(search_token)
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="Search session expired or not found; run the search again")
+    return {"search_token": search_token, "analysis_status": analysis["status"], "analysis": analysis["analysis"]}
+
+@router.post("/shortlist")
+async def build_shortlist(request: ShortlistRequest):
+    """Search, then generate screening questions and an outreach email for each of the top_k.
+
+    Streams NDJSON events: one `search` event with the ranking, then one
+    `candidate` event per resume as soon as its bundle is ready (completion
+    order, with its `rank`), an `analysis` event when requested, and `done`.
+    A candidate whose bundle failed gets an `error` event with its `rank` and `id`.
+    The per-candidate LLM calls run concurrently, SHORTLIST_CONCURRENCY at a time.
+    """
+    try:
+        results = await asyncio.to_thread(
+            search_engine.search, request.query, rerank=request.rerank,
+            latency_budget_ms=request.latency_budget_ms, top_k=request.top_k, include_analysis=False
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching candidates: {str(e)}")
+    matches = results["matches"]
+    experience_years = {}
+    for _, rows in iter_rows_by_id(search_engine.db_path, [m["id"] for m in matches], ["experience_years"]):
+        experience_years.update({resume_id: years for resume_id, years in rows.values()})
+
+    async def events():
+        started = time.perf_counter()
+        yield json.dumps({
+            "type": "search",
+            "search_token": results.get("search_token"),
+            "total": results.get("total", 0),
+            "ids": [m["id"] for m in matches],
+            "timings": results.get("timings", {})
+        }) + "\n"
+
+        semaphore = asyncio.Semaphore(SHORTLIST_CONCURRENCY)
+
+        async def bundle(rank, match):
+            try:
+                skill, level = _screening_inputs(match["skills"], match["experience"], experience_years.get(match["id"]))
+                async with semaphore:
+                    questions = await asyncio.to_thread(screening_generator.generate_questions, skill=skill, level=level)
+                email = email_generator.generate_email(
+                    name=match["name"],
+                    skill=skill,
+                    template=request.template,
+                    key_skills=", ".join(match["skills"]) if match["skills"] else skill
+                )
+                email["to"] = match["contact"].get("email")
+            except Exception as e:
+                # Events arrive in completion order; say which candidate failed
+                return {"type": "error", "rank": rank, "id": match["id"], "detail": str(e)}
+            return {"type": "candidate", "rank": rank, "candidate": match,
+                    "screening_questions": questions, "email": email}
+
+        async def analysis():
+            text = await asyncio.to_thread(search_engine.generate_answer_with_rag, request.query, matches)
+            return {"type": "analysis", "analysis": text}
+
+        tasks = [asyncio.ensure_future(bundle(rank, match)) for rank, match in enumerate(matches, 1)]
+        if request.include_analysis and matches:
+            tasks.append(asyncio.ensure_future(analysis()))
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    event = await next_done
+                except Exception as e:
+                    event = {"type": "error", "detail": str(e)}
+                yield json.dumps(event) + "\n"
+        finally:
+            # The client went away: stop work that has not started yet
+            for task in tasks:
+                task.cancel()
+        yield json.dumps({
+            "type": "done",
+            "count": len(matches),
+            "elapsed_ms": round(1000 * (time.perf_counter() - started), 2)
+        }) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+def _batch_search(request: BatchSearchRequest) -> Dict[str, Any]:
+    """batch_search over request.queries."""
+    return search_engine.batch_search(
+        [{"query": q.query, "top_k": q.top_k, **q.filter_args()} for q in request.queries],
+        include_analysis=request.include_analysis
+    )
+
+@router.post("/search/batch", response_model=Dict[str, Any])
+async def batch_search_candidates(request: BatchSearchRequest):
+    """Run many searches in one call, e.g. one per open job requisition.
+
+    Returns one `{query, matches}` entry per query, in request order, plus timings.
+    """
+    try:
+        # Encoding and scoring are CPU-bound; keep them off the event loop
+        return await asyncio.to_thread(_batch_search, request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching candidates: {str(e)}")
 
+def _save_search(request: SavedSearchCreate) -> Dict[str, Any]:
+    """save_search for the request, returning the stored saved search."""
+    search_id = search_engine.save_search(
+        request.name, request.query, request.filter_args(), request.threshold
+    )
+    conn = sqlite3.connect(search_engine.db_path)
+    saved = get_saved_search(conn, search_id)
+    conn.close()
+    return saved
+
+@router.post("/saved-searches", response_model=Dict[str, Any])
+async def create_saved_search(request: SavedSearchCreate):
+    """Save a search; resumes stored from now on are matched against it as they arrive."""
+    try:
+        # Encoding the query and matching it against every resume runs under a
+        # write lock; keep both off the event loop
+        return await asyncio.to_thread(_save_search, request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error saving search: {str(e)}")
+
+@router.get("/saved-searches", response_model=List[Dict[str, Any]])
+async def get_saved_searches():
+    """List saved searches with their total and new match counts."""
+    try:
+        conn = sqlite3.connect(search_engine.db_path)
+        searches = list_saved_searches(conn)
+        conn.close()
+        return searches
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing saved searches: {str(e)}")
+
+@router.get("/saved-searches/{search_id}/matches", response_model=List[Dict[str, Any]])
+async def get_saved_search_matches(
+    search_id: int,
+    new_only: bool = Query(False, description="Only matches recorded since the last visit"),
+    mark_seen: bool = Query(False, description="Record this visit so the returned matches stop counting as new"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Matches of a saved search, best first."""
+    try:
+        conn = sqlite3.connect(search_engine.db_path)
+        matches = read_matches(conn, search_id, new_only=new_only, mark_seen=mark_seen, limit=limit)
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading saved search matches: {str(e)}")
+    if matches is None:
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    return matches
+
+@router.delete("/saved-searches/{search_id}")
+async def remove_saved_search(search_id: int):
+    """Delete a saved search and its matches."""
+    try:
+        conn = sqlite3.connect(search_engine.db_path)
+        deleted = delete_saved_search(conn, search_id)
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting saved search: {str(e)}")
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    return {"message": "Saved search deleted"}
+
 @router.get("/resumes/{resume_id}", response_model=Dict[str, Any])
 async def get_resume(resume_id: int, db: Session = Depends(get_db)):
     """Get a specific resume by ID."""
@@ -115,111 +370,85 @@ async def clear_index():
     """Clear the search index."""
     try:
         search_engine.clear_index()
+        detail_cache.clear()
         return {"message": "Search index cleared successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error clearing index: {str(e)}")
 
 @router.get("/resume/{resume_id}", response_model=Dict[str, Any])
-async def get_resume_details(resume_id: int, db: Session = Depends(get_db)):
-    """Get detailed information about a specific resume."""
+async def get_resume_details(resume_id: int, if_none_match: Optional[str] = Header(None)):
+    """Get detailed information about a specific resume.
+
+    Responses carry a strong ETag; a matching If-None-Match gets an empty 304.
+    """
     try:
-        conn = sqlite3.connect(search_engine.db_path)
-        c = conn.cursor()
-        
-        # Get basic resume information
-        c.execute("""
-            SELECT id, name, skills, experience, education, contact, summary, created_at
-            FROM resumes 
-            WHERE id = ?
-        """, (resume_id,))
-        resume = c.fetchone()
-        
-        if not resume:
+        entry = detail_cache.load(search_engine.db_path, resume_id)
+        if entry is None:
             raise HTTPException(status_code=404, detail="Resume not found")
-            
-        # Parse the resume data
-        resume_data = {
-            "id": resume[0],
-            "name": resume[1],
-            "skills": json.loads(resume[2]) if resume[2] else [],
-            "experience": resume[3],
-            "education": resume[4],
-            "contact": json.loads(resume[5]) if resume[5] else {},
-            "summary": resume[6],
-            "created_at": resume[7]
-        }
-        
-        # Extract first name
-        first_name = resume_data["name"].split()[0] if resume_data["name"] else ""
-        
-        # Parse education details
-        education_details = []
-        if resume_data["education"]:
-            # Split education by commas and clean up
-            education_parts = [part.strip() for part in resume_data["education"].split(",")]
-            for part in education_parts:
-                if part:
-                    education_details.append({
-                        "degree": part,
-                        "year": None,  # You might want to extract years if available in the format
-                        "institution": None  # You might want to extract institution if available in the format
-                    })
-        
-        # Extract certifications
-        certifications = []
-        if resume_data["education"]:
-            cert_keywords = ["CPA", "CA", "CMA", "Certified", "Professional", "Associate"]
-            for part in education_parts:
-                if any(keyword in part for keyword in cert_keywords):
-                    certifications.append({
-                        "name": part,
-                        "issuing_organization": None,  # You might want to extract this if available
-                        "year": None  # You might want to extract this if available
-                    })
-        
-        # Structure the response
-        detailed_response = {
-            "basic_info": {
-                "id": resume_data["id"],
-                "first_name": first_name,
-                "full_name": resume_data["name"],
-                "experience_years": resume_data["experience"],
-                "summary": resume_data["summary"]
-            },
-            "contact_info": resume_data["contact"],
-            "skills": resume_data["skills"],
-            "education": {
-                "details": education_details,
-                "certifications": certifications
-            },
-            "work_experience": {
-                "summary": resume_data["experience"],
-                "details": []  # You might want to extract more detailed work experience if available
-            },
-            "created_at": resume_data["created_at"]
-        }
-        
-        conn.close()
-        return detailed_response
+
+        etag, body = entry
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving resume details: {str(e)}")
 
+@router.patch("/resume/{resume_id}", response_model=Dict[str, Any])
+async def update_resume(resume_id: int, update: ResumeUpdate):
+    """Update some fields of one resume, re-embedding it only if its embedded text changed."""
+    changes = update.model_dump(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    try:
+        updated = await asyncio.to_thread(search_engine.update_resume, resume_id, changes)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating resume: {str(e)}")
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    detail_cache.evict(resume_id)
+    return updated
+
+@router.delete("/resume/{resume_id}")
+async def delete_resume(resume_id: int):
+    """Delete one resume and everything derived from it (e.g. for an erasure request)."""
+    try:
+        deleted = await asyncio.to_thread(search_engine.delete_resume, resume_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting resume: {str(e)}")
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    detail_cache.evict(resume_id)
+    return {"message": "Resume deleted"}
+
+def _screening_inputs(skills: List[str], experience: str, experience_years: Optional[float]):
+    """(skill, level) the screening questions of a candidate are generated for."""
+    # Use the top skill or fallback
+    skill = skills[0] if skills else "developer"
+    level = seniority_level(experience_years)
+    if level is None:
+        level = "senior" if experience and "senior" in experience.lower() else "mid"
+    return skill, level
+
 @router.get("/resume/{resume_id}/screening-questions")
 async def get_screening_questions(resume_id: int, db: Session = Depends(get_db)):
     """Generate AI screening questions for a candidate based on their skills and experience."""
     try:
         conn = sqlite3.connect(search_engine.db_path)
         c = conn.cursor()
-        c.execute("SELECT name, skills, experience FROM resumes WHERE id = ?", (resume_id,))
+        c.execute("SELECT name, skills, experience, experience_years FROM resumes WHERE id = ?", (resume_id,))
         row = c.fetchone()
         conn.close()
         if not row:
             raise HTTPException(status_code=404, detail="Resume not found")
-        name, skills_json, experience = row
+        name, skills_json, experience, experience_years = row
         skills = json.loads(skills_json) if skills_json else []
-        # Use the top skill or fallback
-        skill = skills[0] if skills else "developer"
-        questions = screening_generator.generate_questions(skill=skill, level="senior" if experience and ("5" in experience or "senior" in experience.lower()) else "mid")
+        skill, level = _screening_inputs(skills, experience, experience_years)
+        questions = screening_generator.generate_questions(skill=skill, level=level)
         return {"questions": questions}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating screening questions: {str(e)}")
@@ -239,129 +468,132 @@ async def generate_outreach_email(resume_id: int, template: str = "initial_outre
         skills = json.loads(skills_json) if skills_json else []
         skill = skills[0] if skills else "developer"
         key_skills = ", ".join(skills) if skills else skill
-        # You can expand template logic as needed
-        company_name = os.getenv("COMPANY_NAME", "Our Company")
-        position = os.getenv("POSITION_TITLE", "Developer")
-        location = os.getenv("COMPANY_LOCATION", "")
+        # Company, position and location come from the sender config loaded at startup
         email = email_generator.generate_email(
             name=name,
             skill=skill,
-            company_name=company_name,
-            position=position,
             template=template,
-            location=location,
             key_skills=key_skills
         )
         return email
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating outreach email: {str(e)}")
 
+def _render_emails(request: BulkRenderRequest):
+    """Rendered emails for request.resume_ids, in request order, one chunk in memory at a time."""
+    for chunk, rows in iter_rows_by_id(search_engine.db_path, request.resume_ids, ["name", "skills", "contact"]):
+        rendered = {
+            email["resume_id"]: email
+            for email in email_generator.render_batch(
+                rows.values(), request.template, request.company_name, request.position, request.location
+            )
+        }
+        for resume_id in chunk:
+            yield rendered.get(resume_id) or {"resume_id": resume_id, "error": "Resume not found"}
+
+@router.post("/emails/render")
+async def render_bulk_emails(request: BulkRenderRequest):
+    """Render one template for many resumes.
+
+    With `format=ndjson` the emails are streamed one JSON object per line, so a
+    large campaign is never held in memory. Missing resumes yield an `error` entry.
+    """
+    if request.format == "ndjson":
+        return StreamingResponse(
+            (json.dumps(email) + "\n" for email in _render_emails(request)),
+            media_type="application/x-ndjson"
+        )
+    try:
+        return list(_render_emails(request))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rendering emails: {str(e)}")
+
+def _enqueue(messages: List[Dict[str, Any]], campaign_id: Optional[str] = None) -> List[int]:
+    missing = outbox_sender.config.missing()
+    if missing:
+        raise HTTPException(status_code=500, detail="SMTP configuration is incomplete.")
+    conn = sqlite3.connect(search_engine.db_path, timeout=30)
+    try:
+        ids = enqueue_messages(conn, messages, campaign_id)
+        conn.commit()
+    finally:
+        conn.close()
+    outbox_sender.notify()
+    return ids
+
 @router.post("/resume/{resume_id}/send-email")
 async def send_email(resume_id: int, payload: dict):
-    """Send an email to the candidate using SMTP config from .env."""
+    """Queue an email to the candidate; the outbox sender delivers it using SMTP config from .env."""
     to_email = payload.get("to")
     subject = payload.get("subject")
     body = payload.get("body")
     if not (to_email and subject and body):
         raise HTTPException(status_code=400, detail="Missing to, subject, or body.")
-    smtp_host = os.getenv("SMTP_HOST")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_pass = os.getenv("SMTP_PASS")
-    sender_email = os.getenv("SENDER_EMAIL")
-    if not all([smtp_host, smtp_port, smtp_user, smtp_pass, sender_email]):
-        raise HTTPException(status_code=500, detail="SMTP configuration is incomplete.")
     try:
-        msg = MIMEMultipart()
-        msg["From"] = sender_email
-        msg["To"] = to_email
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, "plain"))
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_user, smtp_pass)
-            server.sendmail(sender_email, to_email, msg.as_string())
-        return {"message": "Email sent successfully."}
+        ids = _enqueue([{"to": to_email, "subject": subject, "body": body, "resume_id": resume_id}])
+        return {"message": "Email queued for delivery.", "message_id": ids[0], "status": "queued"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue email: {str(e)}")
+
+@router.post("/emails/bulk")
+async def send_bulk_emails(request: BulkEmailRequest):
+    """Queue a batch of emails as one campaign; poll /emails/campaigns/{campaign_id} for delivery status."""
+    try:
+        campaign_id = secrets.token_hex(8)
+        ids = _enqueue([message.model_dump() for message in request.messages], campaign_id)
+        return {"campaign_id": campaign_id, "queued": len(ids), "message_ids": ids}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue emails: {str(e)}")
+
+@router.get("/emails/campaigns/{campaign_id}")
+async def get_campaign_status(campaign_id: str, limit: int = Query(1000, ge=1, le=10000)):
+    """Delivery status counts and messages of a bulk send."""
+    try:
+        conn = sqlite3.connect(search_engine.db_path)
+        try:
+            status = campaign_status(conn, campaign_id, limit)
+        finally:
+            conn.close()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading campaign status: {str(e)}")
+    if status is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return status
+
+@router.get("/emails/{message_id}")
+async def get_email_status(message_id: int):
+    """Delivery status of one queued email."""
+    try:
+        conn = sqlite3.connect(search_engine.db_path)
+        try:
+            message = get_message(conn, message_id)
+        finally:
+            conn.close()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error reading email status: {str(e)}")
+    if message is None:
+        raise HTTPException(status_code=404, detail="Email not found")
+    return message
+
+@router.get("/email-sender-stats")
+async def email_sender_stats():
+    """Counters of the outbox sender in this worker."""
+    return outbox_sender.stats()
 
 @router.get("/dashboard-metrics")
 async def dashboard_metrics():
     """Return dashboard metrics for the frontend dashboard."""
     try:
         conn = sqlite3.connect(search_engine.db_path)
-        c = conn.cursor()
-        # Total candidates
-        c.execute("SELECT COUNT(*) FROM resumes")
-        total_candidates = c.fetchone()[0] or 0
-        # Average experience (try to parse as float, skip if not possible)
-        c.execute("SELECT experience FROM resumes")
-        experiences = c.fetchall()
-        exp_years = []
-        for row in experiences:
-            try:
-                val = float(row[0].split()[0]) if row[0] else 0
-                exp_years.append(val)
-            except Exception:
-                continue
-        avg_experience = round(sum(exp_years) / len(exp_years), 1) if exp_years else 0
-        # Top location
-        c.execute("SELECT contact FROM resumes")
-        locations = []
-        for row in c.fetchall():
-            try:
-                contact = json.loads(row[0])
-                if contact.get("location"):
-                    locations.append(contact["location"])
-            except Exception:
-                continue
-        top_location = max(set(locations), key=locations.count) if locations else ""
-        # Top skill
-        c.execute("SELECT skills FROM resumes")
-        all_skills = []
-        for row in c.fetchall():
-            try:
-                skills = json.loads(row[0])
-                all_skills.extend(skills)
-            except Exception:
-                continue
-        top_skill = max(set(all_skills), key=all_skills.count) if all_skills else ""
-        # Skill distribution
-        skill_dist = []
-        if all_skills:
-            from collections import Counter
-            skill_counts = Counter(all_skills)
-            total = sum(skill_counts.values())
-            for skill, count in skill_counts.items():
-                skill_dist.append({"name": skill, "value": round(100 * count / total)})
-        # Experience distribution (by years)
-        exp_dist = []
-        if exp_years:
-            from collections import Counter
-            exp_bins = [str(int(y)) for y in exp_years]
-            exp_counts = Counter(exp_bins)
-            for years, count in exp_counts.items():
-                exp_dist.append({"name": f"{years} years", "value": count})
-        # Location distribution
-        loc_dist = []
-        if locations:
-            from collections import Counter
-            loc_counts = Counter(locations)
-            for loc, count in loc_counts.items():
-                loc_dist.append({"name": loc, "value": count})
-        # Skill gaps (dummy for now, can be improved)
-        skill_gaps = []
+        metrics = read_dashboard_metrics(conn)
+        # Precomputed by the talent insights job
+        metrics["skill_gaps"] = read_skill_gaps(conn)
         conn.close()
-        return {
-            "total_candidates": total_candidates,
-            "average_experience": avg_experience,
-            "top_location": top_location,
-            "top_skill": top_skill,
-            "skill_distribution": skill_dist,
-            "experience_distribution": exp_dist,
-            "location_distribution": loc_dist,
-            "skill_gaps": skill_gaps
-        }
+        return metrics
     except Exception as e:
         return {
             "total_candidates": 0,
@@ -373,4 +605,97 @@ async def dashboard_metrics():
             "location_distribution": [],
             "skill_gaps": [],
             "error": str(e)
-        } 
\ No newline at end of file
+        }
+
+@router.get("/talent-insights")
+async def talent_insights():
+    """Talent clusters and per-requisition candidate counts, as of the last insights run."""
+    try:
+        conn = sqlite3.connect(search_engine.db_path)
+        try:
+            return read_talent_insights(conn)
+        finally:
+            conn.close()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading talent insights: {str(e)}")
+
+@router.post("/talent-insights/rebuild")
+async def rebuild_talent_insights():
+    """Recompute talent clusters and skill gaps now."""
+    try:
+        summary = await asyncio.to_thread(refresh_insights, search_engine.db_path, 0, True)
+        return {"message": "Talent insights rebuilt successfully", **summary}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rebuilding talent insights: {str(e)}")
+
+@router.post("/job-requisitions", response_model=Dict[str, Any])
+async def add_job_requisition(request: JobRequisitionCreate):
+    """Save a job requisition; it counts as skill demand from the next insights run."""
+    try:
+        conn = sqlite3.connect(search_engine.db_path)
+        try:
+            requisition_id = create_requisition(conn, request.title, request.required_skills, request.openings)
+            conn.commit()
+        finally:
+            conn.close()
+        return {"id": requisition_id}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error saving job requisition: {str(e)}")
+
+@router.get("/job-requisitions", response_model=List[Dict[str, Any]])
+async def get_job_requisitions():
+    try:
+        conn = sqlite3.connect(search_engine.db_path)
+        try:
+            return list_requisitions(conn)
+        finally:
+            conn.close()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing job requisitions: {str(e)}")
+
+@router.delete("/job-requisitions/{requisition_id}")
+async def remove_job_requisition(requisition_id: int):
+    """Close a job requisition so it no longer counts as demand."""
+    try:
+        conn = sqlite3.connect(search_engine.db_path)
+        try:
+            closed = close_requisition(conn, requisition_id)
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error closing job requisition: {str(e)}")
+    if not closed:
+        raise HTTPException(status_code=404, detail="Open job requisition not found")
+    return {"message": "Job requisition closed"}
+
+@router.get("/embedding-stats")
+async def embedding_stats():
+    """Return batch size and queue latency metrics of the shared embedding service."""
+    try:
+        return search_engine.embedding_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving embedding stats: {str(e)}")
+
+@router.get("/llm-stats")
+async def llm_stats(
+    since_hours: float = Query(24, gt=0, description="Only calls started within this many hours"),
+    feature: Optional[str] = Query(None, description="Only this feature, e.g. parse, rag or screening")
+):
+    """LLM latency percentiles (wall time and time to first token) and token totals per calling feature."""
+    try:
+        return await asyncio.to_thread(telemetry.summary, time.time() - since_hours * 3600, feature)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving LLM stats: {str(e)}")
+
+@router.post("/dashboard-metrics/rebuild")
+async def rebuild_dashboard_metrics():
+    """Recompute the dashboard aggregate tables from the resumes table."""
+    try:
+        conn = sqlite3.connect(search_engine.db_path)
+        rebuild_aggregates(conn)
+        conn.commit()
+        conn.close()
+        return {"message": "Dashboard metrics rebuilt successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rebuilding dashboard metrics: {str(e)}")
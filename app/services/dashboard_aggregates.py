@@ -0,0 +1,183 @@
+"""Incrementally maintained aggregates backing the dashboard metrics endpoint.
+
+Every write to the resumes table applies its delta to these tables in the same
+transaction, so reading the dashboard is a handful of small indexed queries
+instead of a scan over every resume.
+
+Rebuild from scratch with:
+
+    python -m app.services.dashboard_aggregates [--db data/resumes.db]
+"""
+import argparse
+import json
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional
+from .migrations import run_once
+
+AGGREGATE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS agg_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_candidates INTEGER NOT NULL DEFAULT 0,
+        experience_sum REAL NOT NULL DEFAULT 0,
+        experience_count INTEGER NOT NULL DEFAULT 0,
+        skill_mentions INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS agg_skill_counts (
+        skill TEXT PRIMARY KEY,
+        count INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_agg_skill_counts_count ON agg_skill_counts (count)",
+    """
+    CREATE TABLE IF NOT EXISTS agg_location_counts (
+        location TEXT PRIMARY KEY,
+        count INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_agg_location_counts_count ON agg_location_counts (count)",
+    """
+    CREATE TABLE IF NOT EXISTS agg_experience_histogram (
+        years INTEGER PRIMARY KEY,
+        count INTEGER NOT NULL
+    )
+    """,
+]
+
+
+def init_aggregates(conn) -> None:
+    """Create the aggregate tables and backfill them from existing resumes once."""
+    c = conn.cursor()
+    for statement in AGGREGATE_SCHEMA:
+        c.execute(statement)
+    run_once(conn, "backfill_dashboard_aggregates", rebuild_aggregates)
+
+
+def _load_json(value, default):
+    if isinstance(value, str):
+        try:
+            return json.loads(value) if value else default
+        except json.JSONDecodeError:
+            return default
+    return value if value is not None else default
+
+
+def _upsert_counts(c, table: str, key: str, values: Iterable, sign: int) -> None:
+    for value in values:
+        c.execute(f"""
+            INSERT INTO {table} ({key}, count) VALUES (?, ?)
+            ON CONFLICT({key}) DO UPDATE SET count = count + excluded.count
+        """, (value, sign))
+    if sign < 0:
+        c.execute(f"DELETE FROM {table} WHERE count <= 0")
+
+
+def apply_resume(c, skills, years: Optional[float], location: Optional[str], sign: int = 1) -> None:
+    """Add (sign=1) or remove (sign=-1) one resume's contribution to the aggregates.
+
+    `years` and `location` are the derived experience_years and city columns.
+    """
+    skills = set(s for s in _load_json(skills, []) if s)
+
+    c.execute("""
+        INSERT INTO agg_totals (id, total_candidates, experience_sum, experience_count, skill_mentions)
+        VALUES (1, 0, 0, 0, 0)
+        ON CONFLICT(id) DO NOTHING
+    """)
+    c.execute("""
+        UPDATE agg_totals
+        SET total_candidates = total_candidates + ?,
+            experience_sum = experience_sum + ?,
+            experience_count = experience_count + ?,
+            skill_mentions = skill_mentions + ?
+        WHERE id = 1
+    """, (
+        sign,
+        sign * years if years is not None else 0,
+        sign if years is not None else 0,
+        sign * len(skills)
+    ))
+
+    _upsert_counts(c, "agg_skill_counts", "skill", sorted(skills), sign)
+    if location:
+        _upsert_counts(c, "agg_location_counts", "location", [location], sign)
+    if years is not None:
+        _upsert_counts(c, "agg_experience_histogram", "years", [int(years)], sign)
+
+
+def apply_resume_by_id(c, resume_id: int, sign: int = 1) -> None:
+    """Apply the aggregates delta for a resume row that is currently in the table."""
+    c.execute("SELECT skills, experience_years, city FROM resumes WHERE id = ?", (resume_id,))
+    row = c.fetchone()
+    if row:
+        apply_resume(c, row[0], row[1], row[2], sign)
+
+
+def rebuild_aggregates(conn) -> None:
+    """Recompute all aggregates from the resumes table in a single pass."""
+    c = conn.cursor()
+    for table in ("agg_totals", "agg_skill_counts", "agg_location_counts", "agg_experience_histogram"):
+        c.execute(f"DELETE FROM {table}")
+    c.execute("""
+        INSERT INTO agg_totals (id, total_candidates, experience_sum, experience_count, skill_mentions)
+        VALUES (1, 0, 0, 0, 0)
+    """)
+    rows = conn.cursor()
+    rows.execute("SELECT skills, experience_years, city FROM resumes")
+    for skills, years, city in rows:
+        apply_resume(c, skills, years, city, 1)
+
+
+def read_dashboard_metrics(conn) -> Dict[str, Any]:
+    """Read the dashboard metrics from the aggregate tables."""
+    c = conn.cursor()
+    c.execute("""
+        SELECT total_candidates, experience_sum, experience_count, skill_mentions
+        FROM agg_totals WHERE id = 1
+    """)
+    totals = c.fetchone() or (0, 0, 0, 0)
+    total_candidates, experience_sum, experience_count, skill_mentions = totals
+
+    c.execute("SELECT skill, count FROM agg_skill_counts ORDER BY count DESC, skill")
+    skill_counts = c.fetchall()
+    c.execute("SELECT location, count FROM agg_location_counts ORDER BY count DESC, location")
+    location_counts = c.fetchall()
+    c.execute("SELECT years, count FROM agg_experience_histogram ORDER BY years")
+    experience_counts = c.fetchall()
+
+    skill_dist: List[Dict[str, Any]] = []
+    if skill_mentions:
+        skill_dist = [
+            {"name": skill, "value": round(100 * count / skill_mentions)}
+            for skill, count in skill_counts
+        ]
+
+    return {
+        "total_candidates": total_candidates,
+        "average_experience": round(experience_sum / experience_count, 1) if experience_count else 0,
+        "top_location": location_counts[0][0] if location_counts else "",
+        "top_skill": skill_counts[0][0] if skill_counts else "",
+        "skill_distribution": skill_dist,
+        "experience_distribution": [
+            {"name": f"{years} years", "value": count} for years, count in experience_counts
+        ],
+        "location_distribution": [
+            {"name": location, "value": count} for location, count in location_counts
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the dashboard aggregate tables.")
+    parser.add_argument("--db", default="data/resumes.db", help="Path to the resumes SQLite database")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    for statement in AGGREGATE_SCHEMA:
+        conn.execute(statement)
+    rebuild_aggregates(conn)
+    conn.commit()
+    conn.close()
+    print(f"Dashboard aggregates rebuilt for {args.db}")
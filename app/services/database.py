@@ -1,9 +1,16 @@
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from app.models import Resume
+from app.models import Resume, ResumeSkill
+from app.services.dashboard_aggregates import apply_resume_by_id
+from app.services.profile_fields import derive_profile_fields
+from app.services.detail_cache import new_row_version
+from app.services.skill_index import canonical_skill, canonical_skills, index_resume_skills
 import time
 
 def store_resume(db: Session, resume_data: dict) -> Resume:
     """Store parsed resume data in the database."""
+    # Raw DB-API cursor on the session's connection, so derived tables share its transaction
+    cursor = db.connection().connection.cursor()
     db_resume = Resume(
         name=resume_data["name"],
         skills=resume_data["skills"],
@@ -11,10 +18,16 @@ def store_resume(db: Session, resume_data: dict) -> Resume:
         education=resume_data.get("education"),
         contact=resume_data.get("contact"),
         summary=resume_data.get("summary"),
-        created_at=str(int(time.time()))
+        created_at=str(int(time.time())),
+        row_version=new_row_version(cursor),
+        **derive_profile_fields(resume_data["experience"], resume_data.get("contact"))
     )
     
     db.add(db_resume)
+    db.flush()
+    # Update the dashboard aggregates and skill index in the same transaction as the insert
+    apply_resume_by_id(cursor, db_resume.id)
+    index_resume_skills(cursor, db_resume.id, resume_data["skills"])
     db.commit()
     db.refresh(db_resume)
     return db_resume
@@ -29,8 +42,21 @@ def get_all_resumes(db: Session, skip: int = 0, limit: int = 100):
 
 def search_resumes(db: Session, query: str):
     """Search resumes by name, skills, or summary."""
+    skill_matches = select(ResumeSkill.resume_id).where(
+        ResumeSkill.skill_canonical == canonical_skill(query)
+    )
     return db.query(Resume).filter(
         (Resume.name.ilike(f"%{query}%")) |
-        (Resume.skills.cast(String).ilike(f"%{query}%")) |
+        (Resume.id.in_(skill_matches)) |
         (Resume.summary.ilike(f"%{query}%"))
-    ).all() 
\ No newline at end of file
+    ).all()
+
+def search_resumes_by_skills(db: Session, skills: list, mode: str = "any"):
+    """Search resumes having any or all of the given skills."""
+    skills = canonical_skills(skills)
+    matches = select(ResumeSkill.resume_id).where(ResumeSkill.skill_canonical.in_(skills))
+    if mode == "all":
+        matches = matches.group_by(ResumeSkill.resume_id).having(
+            func.count(ResumeSkill.skill_canonical) == len(skills)
+        )
+    return db.query(Resume).filter(Resume.id.in_(matches)).all() 
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""Per-request latency deadlines for the search pipeline.
+
+A Deadline is created when a search request arrives and passed down through
+every stage (query encoding, retrieval, re-ranking, RAG analysis). A stage that
+makes a blocking call bounds it by what is left of the budget; a stage that
+would start after the budget is spent is skipped, so the request returns the
+ranked matches instead of waiting on a slow dependency.
+
+Configuration (environment):
+    SEARCH_DEADLINE_MS      default end-to-end budget of a search request (default 8000)
+    SEARCH_ANALYSIS_MIN_MS  budget that must be left to start the analysis inline (default 250)
+    SEARCH_DEFERRED_ANALYSIS_MS
+                            time a deferred analysis may take in the background (default 60000)
+"""
+import os
+import time
+from typing import Optional
+
+
+def default_deadline_ms() -> float:
+    return float(os.getenv("SEARCH_DEADLINE_MS", "8000"))
+
+
+def analysis_min_seconds() -> float:
+    return float(os.getenv("SEARCH_ANALYSIS_MIN_MS", "250")) / 1000
+
+
+def deferred_analysis_seconds() -> float:
+    return float(os.getenv("SEARCH_DEFERRED_ANALYSIS_MS", "60000")) / 1000
+
+
+class Deadline:
+    """An absolute point in time (monotonic clock) by which a request must answer."""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def after_ms(cls, milliseconds: Optional[float] = None) -> "Deadline":
+        """Deadline `milliseconds` from now (default SEARCH_DEADLINE_MS)."""
+        return cls((default_deadline_ms() if milliseconds is None else milliseconds) / 1000)
+
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
@@ -0,0 +1,268 @@
+"""Near-duplicate resume detection with locality-sensitive hashing.
+
+Every resume gets two signatures:
+
+- a SimHash of its embedding (signs of 128 fixed random projections), cut
+  into 8 bands of 16 bits; resumes whose embeddings are within a few degrees
+  of each other share a band with high probability;
+- a MinHash of the word 3-shingles of its text (64 hash functions), cut into
+  16 bands of 4 values; resumes whose texts have a high Jaccard similarity
+  share a band with high probability.
+
+Each band value is a row in lsh_buckets, so the candidates of a new resume are
+the rows sharing any of its 24 buckets: an index lookup per band, independent
+of corpus size. Candidates are then verified exactly (embedding cosine and
+estimated Jaccard) before a resume is treated as a duplicate.
+
+A duplicate is flagged with `duplicate_of` (the id of the earliest copy) and
+left out of search results, or, with DEDUP_MODE=merge, written over the copy it
+duplicates instead of being inserted. Run the batch job over the existing
+corpus with:
+
+    python -m app.services.dedup [--db data/resumes.db] [--dry-run]
+
+Configuration (environment):
+    DEDUP_MODE               flag (default), merge or off
+    DEDUP_COSINE_THRESHOLD   minimum embedding cosine of a duplicate (default 0.92)
+    DEDUP_JACCARD_THRESHOLD  minimum estimated shingle Jaccard of a duplicate (default 0.6)
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .migrations import run_once
+
+SIMHASH_BANDS, SIMHASH_BAND_BITS = 8, 16
+MINHASH_BANDS, MINHASH_ROWS = 16, 4
+MINHASH_PERMUTATIONS = MINHASH_BANDS * MINHASH_ROWS
+# MinHash bands are numbered after the SimHash ones in lsh_buckets.band
+MINHASH_BAND_OFFSET = 100
+SHINGLE_SIZE = 3
+MAX_CANDIDATES = 200
+
+_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_rng = np.random.default_rng(20240521)
+_MINHASH_A = _rng.integers(1, 2 ** 32 - 1, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_MINHASH_B = _rng.integers(0, 2 ** 32 - 1, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_planes: Dict[int, np.ndarray] = {}
+
+DEDUP_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS lsh_buckets (
+        band INTEGER NOT NULL,
+        key INTEGER NOT NULL,
+        resume_id INTEGER NOT NULL,
+        PRIMARY KEY (band, key, resume_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_lsh_buckets_resume ON lsh_buckets (resume_id)",
+]
+
+DEDUP_COLUMNS = {
+    "duplicate_of": "INTEGER",
+    "minhash": "BLOB",
+}
+
+
+def dedup_mode() -> str:
+    return os.getenv("DEDUP_MODE", "flag")
+
+
+def init_dedup(conn) -> None:
+    """Create the LSH table and columns, and index the existing resumes once."""
+    c = conn.cursor()
+    c.execute("PRAGMA table_info(resumes)")
+    existing = {row[1] for row in c.fetchall()}
+    for column, column_type in DEDUP_COLUMNS.items():
+        if column not in existing:
+            c.execute(f"ALTER TABLE resumes ADD COLUMN {column} {column_type}")
+    c.execute("CREATE INDEX IF NOT EXISTS ix_resumes_duplicate_of ON resumes (duplicate_of)")
+    for statement in DEDUP_SCHEMA:
+        c.execute(statement)
+    run_once(conn, "backfill_lsh_buckets", lambda conn: rebuild_lsh_index(conn, flag=False))
+
+
+# -- signatures -------------------------------------------------------------
+
+def _hyperplanes(dim: int) -> np.ndarray:
+    if dim not in _planes:
+        _planes[dim] = np.random.default_rng(dim).standard_normal(
+            (SIMHASH_BANDS * SIMHASH_BAND_BITS, dim)
+        ).astype(np.float32)
+    return _planes[dim]
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """MinHash of the word shingles of `text` (uint64, one value per permutation)."""
+    words = re.findall(r"\w+", text.lower())
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))}
+    hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles if s], dtype=np.uint64)
+    if not len(hashes):
+        return np.full(MINHASH_PERMUTATIONS, _PRIME, dtype=np.uint64)
+    return ((np.outer(_MINHASH_A, hashes) + _MINHASH_B[:, None]) % _PRIME).min(axis=1)
+
+
+def _band_key(values: np.ndarray) -> int:
+    return int.from_bytes(hashlib.blake2b(values.tobytes(), digest_size=8).digest(), "big", signed=True)
+
+
+def bucket_keys(embedding: Sequence[float], minhash: np.ndarray) -> List[Tuple[int, int]]:
+    """(band, key) of every LSH bucket a resume falls in."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    bits = (_hyperplanes(len(vector)) @ vector) > 0
+    keys = []
+    for band in range(SIMHASH_BANDS):
+        chunk = bits[band * SIMHASH_BAND_BITS:(band + 1) * SIMHASH_BAND_BITS]
+        keys.append((band, int(np.packbits(chunk).view(">u2")[0])))
+    for band in range(MINHASH_BANDS):
+        keys.append((MINHASH_BAND_OFFSET + band, _band_key(minhash[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS])))
+    return keys
+
+
+# -- lookup and indexing ----------------------------------------------------
+
+def _cosine(a, b) -> float:
+    a, b = np.asarray(a, dtype=np.float32), np.asarray(b, dtype=np.float32)
+    norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(a @ b) / norm if norm else 0.0
+
+
+def find_duplicate(c, embedding: Sequence[float], minhash: np.ndarray, exclude: Optional[int] = None,
+                   before: Optional[int] = None) -> Optional[Tuple[int, float, float]]:
+    """Best verified near-duplicate among the resumes sharing an LSH bucket.
+
+    Returns (canonical id, cosine, estimated Jaccard) or None. Only resumes with
+    an id below `before` are considered when it is given (used by the batch job
+    so the earliest copy wins). The canonical id follows `duplicate_of`.
+    """
+    keys = bucket_keys(embedding, minhash)
+    clause = " OR ".join(["(band = ? AND key = ?)"] * len(keys))
+    params = [part for key in keys for part in key]
+    extra = ""
+    if exclude is not None:
+        extra += " AND resume_id != ?"
+        params.append(exclude)
+    if before is not None:
+        extra += " AND resume_id < ?"
+        params.append(before)
+    c.execute(f"""
+        SELECT resume_id, COUNT(*) AS shared FROM lsh_buckets
+        WHERE ({clause}){extra}
+        GROUP BY resume_id
+        ORDER BY shared DESC
+        LIMIT ?
+    """, params + [MAX_CANDIDATES])
+    candidates = [row[0] for row in c.fetchall()]
+    if not candidates:
+        return None
+
+    cosine_threshold = float(os.getenv("DEDUP_COSINE_THRESHOLD", "0.92"))
+    jaccard_threshold = float(os.getenv("DEDUP_JACCARD_THRESHOLD", "0.6"))
+    c.execute(f"""
+        SELECT id, embedding, minhash, duplicate_of FROM resumes
+        WHERE id IN ({','.join(['?'] * len(candidates))}) AND minhash IS NOT NULL
+    """, candidates)
+    best = None
+    for resume_id, other_embedding, other_minhash, duplicate_of in c.fetchall():
+        if not other_embedding:
+            continue
+        jaccard = float(np.mean(np.frombuffer(other_minhash, dtype=np.uint64) == minhash))
+        if jaccard < jaccard_threshold:
+            continue
+        cosine = _cosine(embedding, json.loads(other_embedding))
+        if cosine < cosine_threshold:
+            continue
+        if best is None or (cosine, jaccard) > best[1:]:
+            best = (duplicate_of or resume_id, cosine, jaccard)
+    return best
+
+
+def index_resume(c, resume_id: int, embedding: Sequence[float], minhash: np.ndarray) -> None:
+    """Store a resume's MinHash and replace its LSH bucket rows."""
+    c.execute("UPDATE resumes SET minhash = ? WHERE id = ?", (minhash.tobytes(), resume_id))
+    c.execute("DELETE FROM lsh_buckets WHERE resume_id = ?", (resume_id,))
+    c.executemany(
+        "INSERT OR IGNORE INTO lsh_buckets (band, key, resume_id) VALUES (?, ?, ?)",
+        [(band, key, resume_id) for band, key in bucket_keys(embedding, minhash)]
+    )
+
+
+def forget_resume(c, resume_id: int) -> None:
+    """Drop a deleted resume from the LSH index; its duplicates elect the earliest of them as canonical."""
+    c.execute("DELETE FROM lsh_buckets WHERE resume_id = ?", (resume_id,))
+    c.execute("SELECT MIN(id) FROM resumes WHERE duplicate_of = ?", (resume_id,))
+    successor = c.fetchone()[0]
+    if successor is not None:
+        c.execute("UPDATE resumes SET duplicate_of = NULL WHERE id = ?", (successor,))
+        c.execute("UPDATE resumes SET duplicate_of = ? WHERE duplicate_of = ?", (successor, resume_id))
+
+
+def _resume_text(row: tuple) -> str:
+    # Imported here: search_engine imports this module
+    from .search_engine import embedding_text
+    summary, skills, experience, education, contact = row
+    return embedding_text({
+        "summary": summary,
+        "skills": json.loads(skills) if skills else [],
+        "experience": experience,
+        "education": education,
+        "contact": json.loads(contact) if contact else {},
+    })
+
+
+def rebuild_lsh_index(conn, flag: bool = True) -> Dict[str, Any]:
+    """Re-index every resume in id order and, with `flag`, mark near-duplicates of earlier resumes.
+
+    Flags are recomputed from scratch, so a resume that no longer duplicates
+    anything is unflagged. Returns the number of resumes indexed and the
+    (duplicate, canonical) pairs found. The caller commits (or rolls back).
+    """
+    c = conn.cursor()
+    c.execute("DELETE FROM lsh_buckets")
+    c.execute("""
+        SELECT id, summary, skills, experience, education, contact, embedding FROM resumes
+        WHERE embedding IS NOT NULL AND embedding != ''
+        ORDER BY id
+    """)
+    rows = c.fetchall()
+    pairs = []
+    for resume_id, summary, skills, experience, education, contact, embedding in rows:
+        embedding = json.loads(embedding)
+        minhash = minhash_signature(_resume_text((summary, skills, experience, education, contact)))
+        if flag:
+            duplicate = find_duplicate(c, embedding, minhash, before=resume_id)
+            canonical = duplicate[0] if duplicate else None
+            if canonical is not None:
+                pairs.append((resume_id, canonical))
+            c.execute("UPDATE resumes SET duplicate_of = ? WHERE id = ?", (canonical, resume_id))
+        index_resume(c, resume_id, embedding, minhash)
+    return {"indexed": len(rows), "duplicates": pairs}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find and flag near-duplicate resumes.")
+    parser.add_argument("--db", default="data/resumes.db")
+    parser.add_argument("--dry-run", action="store_true", help="report duplicates without changing the database")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        init_dedup(conn)
+        result = rebuild_lsh_index(conn, flag=True)
+        if args.dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    finally:
+        conn.close()
+    print(f"Indexed {result['indexed']} resumes, {len(result['duplicates'])} near-duplicates"
+          f"{' (dry run)' if args.dry_run else ''}")
+    for duplicate, canonical in result["duplicates"]:
+        print(f"  {duplicate} -> {canonical}")
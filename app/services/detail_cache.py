@@ -0,0 +1,185 @@
+"""Read-through cache of serialized resume detail documents.
+
+Entries are keyed by (resume id, row_version). `row_version` is rewritten with a
+fresh value from a database sequence on every write to a resume row, so a stale
+entry can never be served: a changed row simply misses and the old entry ages
+out of the LRU. Each entry holds the rendered JSON body and its strong ETag, so
+a hit skips both the full row fetch and the JSON decode/encode work.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+CERT_KEYWORDS = ["CPA", "CA", "CMA", "Certified", "Professional", "Associate"]
+
+
+def new_row_version(c) -> int:
+    """Allocate the next resumes.row_version inside the caller's write transaction.
+
+    SQLite holds the write lock from the sequence update until commit, so versions
+    are handed out in commit order; readers can poll `row_version > last seen`
+    without missing rows (see SearchEngine._sync_index).
+    """
+    c.execute("UPDATE resume_version_seq SET value = value + 1 WHERE id = 1")
+    c.execute("SELECT value FROM resume_version_seq WHERE id = 1")
+    return c.fetchone()[0]
+
+
+def init_row_version(conn) -> None:
+    """Add the row_version column, its index and the version sequence."""
+    c = conn.cursor()
+    c.execute("PRAGMA table_info(resumes)")
+    if "row_version" not in {row[1] for row in c.fetchall()}:
+        c.execute("ALTER TABLE resumes ADD COLUMN row_version INTEGER NOT NULL DEFAULT 1")
+    c.execute("CREATE INDEX IF NOT EXISTS ix_resumes_row_version ON resumes (row_version)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS resume_version_seq (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            value INTEGER NOT NULL
+        )
+    """)
+    c.execute("""
+        INSERT OR IGNORE INTO resume_version_seq (id, value)
+        SELECT 1, COALESCE(MAX(row_version), 1) FROM resumes
+    """)
+
+
+def build_resume_details(row: tuple) -> Dict[str, Any]:
+    """Build the detail document for a (id, name, skills, experience, education, contact, summary, created_at) row."""
+    resume_id, name, skills, experience, education, contact, summary, created_at = row
+    skills = json.loads(skills) if skills else []
+    contact = json.loads(contact) if contact else {}
+
+    # Extract first name
+    first_name = name.split()[0] if name else ""
+
+    # Parse education details and certifications from the comma separated education field
+    education_details = []
+    certifications = []
+    if education:
+        education_parts = [part.strip() for part in education.split(",")]
+        for part in education_parts:
+            if part:
+                education_details.append({
+                    "degree": part,
+                    "year": None,
+                    "institution": None
+                })
+            if any(keyword in part for keyword in CERT_KEYWORDS):
+                certifications.append({
+                    "name": part,
+                    "issuing_organization": None,
+                    "year": None
+                })
+
+    return {
+        "basic_info": {
+            "id": resume_id,
+            "first_name": first_name,
+            "full_name": name,
+            "experience_years": experience,
+            "summary": summary
+        },
+        "contact_info": contact,
+        "skills": skills,
+        "education": {
+            "details": education_details,
+            "certifications": certifications
+        },
+        "work_experience": {
+            "summary": experience,
+            "details": []
+        },
+        "created_at": created_at
+    }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, as RFC 9110 requires)."""
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class DetailCache:
+    """Bounded, thread-safe LRU of rendered resume detail documents."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[int, int]) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple[int, int], entry: Tuple[str, bytes]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def evict(self, resume_id: int) -> None:
+        """Drop every cached version of one resume (after an update or delete)."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == resume_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def load(self, db_path: str, resume_id: int) -> Optional[Tuple[str, bytes]]:
+        """Return (etag, json body) for a resume, or None if it does not exist.
+
+        A hit costs a single primary key lookup of row_version; only a miss reads
+        and decodes the full row.
+        """
+        conn = sqlite3.connect(db_path)
+        try:
+            c = conn.cursor()
+            c.execute("SELECT row_version FROM resumes WHERE id = ?", (resume_id,))
+            version = c.fetchone()
+            if not version:
+                return None
+            entry = self.get((resume_id, version[0]))
+            if entry is not None:
+                return entry
+
+            c.execute("""
+                SELECT id, name, skills, experience, education, contact, summary, created_at, row_version
+                FROM resumes
+                WHERE id = ?
+            """, (resume_id,))
+            row = c.fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+
+        # Key by the version read alongside the row, in case it changed since the probe
+        body = json.dumps(build_resume_details(row[:-1])).encode("utf-8")
+        entry = (f'"{hashlib.sha1(body).hexdigest()}"', body)
+        self.put((resume_id, row[-1]), entry)
+        return entry
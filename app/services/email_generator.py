@@ -1,4 +1,7 @@
+import json
 import os
+from string import Formatter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 EMAIL_TEMPLATES = {
     "congratulations": {
@@ -19,36 +22,86 @@ EMAIL_TEMPLATES = {
     }
 }
 
+class CompiledTemplate:
+    """A format string parsed once into literal text and field names.
+
+    Rendering joins the pieces with the values instead of re-parsing the format
+    string for every email.
+    """
+
+    def __init__(self, source: str):
+        self.pieces: List[Tuple[str, Optional[str]]] = [
+            (literal, field) for literal, field, _, _ in Formatter().parse(source)
+        ]
+
+    def render(self, values: Dict[str, str]) -> str:
+        parts = []
+        for literal, field in self.pieces:
+            parts.append(literal)
+            if field is not None:
+                parts.append(str(values[field]))
+        return "".join(parts)
+
+
+COMPILED_TEMPLATES = {
+    name: {"subject": CompiledTemplate(t["subject"]), "body": CompiledTemplate(t["body"])}
+    for name, t in EMAIL_TEMPLATES.items()
+}
+
+
+class SenderConfig:
+    """Company and sender details used in every email, read from the environment once."""
+
+    def __init__(self):
+        self.company_name = os.getenv("COMPANY_NAME", "Our Company")
+        self.job_title = os.getenv("POSITION_TITLE", "Developer")
+        self.your_name = os.getenv("YOUR_NAME", "AI Recruiter")
+        self.your_position = os.getenv("YOUR_POSITION", "Recruiter")
+        self.email_signature = os.getenv("EMAIL_SIGNATURE", "PeopleGPT")
+        self.location = os.getenv("COMPANY_LOCATION", "")
+
+    def values(self, company_name: str = None, position: str = None, location: str = None) -> Dict[str, str]:
+        """Template values shared by every email of one batch."""
+        return {
+            "company_name": company_name or self.company_name,
+            "job_title": position or self.job_title,
+            "location": location or self.location,
+            "your_name": self.your_name,
+            "your_position": self.your_position,
+            "email_signature": self.email_signature,
+        }
+
+
 class EmailGenerator:
+    def __init__(self, config: Optional[SenderConfig] = None):
+        self.config = config or SenderConfig()
+
     def generate_email(self, name: str, skill: str, company_name: str = None, position: str = None, template: str = "initial_outreach", location: str = "", key_skills: str = "") -> dict:
         """Generate a personalized outreach email using a template."""
-        company_name = company_name or os.getenv("COMPANY_NAME", "Our Company")
-        job_title = position or os.getenv("POSITION_TITLE", "Developer")
-        your_name = os.getenv("YOUR_NAME", "AI Recruiter")
-        your_position = os.getenv("YOUR_POSITION", "Recruiter")
-        email_signature = os.getenv("EMAIL_SIGNATURE", "PeopleGPT")
-        location = location or os.getenv("COMPANY_LOCATION", "")
-        key_skills = key_skills or skill
-        candidate_name = name
-        t = EMAIL_TEMPLATES.get(template, EMAIL_TEMPLATES["initial_outreach"])
-        subject = t["subject"].format(
-            candidate_name=candidate_name,
-            company_name=company_name,
-            job_title=job_title,
-            key_skills=key_skills,
-            location=location,
-            your_name=your_name,
-            your_position=your_position,
-            email_signature=email_signature
-        )
-        body = t["body"].format(
-            candidate_name=candidate_name,
-            company_name=company_name,
-            job_title=job_title,
-            key_skills=key_skills,
-            location=location,
-            your_name=your_name,
-            your_position=your_position,
-            email_signature=email_signature
-        )
-        return {"subject": subject, "body": body} 
\ No newline at end of file
+        values = self.config.values(company_name, position, location)
+        values["candidate_name"] = name
+        values["key_skills"] = key_skills or skill
+        t = COMPILED_TEMPLATES.get(template, COMPILED_TEMPLATES["initial_outreach"])
+        return {"subject": t["subject"].render(values), "body": t["body"].render(values)}
+
+    def render_batch(self, rows: Iterable[tuple], template: str = "initial_outreach", company_name: str = None,
+                     position: str = None, location: str = None) -> Iterator[Dict[str, Any]]:
+        """Render one template for (id, name, skills JSON, contact JSON) resume rows.
+
+        The shared values are resolved once for the whole batch; per row only the
+        candidate name, skills and recipient change.
+        """
+        t = COMPILED_TEMPLATES.get(template, COMPILED_TEMPLATES["initial_outreach"])
+        shared = self.config.values(company_name, position, location)
+        for resume_id, name, skills_json, contact_json in rows:
+            skills = json.loads(skills_json) if skills_json else []
+            contact = json.loads(contact_json) if contact_json else {}
+            values = dict(shared)
+            values["candidate_name"] = name
+            values["key_skills"] = ", ".join(skills) if skills else "developer"
+            yield {
+                "resume_id": resume_id,
+                "to": contact.get("email"),
+                "subject": t["subject"].render(values),
+                "body": t["body"].render(values),
+            }
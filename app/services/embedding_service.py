@@ -0,0 +1,300 @@
+"""Shared embedding service with dynamic micro-batching.
+
+One process loads the embedding model and serves every app worker over a local
+socket. Concurrent requests are collected into micro-batches (up to
+EMBEDDING_MAX_BATCH_SIZE texts, waiting at most EMBEDDING_MAX_WAIT_MS for the
+batch to fill) and encoded with a single `encode` call.
+
+Run the service with:
+
+    python -m app.services.embedding_service --address /tmp/peoplegpt-embed.sock
+
+and point the app at it with EMBEDDING_SERVICE_ADDRESS set to the same address.
+Addresses are either a Unix socket path or host:port. Both sides must share
+EMBEDDING_SERVICE_AUTHKEY; there is no default, because messages are pickled
+and anyone holding the key can run code in the service and its clients.
+Generate one with e.g. `python -c "import secrets; print(secrets.token_hex(32))"`.
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from .observability import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_ADDRESS = "/tmp/peoplegpt-embed.sock"
+
+
+def parse_address(address: str):
+    """Turn "host:port" into a TCP address tuple; anything else is a Unix socket path."""
+    if address.startswith("unix:"):
+        return address[len("unix:"):]
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and not address.startswith("/"):
+        return (host or "127.0.0.1", int(port))
+    return address
+
+
+def _authkey() -> bytes:
+    authkey = os.getenv("EMBEDDING_SERVICE_AUTHKEY")
+    if not authkey:
+        raise ValueError("EMBEDDING_SERVICE_AUTHKEY not configured in environment")
+    return authkey.encode("utf-8")
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class BatchStats:
+    """Batch size and queue latency metrics of the embedding service."""
+
+    def __init__(self, window: int = 2048):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+        self.requests = 0
+        self.encode_seconds = 0.0
+        self.batch_size_histogram: Dict[int, int] = {}
+        self._queue_latencies = deque(maxlen=window)
+
+    def record(self, batch_size: int, queue_latencies: List[float], encode_seconds: float) -> None:
+        # Histogram buckets are powers of two: 1, 2, 4, 8, ...
+        bucket = 1
+        while bucket < batch_size:
+            bucket *= 2
+        with self._lock:
+            self.batches += 1
+            self.texts += batch_size
+            self.requests += len(queue_latencies)
+            self.encode_seconds += encode_seconds
+            self.batch_size_histogram[bucket] = self.batch_size_histogram.get(bucket, 0) + 1
+            self._queue_latencies.extend(queue_latencies)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies_ms = [latency * 1000 for latency in self._queue_latencies]
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "texts": self.texts,
+                "mean_batch_size": round(self.texts / self.batches, 2) if self.batches else 0,
+                "batch_size_histogram": {str(k): v for k, v in sorted(self.batch_size_histogram.items())},
+                "mean_encode_ms": round(1000 * self.encode_seconds / self.batches, 2) if self.batches else 0,
+                "queue_latency_ms": {
+                    "p50": round(_percentile(latencies_ms, 50), 2),
+                    "p95": round(_percentile(latencies_ms, 95), 2),
+                    "p99": round(_percentile(latencies_ms, 99), 2),
+                },
+            }
+
+
+class _PendingRequest:
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result: Optional[np.ndarray] = None
+        self.error: Optional[str] = None
+
+
+class EmbeddingServer:
+    """Serves encode requests from many clients through one micro-batching encoder thread."""
+
+    def __init__(self, encoder, address: str = DEFAULT_ADDRESS, max_batch_size: int = 64,
+                 max_wait_ms: float = 5.0):
+        self.encoder = encoder
+        self.address = parse_address(address)
+        self._authkey = _authkey()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.stats = BatchStats()
+        self._queue: "queue.Queue[_PendingRequest]" = queue.Queue()
+
+    def serve_forever(self) -> None:
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            # Remove a socket left behind by a previous run
+            os.remove(self.address)
+        threading.Thread(target=self._batch_loop, name="embedding-batcher", daemon=True).start()
+        with Listener(self.address, authkey=self._authkey) as listener:
+            logger.info("Embedding service listening", extra={
+                "address": str(self.address), "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000
+            })
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception:
+                    logger.exception("Error accepting embedding client")
+                    continue
+                threading.Thread(target=self._handle_client, args=(conn,), daemon=True).start()
+
+    def _handle_client(self, conn) -> None:
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+                op = message.get("op")
+                if op == "encode":
+                    pending = _PendingRequest(list(message["texts"]))
+                    self._queue.put(pending)
+                    pending.done.wait()
+                    if pending.error is not None:
+                        conn.send({"error": pending.error})
+                    else:
+                        conn.send({"embeddings": pending.result})
+                elif op == "stats":
+                    conn.send({"stats": self.stats.snapshot()})
+                else:
+                    conn.send({"error": f"Unknown operation: {op}"})
+
+    def _collect_batch(self) -> List[_PendingRequest]:
+        """Block for the first request, then gather more until the batch is full or the wait window ends."""
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            size += len(pending.texts)
+        return batch
+
+    def _batch_loop(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            texts = [text for pending in batch for text in pending.texts]
+            started = time.perf_counter()
+            try:
+                vectors = np.asarray(self.encoder.encode(texts, batch_size=len(texts)), dtype=np.float32)
+                offset = 0
+                for pending in batch:
+                    pending.result = vectors[offset:offset + len(pending.texts)]
+                    offset += len(pending.texts)
+            except Exception as e:
+                logger.exception("Error encoding batch", extra={"texts": len(texts)})
+                for pending in batch:
+                    pending.error = str(e)
+            encode_seconds = time.perf_counter() - started
+            self.stats.record(
+                batch_size=len(texts),
+                queue_latencies=[started - pending.enqueued_at for pending in batch],
+                encode_seconds=encode_seconds
+            )
+            for pending in batch:
+                pending.done.set()
+
+
+class EmbeddingClient:
+    """Drop-in replacement for SentenceTransformer.encode backed by the embedding service.
+
+    Connections are pooled so concurrent threads of one app worker issue concurrent
+    requests, which is what lets the service batch them.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, connect_retries: int = 20,
+                 retry_delay: float = 0.5):
+        self.address = parse_address(address)
+        self._authkey = _authkey()
+        self.connect_retries = connect_retries
+        self.retry_delay = retry_delay
+        self._pool: "queue.LifoQueue" = queue.LifoQueue()
+
+    def _connect(self):
+        for attempt in range(self.connect_retries):
+            try:
+                return Client(self.address, authkey=self._authkey)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if attempt == self.connect_retries - 1:
+                    raise
+                time.sleep(self.retry_delay)
+
+    @staticmethod
+    def _exchange(conn, message: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        conn.send(message)
+        if timeout is not None and not conn.poll(timeout):
+            # The reply would arrive on a connection nobody reads; drop it
+            conn.close()
+            raise TimeoutError(f"Embedding service did not answer within {timeout:.3f}s")
+        return conn.recv()
+
+    def _request(self, message: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        started = time.monotonic()
+        try:
+            response = self._exchange(conn, message, timeout)
+        except TimeoutError:
+            raise
+        except (EOFError, OSError):
+            # The service restarted; retry once on a fresh connection
+            conn.close()
+            conn = self._connect()
+            if timeout is not None:
+                timeout = max(0.0, timeout - (time.monotonic() - started))
+            response = self._exchange(conn, message, timeout)
+        self._pool.put(conn)
+        if "error" in response:
+            raise RuntimeError(f"Embedding service error: {response['error']}")
+        return response
+
+    def encode(self, texts: Union[str, List[str]], normalize_embeddings: bool = False,
+               timeout: Optional[float] = None, **kwargs) -> np.ndarray:
+        """Encode through the service; raises TimeoutError if no reply comes within `timeout` seconds."""
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        if not batch:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = self._request({"op": "encode", "texts": batch}, timeout)["embeddings"]
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        return vectors[0] if single else vectors
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch size and queue latency metrics reported by the service."""
+        return self._request({"op": "stats"})["stats"]
+
+
+if __name__ == "__main__":
+    from .embeddings import load_local_encoder
+
+    parser = argparse.ArgumentParser(description="Run the shared embedding service.")
+    parser.add_argument("--address", default=os.getenv("EMBEDDING_SERVICE_ADDRESS", DEFAULT_ADDRESS),
+                        help="Unix socket path or host:port to listen on")
+    parser.add_argument("--max-batch-size", type=int,
+                        default=int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64")))
+    parser.add_argument("--max-wait-ms", type=float,
+                        default=float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5")))
+    args = parser.parse_args()
+
+    _authkey()  # fail before spending time on loading the model
+    encoder = load_local_encoder()
+    encoder.encode("warm up")
+    EmbeddingServer(
+        encoder,
+        address=args.address,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms
+    ).serve_forever()
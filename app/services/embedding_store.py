@@ -0,0 +1,332 @@
+"""Memory-mapped embedding store shared by every worker process on a host.
+
+With `--workers N` each process used to decode and hold its own copy of every
+embedding. The store keeps them on disk instead, and every worker maps the same
+files read-only, so the pages are shared through the OS page cache:
+
+    CURRENT                  name of the live generation, swapped atomically
+    gen-000042.ids.npy       resume ids of the generation (int64)
+    gen-000042.vectors.npy   L2-normalized float32 embeddings, one row per id
+    gen-000042.meta.json     dimension, row count and the row_version it covers
+    gen-000042.log           append log of later upserts and deletes
+    LOCK                     flock()ed by writers
+
+Writes after a generation was built are appended to its log as fixed-size
+records. Any worker can append: it takes the lock and copies the resumes (and
+tombstones) whose row_version is newer than the store's; a marker record (id
+-1, no vector) carries the database version the scan covered when rows without
+an embedding moved it past the last real record. Readers need no lock,
+because they only consume complete records. When the log grows past
+EMBEDDING_STORE_COMPACT_RECORDS the writer folds it into a new generation and
+swaps CURRENT with os.replace(). Workers notice the new name on their next
+refresh and remap, without restarting.
+
+Enable it for the search engine with EMBEDDING_STORE_DIR (e.g. data/embeddings).
+Inspect or compact it with:
+
+    python -m app.services.embedding_store status|compact [--dir DIR] [--db data/resumes.db]
+"""
+import argparse
+import fcntl
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .observability import get_logger
+from .tombstones import tombstones_since
+from .vector_index import load_embeddings, normalize
+
+logger = get_logger(__name__)
+
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "LOCK"
+MARKER_ID = -1  # log record that only advances row_version
+
+
+def _log_dtype(dim: int) -> np.dtype:
+    return np.dtype([
+        ("id", "<i8"),
+        ("row_version", "<i8"),
+        ("deleted", "<i8"),
+        ("vector", "<f4", (dim,)),
+    ])
+
+
+def _db_version(conn) -> int:
+    """Highest row_version written to the resumes database, deletes included."""
+    c = conn.cursor()
+    c.execute("""
+        SELECT MAX(COALESCE((SELECT MAX(row_version) FROM resumes), 0),
+                   COALESCE((SELECT MAX(row_version) FROM resume_tombstones), 0))
+    """)
+    return c.fetchone()[0]
+
+
+class EmbeddingStore:
+    """One process's view of the shared store: the mapped generation plus the log replayed on top."""
+
+    def __init__(self, directory: str, compact_records: int = 5000):
+        self.directory = directory
+        self.compact_records = compact_records
+        self.generation: Optional[str] = None
+        self.dim: Optional[int] = None
+        self.row_version = 0
+        self.base_ids = np.empty(0, dtype=np.int64)
+        self.base_vectors = np.zeros((0, 0), dtype=np.float32)
+        self.log_records = 0
+        self._base_slots: Dict[int, int] = {}
+        self._log_offset = 0
+        # Log replay state: latest vector per id, base ids shadowed by the log,
+        # and the ids touched by each replayed record, in log order
+        self.overlay: Dict[int, np.ndarray] = {}
+        self.shadowed: set = set()
+        self.changes: List[int] = []
+
+    @classmethod
+    def from_env(cls) -> Optional["EmbeddingStore"]:
+        directory = os.getenv("EMBEDDING_STORE_DIR")
+        if not directory:
+            return None
+        return cls(directory, compact_records=int(os.getenv("EMBEDDING_STORE_COMPACT_RECORDS", "5000")))
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(LOCK_FILE), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _current_generation(self) -> Optional[str]:
+        try:
+            with open(self._path(CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    # -- reading ------------------------------------------------------------
+
+    def refresh(self) -> None:
+        """Map a new generation if CURRENT moved, then replay new complete log records.
+
+        Consumers compare `generation` with what they built from (a change means
+        rebuild from base_ids/base_vectors plus the overlay) and otherwise apply
+        the ids appended to `changes` since they last looked.
+        """
+        generation = self._current_generation()
+        if generation is not None and generation != self.generation:
+            self._map(generation)
+        if self.generation is None:
+            return
+
+        dtype = _log_dtype(self.dim)
+        log_path = self._path(f"{self.generation}.log")
+        size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+        count = (size - self._log_offset) // dtype.itemsize
+        if count <= 0:
+            return
+        with open(log_path, "rb") as f:
+            f.seek(self._log_offset)
+            records = np.frombuffer(f.read(count * dtype.itemsize), dtype=dtype)
+        self._log_offset += count * dtype.itemsize
+        self.log_records += count
+        for record in records:
+            self.row_version = max(self.row_version, int(record["row_version"]))
+            resume_id = int(record["id"])
+            if resume_id == MARKER_ID:
+                continue
+            if resume_id in self._base_slots:
+                self.shadowed.add(resume_id)
+            if record["deleted"]:
+                self.overlay.pop(resume_id, None)
+            else:
+                self.overlay[resume_id] = record["vector"]
+            self.changes.append(resume_id)
+
+    def _map(self, generation: str) -> None:
+        with open(self._path(f"{generation}.meta.json")) as f:
+            meta = json.load(f)
+        self.generation = generation
+        self.dim = meta["dim"]
+        self.row_version = meta["row_version"]
+        self.base_ids = np.load(self._path(f"{generation}.ids.npy"), mmap_mode="r")
+        self.base_vectors = np.load(self._path(f"{generation}.vectors.npy"), mmap_mode="r")
+        self._base_slots = {int(i): row for row, i in enumerate(self.base_ids)}
+        self._log_offset = 0
+        self.log_records = 0
+        self.overlay = {}
+        self.shadowed = set()
+        self.changes = []
+
+    def get(self, ids: Sequence[int]) -> Dict[int, np.ndarray]:
+        """Current vectors of the given ids (deleted or unknown ids are left out)."""
+        found = {}
+        for resume_id in ids:
+            resume_id = int(resume_id)
+            if resume_id in self.overlay:
+                found[resume_id] = self.overlay[resume_id]
+            elif resume_id not in self.shadowed and resume_id in self._base_slots:
+                found[resume_id] = self.base_vectors[self._base_slots[resume_id]]
+        return found
+
+    # -- writing ------------------------------------------------------------
+
+    def sync_from_db(self, db_path: str) -> None:
+        """Bring the store up to date with the resumes database.
+
+        Creates the first generation if there is none, appends newer rows and
+        tombstones to the log, and compacts when the log is long.
+        """
+        self.refresh()
+        conn = sqlite3.connect(db_path)
+        try:
+            if self.generation is not None and _db_version(conn) <= self.row_version:
+                return
+            with self._locked():
+                # Another worker may have written (or swapped) in the meantime
+                self.refresh()
+                if self.generation is None:
+                    self._write_generation(*self._snapshot_from_db(conn, db_path))
+                elif not self._append_changes(conn):
+                    # Tombstones the log needs were pruned; rebuild from the table
+                    self._write_generation(*self._snapshot_from_db(conn, db_path))
+                else:
+                    self.refresh()
+                    if self.log_records >= self.compact_records:
+                        self._compact()
+                self.refresh()
+        finally:
+            conn.close()
+
+    def _snapshot_from_db(self, conn, db_path: str) -> Tuple[List[int], np.ndarray, int]:
+        # Read the version first: rows committed after it are re-applied from the log
+        version = _db_version(conn)
+        ids, vectors = load_embeddings(db_path)
+        return ids, normalize(vectors) if ids else vectors, version
+
+    def _append_changes(self, conn) -> bool:
+        """Log the rows and deletes newer than the store; False if the deletes are no longer all known."""
+        c = conn.cursor()
+        # Read first: rows committed later get larger versions and are picked up next time
+        scanned = _db_version(conn)
+        deletes = tombstones_since(c, self.row_version)
+        if deletes is None:
+            return False
+        c.execute("""
+            SELECT id, embedding, row_version FROM resumes
+            WHERE row_version > ? AND embedding IS NOT NULL AND embedding != ''
+        """, (self.row_version,))
+        rows = c.fetchall()
+        entries = sorted(
+            [(version, resume_id, embedding) for resume_id, embedding, version in rows]
+            + [(version, resume_id, None) for resume_id, version in deletes]
+        )
+        if scanned > max([entry[0] for entry in entries], default=self.row_version):
+            # Rows without an embedding advanced the database; record how far this scan got
+            # so the next sync does not take the lock again for them
+            entries.append((scanned, MARKER_ID, None))
+        if not entries:
+            return True
+
+        records = np.zeros(len(entries), dtype=_log_dtype(self.dim))
+        for record, (version, resume_id, embedding) in zip(records, entries):
+            record["id"] = resume_id
+            record["row_version"] = version
+            if embedding is None:
+                record["deleted"] = 1
+            else:
+                record["vector"] = normalize(np.array([json.loads(embedding)], dtype=np.float32))[0]
+        with open(self._path(f"{self.generation}.log"), "ab") as f:
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        return True
+
+    def _live_rows(self) -> Tuple[List[int], np.ndarray]:
+        keep = [row for row, i in enumerate(self.base_ids) if int(i) not in self.shadowed]
+        ids = [int(self.base_ids[row]) for row in keep] + list(self.overlay)
+        parts = [np.asarray(self.base_vectors[keep], dtype=np.float32)]
+        if self.overlay:
+            parts.append(np.stack(list(self.overlay.values())))
+        vectors = np.concatenate(parts) if ids else np.zeros((0, self.dim or 0), dtype=np.float32)
+        return ids, vectors
+
+    def _compact(self) -> None:
+        """Fold the log into a new generation. Caller holds the lock."""
+        ids, vectors = self._live_rows()
+        self._write_generation(ids, vectors, self.row_version)
+
+    def compact(self) -> None:
+        with self._locked():
+            self.refresh()
+            if self.generation is not None:
+                self._compact()
+            self.refresh()
+
+    def _write_generation(self, ids: List[int], vectors: np.ndarray, version: int) -> None:
+        """Write a complete generation of normalized vectors and swap CURRENT to it."""
+        number = int(self.generation.split("-")[1]) + 1 if self.generation else 1
+        generation = f"gen-{number:06d}"
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dim = vectors.shape[1] if len(ids) else (self.dim or 0)
+        if not dim:
+            # Nothing to size the log records by yet; wait for the first embedding
+            return
+
+        for suffix, array in (("ids", np.asarray(ids, dtype=np.int64)), ("vectors", vectors.reshape(len(ids), dim))):
+            with open(self._path(f"{generation}.{suffix}.npy"), "wb") as f:
+                np.save(f, array)
+                f.flush()
+                os.fsync(f.fileno())
+        with open(self._path(f"{generation}.meta.json"), "w") as f:
+            json.dump({"dim": dim, "count": len(ids), "row_version": version}, f)
+        open(self._path(f"{generation}.log"), "ab").close()
+
+        tmp = self._path(f"{CURRENT_FILE}.tmp")
+        with open(tmp, "w") as f:
+            f.write(generation)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(CURRENT_FILE))
+        logger.info("Embedding store switched generation", extra={"generation": generation, "vectors": len(ids)})
+        self._remove_old_generations(keep={generation, self.generation})
+
+    def _remove_old_generations(self, keep: set) -> None:
+        # Workers still mapping a removed generation keep reading it: unlinking
+        # does not invalidate existing mappings
+        for name in os.listdir(self.directory):
+            if name.startswith("gen-") and name.split(".")[0] not in keep:
+                os.remove(self._path(name))
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "directory": self.directory,
+            "generation": self.generation,
+            "dim": self.dim,
+            "base_vectors": len(self.base_ids),
+            "log_records": self.log_records,
+            "row_version": self.row_version,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or compact the shared embedding store.")
+    parser.add_argument("command", choices=["status", "compact"])
+    parser.add_argument("--dir", default=os.getenv("EMBEDDING_STORE_DIR", os.path.join("data", "embeddings")))
+    parser.add_argument("--db", default="data/resumes.db")
+    args = parser.parse_args()
+
+    store = EmbeddingStore(args.dir)
+    store.sync_from_db(args.db)
+    if args.command == "compact":
+        store.compact()
+    print(json.dumps(store.status(), indent=2))
@@ -0,0 +1,48 @@
+"""Selection of the text encoder used by SearchEngine.
+
+Everything that needs embeddings goes through an object with the
+SentenceTransformer-style `encode(texts)` method: a single string gives a 1-D
+vector, a list of strings gives a 2-D array.
+
+Configuration (environment):
+    EMBEDDING_SERVICE_ADDRESS  use the shared embedding service at this address
+                               instead of loading a model in this process
+    EMBEDDING_BACKEND          "torch" (default) or "onnx" for the int8 ONNX
+                               Runtime model (see onnx_embedder.py)
+    ONNX_MODEL_DIR             directory of the exported ONNX model
+"""
+import os
+from typing import Optional
+
+from .observability import get_logger
+
+logger = get_logger(__name__)
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def load_local_encoder(backend: Optional[str] = None):
+    """Load the embedding model into the current process with the configured backend."""
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "torch")
+    if backend == "onnx":
+        from .onnx_embedder import DEFAULT_MODEL_DIR, OnnxEmbedder
+        model_dir = os.getenv("ONNX_MODEL_DIR", DEFAULT_MODEL_DIR)
+        logger.info("Loading int8 ONNX embedding model", extra={"model_dir": model_dir})
+        return OnnxEmbedder(model_dir)
+    if backend != "torch":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+
+    # Imported here so importing the app does not pull in torch
+    from sentence_transformers import SentenceTransformer
+    logger.info("Loading embedding model", extra={"model": MODEL_NAME})
+    return SentenceTransformer(MODEL_NAME)
+
+
+def load_encoder():
+    """Return the encoder for this process: a client of the embedding service if one is configured."""
+    address = os.getenv("EMBEDDING_SERVICE_ADDRESS")
+    if address:
+        from .embedding_service import EmbeddingClient
+        logger.info("Using embedding service", extra={"address": address})
+        return EmbeddingClient(address)
+    return load_local_encoder()
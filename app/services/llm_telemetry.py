@@ -0,0 +1,204 @@
+"""Per-call telemetry of LLM requests: latency, time to first token and tokens, by feature.
+
+call_groq records every call (successful or not) with the feature that made it
+("parse", "rag", "screening", ...). Recording is an append to a bounded
+in-memory ring buffer, so it adds no I/O to the request. A flusher thread
+writes the buffer to the llm_calls table every few seconds with one
+executemany; if the buffer fills faster than that, the oldest records are
+dropped and counted. The summary endpoint flushes first, so it sees every call
+made by this worker.
+
+Configuration (environment):
+    LLM_TELEMETRY_BUFFER_SIZE        records kept in memory between flushes (default 10000)
+    LLM_TELEMETRY_FLUSH_SECONDS      flush interval (default 5)
+    LLM_TELEMETRY_RETENTION_DAYS     rows older than this are deleted (default 30)
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from .observability import STAGE_DURATION, get_logger
+
+logger = get_logger(__name__)
+
+LLM_TELEMETRY_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS llm_calls (
+        id INTEGER PRIMARY KEY,
+        feature TEXT NOT NULL,
+        model TEXT NOT NULL,
+        started_at REAL NOT NULL,
+        wall_ms REAL NOT NULL,
+        ttft_ms REAL,
+        prompt_tokens INTEGER,
+        completion_tokens INTEGER,
+        status TEXT NOT NULL,
+        user TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_llm_calls_feature_started ON llm_calls (feature, started_at)",
+]
+
+
+def init_llm_telemetry(conn) -> None:
+    c = conn.cursor()
+    for statement in LLM_TELEMETRY_SCHEMA:
+        c.execute(statement)
+
+
+def _percentile(ordered: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 2)
+
+
+class LLMTelemetry:
+    """Ring buffer of LLM call records and the thread that flushes it to SQLite."""
+
+    def __init__(self, db_path: str = "data/resumes.db", capacity: Optional[int] = None,
+                 interval: Optional[float] = None):
+        self.db_path = db_path
+        self.capacity = capacity or int(os.getenv("LLM_TELEMETRY_BUFFER_SIZE", "10000"))
+        self.interval = interval if interval is not None else float(os.getenv("LLM_TELEMETRY_FLUSH_SECONDS", "5"))
+        self.retention = float(os.getenv("LLM_TELEMETRY_RETENTION_DAYS", "30")) * 86400
+        self._buffer: deque = deque(maxlen=self.capacity)
+        # Records of a failed flush, oldest first, written ahead of the buffer next time
+        self._retry: list = []
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.recorded = 0
+        self.dropped = 0
+
+    def record(self, feature: str, model: str, started_at: float, wall_seconds: float,
+               ttft_seconds: Optional[float] = None, prompt_tokens: Optional[int] = None,
+               completion_tokens: Optional[int] = None, status: str = "ok", user: Optional[str] = None) -> None:
+        """Buffer one call. Cheap enough for the request path: a tuple append, no I/O."""
+        if len(self._buffer) == self.capacity:
+            self.dropped += 1
+        self._buffer.append((
+            feature, model, started_at, round(1000 * wall_seconds, 2),
+            None if ttft_seconds is None else round(1000 * ttft_seconds, 2),
+            prompt_tokens, completion_tokens, status, None if user is None else str(user)
+        ))
+        self.recorded += 1
+        STAGE_DURATION.observe(wall_seconds, stage="llm")
+
+    def flush(self) -> int:
+        """Write the buffered records; returns how many were written."""
+        with self._flush_lock:
+            rows, self._retry = self._retry, []
+            while self._buffer:
+                rows.append(self._buffer.popleft())
+            if not rows:
+                return 0
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                conn.executemany("""
+                    INSERT INTO llm_calls (feature, model, started_at, wall_ms, ttft_ms,
+                                           prompt_tokens, completion_tokens, status, user)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                conn.commit()
+            except sqlite3.Error:
+                # Retry on the next flush, keeping the newest `capacity` records
+                self._retry = rows[-self.capacity:]
+                self.dropped += len(rows) - len(self._retry)
+                raise
+            finally:
+                conn.close()
+            return len(rows)
+
+    def prune(self) -> None:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("DELETE FROM llm_calls WHERE started_at < ?", (time.time() - self.retention,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def summary(self, since: Optional[float] = None, feature: Optional[str] = None) -> Dict[str, Any]:
+        """Latency percentiles and token totals per feature, for calls started after `since` (epoch seconds)."""
+        self.flush()
+        since = since or 0
+        conn = sqlite3.connect(self.db_path)
+        try:
+            c = conn.cursor()
+            where, params = "started_at >= ?", [since]
+            if feature:
+                where += " AND feature = ?"
+                params.append(feature)
+            c.execute(f"""
+                SELECT feature, COUNT(*), SUM(status != 'ok'), SUM(prompt_tokens), SUM(completion_tokens),
+                       GROUP_CONCAT(DISTINCT model)
+                FROM llm_calls WHERE {where}
+                GROUP BY feature ORDER BY feature
+            """, params)
+            totals = c.fetchall()
+            features = {}
+            for name, calls, errors, prompt_tokens, completion_tokens, models in totals:
+                c.execute(f"SELECT wall_ms FROM llm_calls WHERE {where} AND feature = ? ORDER BY wall_ms",
+                          params + [name])
+                wall = [row[0] for row in c.fetchall()]
+                c.execute(f"""
+                    SELECT ttft_ms FROM llm_calls
+                    WHERE {where} AND feature = ? AND ttft_ms IS NOT NULL ORDER BY ttft_ms
+                """, params + [name])
+                ttft = [row[0] for row in c.fetchall()]
+                features[name] = {
+                    "calls": calls,
+                    "errors": errors or 0,
+                    "models": models.split(",") if models else [],
+                    "latency_ms": {"p50": _percentile(wall, 50), "p95": _percentile(wall, 95),
+                                   "p99": _percentile(wall, 99)},
+                    "ttft_ms": {"p50": _percentile(ttft, 50), "p95": _percentile(ttft, 95),
+                                "p99": _percentile(ttft, 99), "streamed_calls": len(ttft)},
+                    "prompt_tokens": prompt_tokens or 0,
+                    "completion_tokens": completion_tokens or 0,
+                    "total_tokens": (prompt_tokens or 0) + (completion_tokens or 0),
+                }
+        finally:
+            conn.close()
+        return {"since": since, "features": features, "buffer": self.stats()}
+
+    def stats(self) -> Dict[str, int]:
+        return {"recorded": self.recorded, "dropped": self.dropped, "pending": len(self._buffer) + len(self._retry),
+                "capacity": self.capacity}
+
+    # -- flusher ------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="llm-telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        try:
+            self.flush()
+        except sqlite3.Error:
+            logger.exception("Could not flush LLM telemetry")
+
+    def _run(self) -> None:
+        last_prune = 0.0
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+                if time.monotonic() - last_prune > 3600:
+                    self.prune()
+                    last_prune = time.monotonic()
+            except sqlite3.Error:
+                logger.exception("Could not flush LLM telemetry")
+
+
+telemetry = LLMTelemetry()
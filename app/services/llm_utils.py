@@ -1,41 +1,78 @@
 import os
+import time
 from groq import Groq
 from dotenv import load_dotenv
+from .llm_telemetry import telemetry
 
 load_dotenv()
 
+MODEL = "llama-3.3-70b-versatile"
+
 def clean_json_response(response):
     # Placeholder: implement any cleaning needed
     return response
 
-def track_token_usage(user, model, input_tokens, output_tokens):
-    # Placeholder: implement tracking if needed
-    pass
+def _complete_streamed(client, **request):
+    """Stream a completion; returns (text, usage or None, seconds to the first content token)."""
+    started = time.perf_counter()
+    first_token = None
+    parts = []
+    usage = None
+    for chunk in client.chat.completions.create(stream=True, **request):
+        if chunk.choices and chunk.choices[0].delta.content:
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            parts.append(chunk.choices[0].delta.content)
+        # Groq reports usage on the last chunk
+        x_groq = getattr(chunk, "x_groq", None)
+        if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+            usage = x_groq.usage
+    return "".join(parts), usage, first_token
+
+def call_groq(prompt: str, user=None, temperature: float = 0.7, max_tokens: int = 1000,
+              timeout: float = None, feature: str = "other", stream: bool = False):
+    """Complete `prompt`; with a `timeout` (seconds) the call is abandoned after that long and not retried.
 
-def call_groq(prompt: str, user=None, temperature: float = 0.7, max_tokens: int = 1000):
+    Every call, failed ones included, is recorded in the LLM telemetry under
+    `feature`: wall time, tokens and, with `stream`, time to first token.
+    """
+    started_at = time.time()
+    started = time.perf_counter()
+    ttft = usage = None
+    status = "error"
     try:
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
             raise ValueError("GROQ_API_KEY not configured in environment")
 
-        client = Groq(api_key=api_key)
-        response = client.chat.completions.create(
+        if timeout is None:
+            client = Groq(api_key=api_key)
+        else:
+            # A retry would overrun the caller's deadline
+            client = Groq(api_key=api_key, timeout=timeout, max_retries=0)
+        request = dict(
             messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
+            model=MODEL,
             temperature=temperature,
             max_tokens=max_tokens
         )
-        cleaned_response = clean_json_response(response.choices[0].message.content.strip())
-        if user:
-            track_token_usage(
-                user=user,
-                model="llama-3.3-70b-versatile",    
-                input_tokens=response.usage.prompt_tokens,
-                output_tokens=response.usage.completion_tokens
-            )
+        if stream:
+            text, usage, ttft = _complete_streamed(client, **request)
+        else:
+            response = client.chat.completions.create(**request)
+            text, usage = response.choices[0].message.content, response.usage
+        cleaned_response = clean_json_response(text.strip())
+        status = "ok"
         return cleaned_response, {
-            'input_tokens': response.usage.prompt_tokens,
-            'output_tokens': response.usage.completion_tokens
+            'input_tokens': usage.prompt_tokens if usage else None,
+            'output_tokens': usage.completion_tokens if usage else None
         }
     except Exception as e:
-        raise Exception(f"Error calling GROQ API: {str(e)}") 
\ No newline at end of file
+        raise Exception(f"Error calling GROQ API: {str(e)}")
+    finally:
+        telemetry.record(
+            feature, MODEL, started_at, time.perf_counter() - started, ttft_seconds=ttft,
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None,
+            status=status, user=user
+        )
@@ -0,0 +1,38 @@
+"""Bookkeeping for one-off data migrations (backfills) on the resumes database.
+
+Tables are created with CREATE ... IF NOT EXISTS from several places (the
+SQLAlchemy models and SearchEngine._init_db), so "the table did not exist yet"
+is not a reliable signal for running a backfill. Each backfill is recorded
+here by name instead and runs exactly once per database.
+"""
+import time
+from typing import Callable
+
+from .observability import get_logger
+
+logger = get_logger(__name__)
+
+
+def run_once(conn, name: str, migration: Callable) -> bool:
+    """Run `migration(conn)` unless a migration with this name was already applied.
+
+    Returns True when the migration ran. The caller commits.
+    """
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TEXT
+        )
+    """)
+    c.execute("SELECT 1 FROM schema_migrations WHERE name = ?", (name,))
+    if c.fetchone():
+        return False
+
+    logger.info("Applying migration", extra={"migration": name})
+    migration(conn)
+    c.execute(
+        "INSERT INTO schema_migrations (name, applied_at) VALUES (?, ?)",
+        (name, str(int(time.time())))
+    )
+    return True
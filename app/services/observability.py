@@ -0,0 +1,205 @@
+"""Structured logging, timing spans and Prometheus metrics.
+
+Logging: modules log through `get_logger(__name__)`. Every logger lives under
+the "app" logger, which writes one JSON object per line to stderr (or plain
+text) at the configured level. Fields passed as `extra={...}` become keys of
+the JSON object, so log lines can be filtered by query, stage or resume id
+instead of parsed.
+
+Metrics are kept in process and rendered in the Prometheus text format by
+`render_metrics()` (served at /metrics):
+
+- histograms are cumulative bucket counters plus sum and count, per label set;
+- `span(stage)` times a block into peoplegpt_stage_duration_seconds;
+- collectors registered with `register_collector` report values that already
+  live elsewhere (cache hit and miss counters) when the metrics are scraped.
+
+With several workers every process has its own metrics; scrape each worker or
+aggregate in Prometheus.
+
+Configuration (environment):
+    LOG_LEVEL   DEBUG, INFO (default), WARNING or ERROR
+    LOG_FORMAT  json (default) or text
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+_configured = False
+_configure_lock = threading.Lock()
+
+
+# -- logging ----------------------------------------------------------------
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and the `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """Install the handler of the "app" logger. Safe to call more than once."""
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        handler = logging.StreamHandler(sys.stderr)
+        if (fmt or os.getenv("LOG_FORMAT", "json")) == "text":
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        else:
+            handler.setFormatter(JsonFormatter())
+        root = logging.getLogger("app")
+        root.addHandler(handler)
+        root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+        root.propagate = False
+        _configured = True
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a module; modules run as scripts (`__main__`) log under "app" too."""
+    configure_logging()
+    return logging.getLogger(name if name == "app" or name.startswith("app.") else f"app.{name}")
+
+
+# -- metrics ----------------------------------------------------------------
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram with fixed buckets (in seconds) and labels."""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _label_text(self.labels + ("le",), key + (repr(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_bucket{_label_text(self.labels + ('le',), key + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {count}")
+        return lines
+
+
+# A collector returns (name, type, help, [(labels dict, value), ...]) families
+Collector = Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+REQUEST_DURATION = Histogram(
+    "peoplegpt_http_request_duration_seconds", "Time to answer an HTTP request",
+    labels=("method", "route", "status")
+)
+STAGE_DURATION = Histogram(
+    "peoplegpt_stage_duration_seconds", "Time spent in one stage of request processing",
+    labels=("stage",)
+)
+_histograms = [REQUEST_DURATION, STAGE_DURATION]
+_collectors: List[Collector] = []
+
+
+def register_collector(collector: Collector) -> None:
+    _collectors.append(collector)
+
+
+def cache_collector(name: str, counters: Callable[[], Tuple[int, int]]) -> Collector:
+    """Collector of a cache's hit and miss counters (and hit ratio) from a (hits, misses) callable."""
+    def collect():
+        hits, misses = counters()
+        lookups = hits + misses
+        labels = {"cache": name}
+        return [
+            ("peoplegpt_cache_hits_total", "counter", "Cache lookups answered from the cache", [(labels, hits)]),
+            ("peoplegpt_cache_misses_total", "counter", "Cache lookups that missed", [(labels, misses)]),
+            ("peoplegpt_cache_hit_ratio", "gauge", "Share of cache lookups that hit since start",
+             [(labels, hits / lookups if lookups else 0.0)]),
+        ]
+    return collect
+
+
+def render_metrics() -> str:
+    """Every histogram and collected value in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for histogram in _histograms:
+        lines.extend(histogram.render())
+    families: Dict[str, Tuple[str, str, List]] = {}
+    for collector in _collectors:
+        try:
+            collected = collector()
+        except Exception:
+            get_logger(__name__).exception("Metrics collector failed")
+            continue
+        for name, metric_type, help_text, samples in collected:
+            families.setdefault(name, (metric_type, help_text, []))[2].extend(samples)
+    for name, (metric_type, help_text, samples) in families.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in samples:
+            lines.append(f"{name}{_label_text(tuple(labels), tuple(labels.values()))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def span(stage: str, timings: Optional[Dict[str, float]] = None) -> Iterator[None]:
+    """Time a block into the stage histogram (and `timings[f"{stage}_ms"]` when a dict is passed)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        if timings is not None:
+            timings[f"{stage}_ms"] = round(1000 * elapsed, 2)
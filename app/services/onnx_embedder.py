@@ -0,0 +1,239 @@
+"""Quantized ONNX Runtime backend for all-MiniLM-L6-v2 embeddings on CPU.
+
+The model is exported once to ONNX and dynamically quantized to int8, then
+served with ONNX Runtime and the `tokenizers` fast tokenizer, without torch at
+inference time. Enable it with:
+
+    EMBEDDING_BACKEND=onnx
+    ONNX_MODEL_DIR=data/onnx/all-MiniLM-L6-v2   (default)
+
+Requires `pip install onnxruntime` (the export step also needs torch, transformers
+and onnx). Commands:
+
+    python -m app.services.onnx_embedder export [--output DIR]
+    python -m app.services.onnx_embedder check  [--db data/resumes.db] [--k 10]
+    python -m app.services.onnx_embedder bench  [--batch-size 32] [--texts 512]
+
+`check` compares the ONNX backend against the torch SentenceTransformer on a
+sample corpus and reports cosine drift and top-k overlap; `bench` reports
+throughput of both backends.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from .embeddings import MODEL_NAME
+from .observability import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MODEL_DIR = os.path.join("data", "onnx", MODEL_NAME)
+QUANTIZED_MODEL_FILE = "model-int8.onnx"
+MAX_SEQ_LENGTH = 256  # matches SentenceTransformer's max_seq_length for this model
+
+SAMPLE_QUERIES = [
+    "Python developer with machine learning experience",
+    "Senior React frontend engineer",
+    "Chartered accountant with SAP FICO",
+    "Data scientist skilled in NLP and deep learning",
+    "DevOps engineer with AWS, Docker and Kubernetes",
+    "Financial analyst with portfolio management background",
+    "Full-stack developer Django and JavaScript",
+    "Power BI reporting and data visualization specialist",
+]
+
+
+def export_onnx_model(output_dir: str = DEFAULT_MODEL_DIR, model_name: str = MODEL_NAME) -> str:
+    """Export the transformer to ONNX, quantize it to int8 and save the tokenizer next to it."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    hub_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(hub_name)
+    model = AutoModel.from_pretrained(hub_name)
+    model.eval()
+
+    dummy = tokenizer(["warm up"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    float_path = os.path.join(output_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in input_names),
+            float_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+
+    quantized_path = os.path.join(output_dir, QUANTIZED_MODEL_FILE)
+    quantize_dynamic(float_path, quantized_path, weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(output_dir)
+    logger.info("Exported int8 ONNX model", extra={"path": quantized_path})
+    return quantized_path
+
+
+class OnnxEmbedder:
+    """SentenceTransformer-compatible encoder running the int8 ONNX model.
+
+    Mean pooling over the attention mask followed by L2 normalization, as in the
+    all-MiniLM-L6-v2 SentenceTransformer pipeline.
+    """
+
+    def __init__(self, model_dir: str = DEFAULT_MODEL_DIR, model_file: str = QUANTIZED_MODEL_FILE,
+                 num_threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("The ONNX embedding backend requires `pip install onnxruntime tokenizers`") from e
+
+        model_path = os.path.join(model_dir, model_file)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"{model_path} not found; run `python -m app.services.onnx_embedder export` first"
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        hidden = self.session.run(None, feeds)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        if not batch:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = np.vstack([
+            self._encode_batch(batch[i:i + batch_size]) for i in range(0, len(batch), batch_size)
+        ])
+        return vectors[0] if single else vectors
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def check_equivalence(reference, candidate, corpus: List[str], queries: List[str],
+                      k: int = 10) -> Dict[str, Any]:
+    """Compare two encoders: per-text cosine drift and top-k retrieval overlap."""
+    ref_docs = _normalize(reference.encode(corpus))
+    cand_docs = _normalize(candidate.encode(corpus))
+    drift = 1.0 - np.sum(ref_docs * cand_docs, axis=1)
+
+    k = min(k, len(corpus))
+    ref_queries = _normalize(reference.encode(queries))
+    cand_queries = _normalize(candidate.encode(queries))
+    ref_top = np.argsort(-(ref_queries @ ref_docs.T), axis=1)[:, :k]
+    cand_top = np.argsort(-(cand_queries @ cand_docs.T), axis=1)[:, :k]
+    overlaps = [len(set(a) & set(b)) / k for a, b in zip(ref_top, cand_top)]
+
+    return {
+        "corpus_size": len(corpus),
+        "queries": len(queries),
+        "k": k,
+        "cosine_drift": {
+            "mean": float(drift.mean()),
+            "p95": float(np.percentile(drift, 95)),
+            "max": float(drift.max()),
+        },
+        "top_k_overlap": {
+            "mean": float(np.mean(overlaps)),
+            "min": float(np.min(overlaps)),
+        },
+    }
+
+
+def benchmark_throughput(encoder, texts: List[str], batch_size: int = 32, repeats: int = 3) -> Dict[str, float]:
+    """Measure encode throughput in texts per second (best of `repeats` runs)."""
+    encoder.encode(texts[:batch_size], batch_size=batch_size)  # warm up
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        encoder.encode(texts, batch_size=batch_size)
+        best = min(best, time.perf_counter() - started)
+    return {
+        "texts": len(texts),
+        "batch_size": batch_size,
+        "seconds": round(best, 4),
+        "texts_per_second": round(len(texts) / best, 1),
+    }
+
+
+def load_sample_corpus(db_path: str, limit: int = 1000) -> List[str]:
+    """Build embedding texts from stored resumes, falling back to the sample queries."""
+    corpus = []
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        c = conn.cursor()
+        c.execute("SELECT skills, experience, education, summary FROM resumes LIMIT ?", (limit,))
+        for skills, experience, education, summary in c.fetchall():
+            skills_text = " ".join(json.loads(skills)) if skills else ""
+            corpus.append(" ".join(filter(None, [summary, skills_text, experience, education])))
+        conn.close()
+    return corpus or list(SAMPLE_QUERIES)
+
+
+if __name__ == "__main__":
+    from .embeddings import load_local_encoder
+
+    parser = argparse.ArgumentParser(description="Export, check and benchmark the ONNX embedding backend.")
+    parser.add_argument("command", choices=["export", "check", "bench"])
+    parser.add_argument("--output", default=os.getenv("ONNX_MODEL_DIR", DEFAULT_MODEL_DIR))
+    parser.add_argument("--db", default="data/resumes.db")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--texts", type=int, default=512)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx_model(args.output)
+    else:
+        torch_encoder = load_local_encoder("torch")
+        onnx_encoder = OnnxEmbedder(args.output)
+        corpus = load_sample_corpus(args.db)
+        if args.command == "check":
+            report = check_equivalence(torch_encoder, onnx_encoder, corpus, SAMPLE_QUERIES, k=args.k)
+        else:
+            texts = (corpus * (args.texts // len(corpus) + 1))[:args.texts]
+            report = {
+                "torch": benchmark_throughput(torch_encoder, texts, args.batch_size),
+                "onnx": benchmark_throughput(onnx_encoder, texts, args.batch_size),
+            }
+            report["speedup"] = round(
+                report["onnx"]["texts_per_second"] / report["torch"]["texts_per_second"], 2
+            )
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,396 @@
+"""Persistent outbox for outreach email, drained by a background sender.
+
+Routes only enqueue: a message is a row in email_outbox and the request returns
+immediately. OutboxSender drains the queue in a daemon thread, reusing one
+authenticated SMTP session across messages (reconnecting when the server drops
+it), and retries transient failures with exponential backoff.
+
+Messages are claimed under the database write lock and the per-minute rate
+limit is counted from the outbox itself (messages sent in the last 60 seconds),
+so several worker processes can each run a sender without exceeding the limit
+or sending a message twice.
+
+Configuration (environment):
+    SMTP_HOST, SMTP_PORT          mail server (port default 587)
+    SMTP_USER, SMTP_PASS          credentials; leave both unset to skip login
+    SENDER_EMAIL                  From address
+    SMTP_USE_TLS                  1 (default) to STARTTLS; 0 for a local sink such as
+                                  `python -m aiosmtpd -n -l localhost:1025`
+    EMAIL_RATE_PER_MINUTE         maximum messages sent per minute (default 60)
+    EMAIL_MAX_ATTEMPTS            attempts before a message is marked failed (default 5)
+    SMTP_SESSION_IDLE_SECONDS     close the session after this much idle time (default 30)
+"""
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, Dict, List, Optional, Sequence
+
+from .observability import get_logger
+
+logger = get_logger(__name__)
+
+# A claim older than this belongs to a sender that died or lost track of it
+STALE_CLAIM_SECONDS = 600
+RECOVER_INTERVAL_SECONDS = 60
+
+OUTBOX_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        id INTEGER PRIMARY KEY,
+        campaign_id TEXT,
+        resume_id INTEGER,
+        to_email TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        body TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        next_attempt_at REAL NOT NULL DEFAULT 0,
+        created_at TEXT,
+        sent_at REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_email_outbox_due ON email_outbox (status, next_attempt_at)",
+    "CREATE INDEX IF NOT EXISTS ix_email_outbox_campaign ON email_outbox (campaign_id)",
+    "CREATE INDEX IF NOT EXISTS ix_email_outbox_sent ON email_outbox (sent_at)",
+]
+
+MESSAGE_FIELDS = ["id", "campaign_id", "resume_id", "to_email", "subject", "status",
+                  "attempts", "last_error", "created_at", "sent_at"]
+
+
+def init_outbox(conn) -> None:
+    """Create the outbox table."""
+    c = conn.cursor()
+    for statement in OUTBOX_SCHEMA:
+        c.execute(statement)
+
+
+class SmtpConfig:
+    """SMTP settings read from the environment once per sender."""
+
+    def __init__(self):
+        self.host = os.getenv("SMTP_HOST")
+        self.port = int(os.getenv("SMTP_PORT", "587"))
+        self.user = os.getenv("SMTP_USER")
+        self.password = os.getenv("SMTP_PASS")
+        self.sender = os.getenv("SENDER_EMAIL")
+        self.use_tls = os.getenv("SMTP_USE_TLS", "1") not in ("0", "false", "False")
+
+    def missing(self) -> List[str]:
+        """Names of required settings that are not set."""
+        required = {"SMTP_HOST": self.host, "SENDER_EMAIL": self.sender}
+        if self.user or self.password:
+            # Credentials are optional (local sinks), but only as a pair
+            required.update({"SMTP_USER": self.user, "SMTP_PASS": self.password})
+        return [name for name, value in required.items() if not value]
+
+
+def enqueue_messages(conn, messages: Sequence[Dict[str, Any]], campaign_id: Optional[str] = None) -> List[int]:
+    """Queue messages ({to, subject, body, resume_id?}) for delivery; returns their ids. The caller commits."""
+    c = conn.cursor()
+    created_at = str(int(time.time()))
+    ids = []
+    for message in messages:
+        c.execute("""
+            INSERT INTO email_outbox (campaign_id, resume_id, to_email, subject, body, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (campaign_id, message.get("resume_id"), message["to"], message["subject"],
+              message["body"], created_at))
+        ids.append(c.lastrowid)
+    return ids
+
+
+def get_message(conn, message_id: int) -> Optional[Dict[str, Any]]:
+    c = conn.cursor()
+    c.execute(f"SELECT {', '.join(MESSAGE_FIELDS)} FROM email_outbox WHERE id = ?", (message_id,))
+    row = c.fetchone()
+    return dict(zip(MESSAGE_FIELDS, row)) if row else None
+
+
+def campaign_status(conn, campaign_id: str, limit: int = 1000) -> Optional[Dict[str, Any]]:
+    """Per-status counts and the messages of one bulk send."""
+    c = conn.cursor()
+    c.execute(
+        "SELECT status, COUNT(*) FROM email_outbox WHERE campaign_id = ? GROUP BY status",
+        (campaign_id,)
+    )
+    counts = dict(c.fetchall())
+    if not counts:
+        return None
+    c.execute(f"""
+        SELECT {', '.join(MESSAGE_FIELDS)} FROM email_outbox
+        WHERE campaign_id = ?
+        ORDER BY id
+        LIMIT ?
+    """, (campaign_id, limit))
+    return {
+        "campaign_id": campaign_id,
+        "total": sum(counts.values()),
+        "counts": counts,
+        "messages": [dict(zip(MESSAGE_FIELDS, row)) for row in c.fetchall()],
+    }
+
+
+def _is_transient(error: Exception) -> bool:
+    """4xx replies and dropped connections are worth retrying; 5xx replies are not."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+class OutboxSender:
+    """Background thread that delivers queued outbox messages over a reused SMTP session."""
+
+    def __init__(self, db_path: str, rate_per_minute: Optional[int] = None,
+                 max_attempts: Optional[int] = None, idle_seconds: Optional[float] = None,
+                 retry_base_seconds: float = 30):
+        self.db_path = db_path
+        self.config = SmtpConfig()
+        self.rate_per_minute = rate_per_minute or int(os.getenv("EMAIL_RATE_PER_MINUTE", "60"))
+        self.max_attempts = max_attempts or int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+        self.idle_seconds = idle_seconds or float(os.getenv("SMTP_SESSION_IDLE_SECONDS", "30"))
+        self.retry_base_seconds = retry_base_seconds
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.sessions_opened = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        missing = self.config.missing()
+        if missing:
+            logger.warning("Outbox sender not started, SMTP configuration is incomplete", extra={"missing": missing})
+            return
+        self._recover()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-sender", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._close()
+
+    def notify(self) -> None:
+        """Wake the sender after messages were queued."""
+        self._wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "sessions_opened": self.sessions_opened,
+            "rate_per_minute": self.rate_per_minute,
+        }
+
+    # -- queue --------------------------------------------------------------
+
+    def _recover(self) -> None:
+        # Messages left 'sending' by a process that died mid-send, or whose outcome
+        # could not be recorded, go back to the queue; until then they count as in
+        # flight against the rate budget. Stale claims are judged by age, so live
+        # senders in other workers are unaffected.
+        conn = sqlite3.connect(self.db_path)
+        try:
+            c = conn.cursor()
+            c.execute("""
+                UPDATE email_outbox SET status = 'queued'
+                WHERE status = 'sending' AND next_attempt_at < ?
+            """, (time.time() - STALE_CLAIM_SECONDS,))
+            if c.rowcount:
+                logger.warning("Requeued stale outbox claims", extra={"messages": c.rowcount})
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _claim(self, limit: int) -> List[tuple]:
+        """Mark up to `limit` due messages as sending, within the shared per-minute budget."""
+        now = time.time()
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            c.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM email_outbox WHERE sent_at > ?),
+                    (SELECT COUNT(*) FROM email_outbox WHERE status = 'sending')
+            """, (now - 60,))
+            sent_last_minute, in_flight = c.fetchone()
+            budget = min(limit, self.rate_per_minute - sent_last_minute - in_flight)
+            if budget <= 0:
+                return []
+            c.execute("""
+                SELECT id, to_email, subject, body, attempts FROM email_outbox
+                WHERE status = 'queued' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at, id
+                LIMIT ?
+            """, (now, budget))
+            rows = c.fetchall()
+            # next_attempt_at doubles as the claim time while a message is 'sending'
+            c.executemany(
+                "UPDATE email_outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?",
+                [(now, row[0]) for row in rows]
+            )
+            conn.commit()
+            return rows
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def _record(self, message_id: int, attempts: int, error: Optional[Exception]) -> None:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            if error is None:
+                conn.execute("""
+                    UPDATE email_outbox SET status = 'sent', attempts = ?, last_error = NULL, sent_at = ?
+                    WHERE id = ?
+                """, (attempts, time.time(), message_id))
+                self.sent += 1
+            elif _is_transient(error) and attempts < self.max_attempts:
+                delay = self.retry_base_seconds * 2 ** (attempts - 1)
+                conn.execute("""
+                    UPDATE email_outbox SET status = 'queued', attempts = ?, last_error = ?, next_attempt_at = ?
+                    WHERE id = ?
+                """, (attempts, str(error), time.time() + delay, message_id))
+                self.retried += 1
+            else:
+                conn.execute(
+                    "UPDATE email_outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                    (attempts, str(error), message_id)
+                )
+                self.failed += 1
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _next_due_in(self) -> float:
+        """Seconds until the next queued message is due or the rate window frees up."""
+        now = time.time()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            c = conn.cursor()
+            c.execute("SELECT MIN(next_attempt_at) FROM email_outbox WHERE status = 'queued'")
+            due = c.fetchone()[0]
+            if due is None:
+                return self.idle_seconds
+            c.execute(
+                "SELECT MIN(sent_at) FROM email_outbox WHERE sent_at > ?",
+                (now - 60,)
+            )
+            oldest = c.fetchone()[0]
+        finally:
+            conn.close()
+        wait = due - now
+        if wait <= 0:
+            # Due but not claimed: the rate budget is spent until the oldest send leaves the window
+            wait = oldest + 60 - now if oldest is not None else 1.0
+        return min(max(wait, 0.05), self.idle_seconds)
+
+    # -- SMTP ---------------------------------------------------------------
+
+    def _session(self) -> smtplib.SMTP:
+        if self._server is not None:
+            return self._server
+        config = self.config
+        server = smtplib.SMTP(config.host, config.port, timeout=30)
+        try:
+            if config.use_tls:
+                server.starttls()
+            if config.user:
+                server.login(config.user, config.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        self.sessions_opened += 1
+        return server
+
+    def _close(self) -> None:
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+
+    def _deliver(self, to_email: str, subject: str, body: str) -> None:
+        msg = MIMEMultipart()
+        msg["From"] = self.config.sender
+        msg["To"] = to_email
+        msg["Subject"] = subject
+        msg.attach(MIMEText(body, "plain"))
+        try:
+            self._session().sendmail(self.config.sender, to_email, msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            # The server closed an idle session; reconnect once before counting a failure
+            self._server = None
+            self._session().sendmail(self.config.sender, to_email, msg.as_string())
+        except smtplib.SMTPException:
+            # Error replies leave the session usable (smtplib resets it)
+            raise
+        except OSError:
+            # A timed out or broken socket cannot be reused
+            self._close()
+            raise
+        self._last_used = time.monotonic()
+
+    # -- loop ---------------------------------------------------------------
+
+    def _run(self) -> None:
+        logger.info("Outbox sender started")
+        next_recovery = time.monotonic() + RECOVER_INTERVAL_SECONDS
+        while not self._stop.is_set():
+            if time.monotonic() >= next_recovery:
+                next_recovery = time.monotonic() + RECOVER_INTERVAL_SECONDS
+                try:
+                    self._recover()
+                except sqlite3.Error:
+                    logger.exception("Outbox sender could not requeue stale claims")
+            try:
+                batch = self._claim(limit=20)
+            except sqlite3.Error:
+                logger.exception("Outbox sender could not claim messages")
+                batch = []
+            for message_id, to_email, subject, body, attempts in batch:
+                try:
+                    self._deliver(to_email, subject, body)
+                    error = None
+                except Exception as e:
+                    logger.warning("Error sending outbox message", extra={"message_id": message_id, "error": str(e)})
+                    error = e
+                try:
+                    self._record(message_id, attempts + 1, error)
+                except sqlite3.Error:
+                    # Left 'sending'; _recover() requeues it once the claim is stale
+                    logger.exception("Outbox sender could not record message", extra={"message_id": message_id})
+            if batch:
+                continue
+
+            if self._server is not None and time.monotonic() - self._last_used > self.idle_seconds:
+                self._close()
+            try:
+                wait = self._next_due_in()
+            except sqlite3.Error:
+                wait = self.idle_seconds
+            self._wake.wait(wait)
+            self._wake.clear()
+        logger.info("Outbox sender stopped")
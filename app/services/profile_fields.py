@@ -0,0 +1,184 @@
+"""Structured columns derived from free-text resume fields at ingest.
+
+`experience` ("6 years", "5+ years", "6 months", "Less than 1 year") is parsed
+into a numeric `experience_years`, and the contact location into normalized
+`city` and `country` columns, so range filters and seniority bucketing are
+indexed predicates instead of string parsing on every request.
+"""
+import json
+import re
+from typing import Any, Dict, Optional, Tuple
+from .migrations import run_once
+
+# Columns added to resumes tables created before they existed. `embedding` is listed
+# too, since a database first created by the SQLAlchemy models lacks it.
+PROFILE_COLUMNS = {
+    "embedding": "TEXT",
+    "experience_years": "REAL",
+    "city": "TEXT",
+    "country": "TEXT",
+}
+
+PROFILE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_resumes_experience_years ON resumes (experience_years)",
+    "CREATE INDEX IF NOT EXISTS ix_resumes_city ON resumes (city COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS ix_resumes_country ON resumes (country COLLATE NOCASE)",
+]
+
+# Seniority bands as [min_years, max_years) ranges
+SENIORITY_BANDS = {
+    "junior": (0, 2),
+    "mid": (2, 5),
+    "senior": (5, None),
+}
+
+COUNTRY_ALIASES = {
+    "us": "United States",
+    "usa": "United States",
+    "united states of america": "United States",
+    "uk": "United Kingdom",
+    "uae": "United Arab Emirates",
+    "bharat": "India",
+}
+
+CITY_ALIASES = {
+    "bengaluru": "Bangalore",
+    "gurugram": "Gurgaon",
+    "bombay": "Mumbai",
+    "madras": "Chennai",
+}
+
+_NUMBER = r"(\d+(?:\.\d+)?)"
+
+
+def parse_experience_years(experience: Optional[str]) -> Optional[float]:
+    """Parse a free-text experience string into years, or None if it has no usable number."""
+    if not experience:
+        return None
+    text = experience.lower()
+
+    if re.search(r"\b(fresher|no experience|entry[- ]level)\b", text):
+        return 0.0
+
+    years = re.search(_NUMBER + r"\s*\+?\s*(?:years?|yrs?)\b", text)
+    months = re.search(_NUMBER + r"\s*\+?\s*(?:months?|mos?)\b", text)
+    if years or months:
+        total = float(years.group(1)) if years else 0.0
+        if months:
+            total += float(months.group(1)) / 12
+        if re.search(r"(?:\b(?:less than|under)\s|<\s*)", text):
+            # "Less than 1 year" -> halfway to the bound
+            total = total / 2
+        return round(total, 2)
+
+    # Bare numbers ("6") are taken as years
+    bare = re.match(r"\s*" + _NUMBER + r"\s*\+?\s*$", text)
+    if bare:
+        return float(bare.group(1))
+    return None
+
+
+def _normalize_place(value: str, aliases: Dict[str, str]) -> Optional[str]:
+    value = re.sub(r"\s+", " ", value).strip(" .")
+    if not value:
+        return None
+    if value.lower() in aliases:
+        return aliases[value.lower()]
+    # Keep acronyms and mixed case as written, title-case the rest
+    return value.title() if value.islower() or (value.isupper() and len(value) > 3) else value
+
+
+def normalize_city(city: str) -> Optional[str]:
+    """Normalize a city name the way it is stored in the city column."""
+    return _normalize_place(city, CITY_ALIASES)
+
+
+def normalize_country(country: str) -> Optional[str]:
+    """Normalize a country name the way it is stored in the country column."""
+    return _normalize_place(country, COUNTRY_ALIASES)
+
+
+def parse_location(location: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Split a location string into a normalized (city, country) pair.
+
+    "bengaluru, Karnataka, india" -> ("Bangalore", "India"). A single part is taken as the city.
+    """
+    if not location:
+        return None, None
+    parts = [p for p in (part.strip() for part in re.split(r"[,/|]", location)) if p]
+    if not parts:
+        return None, None
+    city = normalize_city(parts[0])
+    country = normalize_country(parts[-1]) if len(parts) > 1 else None
+    return city, country
+
+
+def seniority_level(experience_years: Optional[float]) -> Optional[str]:
+    """Bucket years of experience into junior, mid or senior."""
+    if experience_years is None:
+        return None
+    for level, (low, high) in SENIORITY_BANDS.items():
+        if experience_years >= low and (high is None or experience_years < high):
+            return level
+    return None
+
+
+def derive_profile_fields(experience: Optional[str], contact) -> Dict[str, Any]:
+    """Compute the derived profile columns for one resume."""
+    if isinstance(contact, str):
+        try:
+            contact = json.loads(contact) if contact else {}
+        except json.JSONDecodeError:
+            contact = {}
+    location = contact.get("location") if isinstance(contact, dict) else None
+    city, country = parse_location(location)
+    return {
+        "experience_years": parse_experience_years(experience),
+        "city": city,
+        "country": country,
+    }
+
+
+def experience_range_clause(min_years: Optional[float] = None,
+                            max_years: Optional[float] = None) -> Tuple[str, list]:
+    """Build a [min_years, max_years) predicate on experience_years."""
+    clauses, params = [], []
+    if min_years is not None:
+        clauses.append("experience_years >= ?")
+        params.append(min_years)
+    if max_years is not None:
+        clauses.append("experience_years < ?")
+        params.append(max_years)
+    return " AND ".join(clauses), params
+
+
+def seniority_clause(level: str) -> Tuple[str, list]:
+    """Build the experience_years predicate for a seniority band."""
+    if level not in SENIORITY_BANDS:
+        raise ValueError(f"Unknown seniority level: {level}")
+    return experience_range_clause(*SENIORITY_BANDS[level])
+
+
+def backfill_profile_fields(conn) -> None:
+    """Recompute experience_years, city and country for every resume."""
+    c = conn.cursor()
+    c.execute("SELECT id, experience, contact FROM resumes")
+    for resume_id, experience, contact in c.fetchall():
+        fields = derive_profile_fields(experience, contact)
+        c.execute(
+            "UPDATE resumes SET experience_years = ?, city = ?, country = ? WHERE id = ?",
+            (fields["experience_years"], fields["city"], fields["country"], resume_id)
+        )
+
+
+def init_profile_fields(conn) -> None:
+    """Add the derived columns and their indexes to resumes, backfilling existing rows once."""
+    c = conn.cursor()
+    c.execute("PRAGMA table_info(resumes)")
+    existing = {row[1] for row in c.fetchall()}
+    for column, column_type in PROFILE_COLUMNS.items():
+        if column not in existing:
+            c.execute(f"ALTER TABLE resumes ADD COLUMN {column} {column_type}")
+    for statement in PROFILE_INDEXES:
+        c.execute(statement)
+    run_once(conn, "backfill_resume_profile_fields", backfill_profile_fields)
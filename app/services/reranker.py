@@ -0,0 +1,110 @@
+"""Second-stage re-ranking of semantic search candidates with a cross-encoder.
+
+The bi-encoder recall set from the vector index is re-scored by a small local
+cross-encoder that reads the query and each resume together. Scoring cost grows
+linearly with the number of (query, resume) pairs, so the number of candidates
+re-ranked is chosen per request from the remaining latency budget and a running
+estimate of the cost of one pair.
+
+Configuration (environment):
+    ENABLE_RERANKER            1 (default) to re-rank search results, 0 to disable
+    RERANKER_MODEL             cross-encoder model name
+                               (default cross-encoder/ms-marco-MiniLM-L-6-v2)
+    RERANK_LATENCY_BUDGET_MS   default budget for retrieval plus re-ranking (default 300)
+    RERANK_MAX_CANDIDATES      upper bound on pairs scored per query (default 50)
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .observability import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+MAX_DOCUMENT_CHARS = 1000  # the model truncates to 512 tokens anyway
+
+
+def reranker_enabled() -> bool:
+    return os.getenv("ENABLE_RERANKER", "1") not in ("0", "false", "False")
+
+
+def default_latency_budget_ms() -> float:
+    return float(os.getenv("RERANK_LATENCY_BUDGET_MS", "300"))
+
+
+def rerank_document(resume: Dict[str, Any]) -> str:
+    """Text the cross-encoder reads for a search result."""
+    parts = [
+        resume.get("summary") or "",
+        "Skills: " + ", ".join(resume.get("skills") or []),
+        resume.get("experience") or "",
+        resume.get("education") or "",
+    ]
+    return " ".join(part for part in parts if part)[:MAX_DOCUMENT_CHARS]
+
+
+class CrossEncoderReranker:
+    """Budget-aware wrapper around a sentence-transformers CrossEncoder."""
+
+    def __init__(self, model_name: Optional[str] = None, max_candidates: Optional[int] = None,
+                 initial_pair_ms: float = 5.0, smoothing: float = 0.2):
+        self.model_name = model_name or os.getenv("RERANKER_MODEL", DEFAULT_RERANKER_MODEL)
+        self.max_candidates = max_candidates or int(os.getenv("RERANK_MAX_CANDIDATES", "50"))
+        self.smoothing = smoothing
+        # Exponentially weighted moving average of the seconds spent per scored pair
+        self.pair_seconds = initial_pair_ms / 1000
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    # Imported here so importing the app does not pull in torch
+                    from sentence_transformers import CrossEncoder
+                    logger.info("Loading re-ranker model", extra={"model": self.model_name})
+                    self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def warm_up(self) -> None:
+        # The first predictions after loading are slow one-off costs; keep them out of the estimate
+        self.score("warm up", ["warm up"], update_estimate=False)
+
+    def candidates_for_budget(self, remaining_seconds: float) -> int:
+        """How many pairs fit in the remaining budget, capped at max_candidates."""
+        if remaining_seconds <= 0:
+            return 0
+        return min(self.max_candidates, int(remaining_seconds / self.pair_seconds))
+
+    def score(self, query: str, documents: Sequence[str], update_estimate: bool = True) -> List[float]:
+        """Cross-encoder relevance scores for (query, document) pairs; updates the cost estimate."""
+        if not documents:
+            return []
+        model = self.model  # loaded outside the timed region
+        started = time.perf_counter()
+        scores = model.predict([(query, document) for document in documents])
+        if update_estimate:
+            per_pair = (time.perf_counter() - started) / len(documents)
+            self.pair_seconds += self.smoothing * (per_pair - self.pair_seconds)
+        return [float(s) for s in scores]
+
+    def rerank(self, query: str, results: List[Dict[str, Any]], top_k: int,
+               remaining_seconds: float) -> Tuple[List[Dict[str, Any]], int]:
+        """Re-order the head of `results` (already in first-stage order) by cross-encoder score.
+
+        Returns the re-ordered results and the number of candidates re-ranked;
+        0 means the budget did not cover even `top_k` pairs (or max_candidates,
+        if smaller) and the first-stage order was kept.
+        """
+        count = min(len(results), self.candidates_for_budget(remaining_seconds))
+        if count < min(top_k, len(results), self.max_candidates):
+            return results, 0
+        head, tail = results[:count], results[count:]
+        scores = self.score(query, [rerank_document(r) for r in head])
+        for result, score in zip(head, scores):
+            result["rerank_score"] = score
+        head.sort(key=lambda r: r["rerank_score"], reverse=True)
+        return head + tail, count
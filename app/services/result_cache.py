@@ -0,0 +1,173 @@
+"""Cache of ranked search results, keyed by a search session token.
+
+A search ranks up to `top_k` candidates once; the ranking (ids and scores, not
+the resume rows) is kept here so later pages are slices of it and cost one
+primary key fetch instead of another scoring pass and LLM call. The session
+also carries the status and text of the search's RAG analysis.
+
+Sessions are written through to the search_sessions table, so with several
+workers any of them can serve a session's pages and its (possibly deferred)
+analysis. Each process keeps a bounded LRU in front of the table (least
+recently used sessions are evicted first); entries expire `ttl` seconds after
+they were created, and expired rows are deleted as new sessions are stored.
+
+Configuration (environment):
+    SEARCH_RESULT_CACHE_SIZE    maximum number of search sessions cached per process (default 256)
+    SEARCH_RESULT_TTL_SECONDS   lifetime of a search session (default 900)
+"""
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .observability import get_logger
+
+logger = get_logger(__name__)
+
+PENDING = "pending"
+
+
+def init_search_sessions(conn) -> None:
+    """Create the table of search sessions shared by the workers."""
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS search_sessions (
+            token TEXT PRIMARY KEY,
+            query TEXT NOT NULL,
+            ranking TEXT NOT NULL,
+            analysis_status TEXT,
+            analysis TEXT,
+            expires_at REAL NOT NULL
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS ix_search_sessions_expires_at ON search_sessions (expires_at)")
+
+
+class SearchResultCache:
+    """Thread-safe LRU of search sessions with a per-entry TTL, backed by SQLite when given a `db_path`."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 900, db_path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls, db_path: Optional[str] = None) -> "SearchResultCache":
+        return cls(
+            maxsize=int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("SEARCH_RESULT_TTL_SECONDS", "900")),
+            db_path=db_path
+        )
+
+    def put(self, session: Dict[str, Any]) -> str:
+        """Store a search session and return its token."""
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            self._entries[token] = (time.monotonic() + self.ttl, session)
+            self._evict()
+        if self.db_path is not None:
+            analysis = session.get("analysis") or {}
+            self._write("""
+                INSERT INTO search_sessions (token, query, ranking, analysis_status, analysis, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (token, session["query"], json.dumps(session["ranking"]), analysis.get("status"),
+                  analysis.get("analysis"), time.time() + self.ttl), prune=True)
+        return token
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._entries.pop(token, None)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(token)
+        session = entry[1] if entry is not None else None
+        # A session from another worker, or an analysis another worker may have finished since
+        if self.db_path is not None and (session is None or (session.get("analysis") or {}).get("status") == PENDING):
+            stored = self._read(token)
+            if stored is not None:
+                session, expires_at = stored
+                with self._lock:
+                    self._entries[token] = (expires_at, session)
+                    self._evict()
+        with self._lock:
+            if session is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return session
+
+    def set_analysis(self, token: str, analysis: Dict[str, Any]) -> None:
+        """Record the {"status", "analysis"} of a session's RAG analysis."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                entry[1]["analysis"] = analysis
+        if self.db_path is not None:
+            self._write(
+                "UPDATE search_sessions SET analysis_status = ?, analysis = ? WHERE token = ?",
+                (analysis["status"], analysis["analysis"], token)
+            )
+
+    def _read(self, token: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """A stored session and its expiry on the monotonic clock."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                c = conn.cursor()
+                c.execute("""
+                    SELECT query, ranking, analysis_status, analysis, expires_at FROM search_sessions
+                    WHERE token = ? AND expires_at > ?
+                """, (token, time.time()))
+                row = c.fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            logger.exception("Error reading search session")
+            return None
+        if row is None:
+            return None
+        query, ranking, status, analysis, expires_at = row
+        session = {"query": query, "ranking": [tuple(entry) for entry in json.loads(ranking)]}
+        if status is not None:
+            session["analysis"] = {"status": status, "analysis": analysis}
+        return session, time.monotonic() + (expires_at - time.time())
+
+    def _write(self, statement: str, params: tuple, prune: bool = False) -> None:
+        # Best effort: the in-process entry still serves this worker if the write fails
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                c = conn.cursor()
+                c.execute(statement, params)
+                if prune:
+                    c.execute("DELETE FROM search_sessions WHERE expires_at <= ?", (time.time(),))
+                conn.commit()
+            finally:
+                conn.rollback()
+                conn.close()
+        except sqlite3.Error:
+            logger.exception("Error writing search session")
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        expired = [token for token, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for token in expired:
+            del self._entries[token]
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.db_path is not None:
+            self._write("DELETE FROM search_sessions", ())
@@ -0,0 +1,148 @@
+import json
+import sqlite3
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .profile_fields import experience_range_clause, normalize_city, normalize_country, seniority_clause
+from .skill_index import skill_filter_clause
+
+# Columns that listing endpoints are allowed to project
+LISTING_FIELDS = [
+    "id", "name", "skills", "experience", "education", "contact", "summary", "created_at",
+    "experience_years", "city", "country"
+]
+DEFAULT_FIELDS = ["id", "name", "skills", "experience", "education", "contact", "summary"]
+
+# JSON encoded columns and the value used when they are empty
+JSON_FIELDS = {"skills": list, "contact": dict}
+
+# A SQL predicate on the resumes table and its parameters
+Filter = Tuple[str, list]
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Parse a comma separated `fields=` projection into a list of column names."""
+    if not fields:
+        return list(DEFAULT_FIELDS)
+
+    requested = []
+    for field in fields.split(","):
+        field = field.strip()
+        if field and field not in requested:
+            requested.append(field)
+
+    unknown = [f for f in requested if f not in LISTING_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    # The id is always returned so clients can continue from the last row
+    if "id" not in requested:
+        requested.insert(0, "id")
+    return requested
+
+
+def build_filters(skills: Optional[Iterable[str]] = None, skill_mode: str = "any",
+                  min_experience: Optional[float] = None, max_experience: Optional[float] = None,
+                  seniority: Optional[str] = None, city: Optional[str] = None,
+                  country: Optional[str] = None) -> List[Filter]:
+    """Translate the candidate filters shared by the listing and search endpoints into SQL predicates."""
+    filters = []
+    if skills:
+        filters.append(skill_filter_clause(skills, skill_mode))
+    if min_experience is not None or max_experience is not None:
+        filters.append(experience_range_clause(min_experience, max_experience))
+    if seniority:
+        filters.append(seniority_clause(seniority))
+    if city:
+        filters.append(("city = ? COLLATE NOCASE", [normalize_city(city)]))
+    if country:
+        filters.append(("country = ? COLLATE NOCASE", [normalize_country(country)]))
+    return filters
+
+
+def matching_ids(conn, filters: List[Filter]) -> List[int]:
+    """Ids of every resume matching all of the filters."""
+    where = " AND ".join(clause for clause, _ in filters) or "1"
+    params = [p for _, clause_params in filters for p in clause_params]
+    c = conn.cursor()
+    c.execute(f"SELECT id FROM resumes WHERE {where}", params)
+    return [row[0] for row in c.fetchall()]
+
+
+def _decode_row(fields: List[str], row: tuple) -> Dict[str, Any]:
+    """Turn a projected row into a dict, decoding only the JSON columns that were selected."""
+    item = {}
+    for field, value in zip(fields, row):
+        if field in JSON_FIELDS:
+            value = json.loads(value) if value else JSON_FIELDS[field]()
+        item[field] = value
+    return item
+
+
+def fetch_page(db_path: str, fields: List[str], after_id: Optional[int] = None,
+               limit: int = 100, filters: Optional[List[Filter]] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Fetch one keyset page of resumes ordered by id.
+
+    `filters` is a list of (sql predicate, params) pairs that are ANDed together.
+    Returns the page and the cursor for the next page, or None when this was the last one.
+    """
+    columns = ", ".join(fields)
+    where = ["id > ?"]
+    params: list = [after_id or 0]
+    for clause, clause_params in filters or []:
+        where.append(clause)
+        params.extend(clause_params)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        c = conn.cursor()
+        # Fetch one extra row to know whether another page exists
+        c.execute(
+            f"SELECT {columns} FROM resumes WHERE {' AND '.join(where)} ORDER BY id LIMIT ?",
+            params + [limit + 1]
+        )
+        rows = c.fetchall()
+    finally:
+        conn.close()
+
+    has_more = len(rows) > limit
+    items = [_decode_row(fields, row) for row in rows[:limit]]
+    next_cursor = items[-1]["id"] if has_more and items else None
+    return items, next_cursor
+
+
+def iter_resumes(db_path: str, fields: List[str], after_id: Optional[int] = None,
+                 batch_size: int = 500, filters: Optional[List[Filter]] = None) -> Iterator[Dict[str, Any]]:
+    """Yield resumes ordered by id without holding more than one batch in memory.
+
+    Each batch is read with its own short-lived connection, so the generator can be
+    consumed from any thread (e.g. by a StreamingResponse) and never pins a read
+    transaction for the whole export.
+    """
+    cursor = after_id
+    while True:
+        items, cursor = fetch_page(db_path, fields, after_id=cursor, limit=batch_size, filters=filters)
+        yield from items
+        if cursor is None:
+            break
+
+
+def iter_rows_by_id(db_path: str, ids: List[int], columns: List[str],
+                    batch_size: int = 900) -> Iterator[Tuple[List[int], Dict[int, tuple]]]:
+    """Yield (chunk of ids, {id: row}) for `ids` in order, one `IN (...)` query per chunk.
+
+    Chunks stay under SQLite's bound parameter limit and each uses its own
+    short-lived connection, like iter_resumes. Rows start with the id column.
+    """
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        conn = sqlite3.connect(db_path)
+        try:
+            c = conn.cursor()
+            c.execute(
+                f"SELECT id, {', '.join(columns)} FROM resumes WHERE id IN ({','.join(['?'] * len(chunk))})",
+                chunk
+            )
+            rows = {row[0]: row for row in c.fetchall()}
+        finally:
+            conn.close()
+        yield chunk, rows
@@ -3,6 +3,9 @@ import re
 import json
 from typing import Dict, List, Optional
 from .llm_utils import call_groq
+from .observability import get_logger
+
+logger = get_logger(__name__)
 
 class ResumeParser:
     def __init__(self):
@@ -43,7 +46,8 @@ class ResumeParser:
                 "education": "degree and university",
                 "contact": {{
                     "email": "email address",
-                    "phone": "phone number"
+                    "phone": "phone number",
+                    "location": "city, country"
                 }},
                 "summary": "2-3 sentence professional summary highlighting key skills, experience, and achievements"
             }}
@@ -53,7 +57,7 @@ class ResumeParser:
         """
 
         try:
-            response, _ = call_groq(prompt_template)
+            response, _ = call_groq(prompt_template, feature="parse")
             
             # Clean the response
             cleaned_response = response.strip()
@@ -75,8 +79,8 @@ class ResumeParser:
             
             return result
             
-        except Exception as e:
-            print(f"Error parsing resume with LLM: {str(e)}")
+        except Exception:
+            logger.exception("Error parsing resume with LLM")
             # Fallback to basic parsing
             return {
                 "name": self._extract_name(text),
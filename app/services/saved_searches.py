@@ -0,0 +1,240 @@
+"""Saved searches and their incrementally maintained matches.
+
+A saved search persists its query embedding, candidate filters and a similarity
+threshold. Whenever a resume embedding is written, the resume is scored against
+the saved searches only (not the other way round) and any search it clears is
+recorded in saved_search_matches in the same transaction.
+
+Matches carry the resume's row_version at match time. Each saved search
+remembers the last row_version its owner has seen, so "new matches since the
+last visit" is a range read on (search_id, row_version).
+
+Configuration (environment):
+    SAVED_SEARCH_THRESHOLD  default cosine similarity a resume needs to match (default 0.35)
+"""
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .resume_listing import build_filters
+
+SAVED_SEARCH_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS saved_searches (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        query TEXT NOT NULL,
+        embedding TEXT NOT NULL,
+        filters TEXT NOT NULL DEFAULT '{}',
+        threshold REAL NOT NULL,
+        created_at TEXT,
+        last_seen_version INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS saved_search_matches (
+        search_id INTEGER NOT NULL,
+        resume_id INTEGER NOT NULL,
+        score REAL NOT NULL,
+        row_version INTEGER NOT NULL,
+        matched_at TEXT,
+        PRIMARY KEY (search_id, resume_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_saved_search_matches_version ON saved_search_matches (search_id, row_version)",
+    "CREATE INDEX IF NOT EXISTS ix_saved_search_matches_resume ON saved_search_matches (resume_id)",
+]
+
+
+def default_threshold() -> float:
+    return float(os.getenv("SAVED_SEARCH_THRESHOLD", "0.35"))
+
+
+def init_saved_searches(conn) -> None:
+    """Create the saved search tables."""
+    c = conn.cursor()
+    for statement in SAVED_SEARCH_SCHEMA:
+        c.execute(statement)
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _passes_filters(c, resume_id: int, filters: Dict[str, Any]) -> bool:
+    clauses = build_filters(**filters)
+    if not clauses:
+        return True
+    where = " AND ".join(clause for clause, _ in clauses)
+    params = [p for _, clause_params in clauses for p in clause_params]
+    c.execute(f"SELECT 1 FROM resumes WHERE id = ? AND {where}", [resume_id] + params)
+    return c.fetchone() is not None
+
+
+def match_resume(c, resume_id: int, embedding: Sequence[float], row_version: int) -> int:
+    """Score one resume against every saved search and record the matches.
+
+    Runs on the caller's cursor after the resume row (and its skill index) is
+    written, so the matches commit or roll back with it. A resume that no longer
+    clears a search it used to match is removed from that search. Returns the
+    number of searches matched.
+    """
+    c.execute("SELECT id, embedding, filters, threshold FROM saved_searches")
+    searches = c.fetchall()
+    if not searches:
+        return 0
+
+    resume_vector = _unit(embedding)
+    query_vectors = np.array([json.loads(row[1]) for row in searches], dtype=np.float32)
+    scores = query_vectors @ resume_vector  # query embeddings are stored normalized
+
+    matched = 0
+    now = str(int(time.time()))
+    for (search_id, _, filters, threshold), score in zip(searches, scores):
+        if score >= threshold and _passes_filters(c, resume_id, json.loads(filters)):
+            c.execute("""
+                INSERT INTO saved_search_matches (search_id, resume_id, score, row_version, matched_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (search_id, resume_id) DO UPDATE
+                SET score = excluded.score, row_version = excluded.row_version, matched_at = excluded.matched_at
+            """, (search_id, resume_id, float(score), row_version, now))
+            matched += 1
+        else:
+            c.execute(
+                "DELETE FROM saved_search_matches WHERE search_id = ? AND resume_id = ?",
+                (search_id, resume_id)
+            )
+    return matched
+
+
+def create_saved_search(conn, name: str, query: str, embedding: Sequence[float],
+                        filters: Dict[str, Any], threshold: Optional[float],
+                        initial_matches: List[Tuple[int, float, int]], seen_version: int) -> int:
+    """Insert a saved search with its matches over the existing corpus.
+
+    `initial_matches` are (resume id, score, row_version) triples; `seen_version`
+    is the row_version the corpus was scored at, so only later arrivals count as new.
+    """
+    c = conn.cursor()
+    c.execute("""
+        INSERT INTO saved_searches (name, query, embedding, filters, threshold, created_at, last_seen_version)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (
+        name,
+        query,
+        json.dumps(_unit(embedding).tolist()),
+        json.dumps(filters),
+        default_threshold() if threshold is None else threshold,
+        str(int(time.time())),
+        seen_version
+    ))
+    search_id = c.lastrowid
+    now = str(int(time.time()))
+    c.executemany("""
+        INSERT INTO saved_search_matches (search_id, resume_id, score, row_version, matched_at)
+        VALUES (?, ?, ?, ?, ?)
+    """, [(search_id, resume_id, score, version, now) for resume_id, score, version in initial_matches])
+    return search_id
+
+
+def _search_summary(row: tuple) -> Dict[str, Any]:
+    search_id, name, query, filters, threshold, created_at, last_seen_version, total, new = row
+    return {
+        "id": search_id,
+        "name": name,
+        "query": query,
+        "filters": json.loads(filters),
+        "threshold": threshold,
+        "created_at": created_at,
+        "match_count": total,
+        "new_match_count": new,
+    }
+
+
+_SUMMARY_QUERY = """
+    SELECT s.id, s.name, s.query, s.filters, s.threshold, s.created_at, s.last_seen_version,
+           (SELECT COUNT(*) FROM saved_search_matches m WHERE m.search_id = s.id),
+           (SELECT COUNT(*) FROM saved_search_matches m
+            WHERE m.search_id = s.id AND m.row_version > s.last_seen_version)
+    FROM saved_searches s
+"""
+
+
+def list_saved_searches(conn) -> List[Dict[str, Any]]:
+    """All saved searches with their total and new match counts."""
+    c = conn.cursor()
+    c.execute(_SUMMARY_QUERY + " ORDER BY s.id")
+    return [_search_summary(row) for row in c.fetchall()]
+
+
+def get_saved_search(conn, search_id: int) -> Optional[Dict[str, Any]]:
+    c = conn.cursor()
+    c.execute(_SUMMARY_QUERY + " WHERE s.id = ?", (search_id,))
+    row = c.fetchone()
+    return _search_summary(row) if row else None
+
+
+def delete_saved_search(conn, search_id: int) -> bool:
+    c = conn.cursor()
+    c.execute("DELETE FROM saved_search_matches WHERE search_id = ?", (search_id,))
+    c.execute("DELETE FROM saved_searches WHERE id = ?", (search_id,))
+    return c.rowcount > 0
+
+
+def read_matches(conn, search_id: int, new_only: bool = False, mark_seen: bool = False,
+                 limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+    """Matches of a saved search, best first; None if the search does not exist.
+
+    With `new_only` only matches recorded since the last visit are returned.
+    With `mark_seen` the visit is recorded, so the returned matches stop counting
+    as new. New matches cut off by `limit` stay new: the last-seen version only
+    advances below the oldest of them.
+    """
+    c = conn.cursor()
+    c.execute("SELECT last_seen_version FROM saved_searches WHERE id = ?", (search_id,))
+    search = c.fetchone()
+    if not search:
+        return None
+    since = search[0] if new_only else 0
+
+    c.execute("""
+        SELECT m.resume_id, m.score, m.row_version, m.matched_at, r.name, r.skills, r.experience, r.summary
+        FROM saved_search_matches m
+        JOIN resumes r ON r.id = m.resume_id
+        WHERE m.search_id = ? AND m.row_version > ?
+        ORDER BY m.score DESC
+        LIMIT ?
+    """, (search_id, since, limit))
+    rows = c.fetchall()
+
+    returned_new = {row[0]: row[2] for row in rows if row[2] > search[0]}
+    if mark_seen and returned_new:
+        c.execute(
+            "SELECT resume_id, row_version FROM saved_search_matches WHERE search_id = ? AND row_version > ?",
+            (search_id, search[0])
+        )
+        unreturned = [version for resume_id, version in c.fetchall() if resume_id not in returned_new]
+        seen = max(returned_new.values())
+        if unreturned:
+            seen = min(seen, min(unreturned) - 1)
+        if seen > search[0]:
+            c.execute("UPDATE saved_searches SET last_seen_version = ? WHERE id = ?", (seen, search_id))
+
+    return [
+        {
+            "id": resume_id,
+            "name": name,
+            "skills": json.loads(skills) if skills else [],
+            "experience": experience or "",
+            "summary": summary or "",
+            "score": score,
+            "is_new": row_version > search[0],
+            "matched_at": matched_at,
+        }
+        for resume_id, score, row_version, matched_at, name, skills, experience, summary in rows
+    ]
@@ -1,19 +1,216 @@
 import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import os
 import sqlite3
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from .llm_utils import call_groq
+from .embeddings import load_encoder
+from .embedding_service import EmbeddingClient
+from .deadline import Deadline, analysis_min_seconds, deferred_analysis_seconds
+from .observability import STAGE_DURATION, get_logger, span
+from .dashboard_aggregates import init_aggregates, apply_resume_by_id, rebuild_aggregates
+from .skill_index import init_skill_index, index_resume_skills
+from .profile_fields import init_profile_fields, derive_profile_fields
+from .detail_cache import init_row_version, new_row_version
+from .vector_index import VectorIndex, load_embeddings
+from .resume_listing import build_filters, matching_ids
+from .saved_searches import init_saved_searches, match_resume, create_saved_search, default_threshold
+from .result_cache import SearchResultCache, init_search_sessions
+from .embedding_store import EmbeddingStore
+from .outbox import init_outbox
+from .llm_telemetry import init_llm_telemetry
+from .tombstones import init_tombstones, record_tombstone, tombstones_since
+from .talent_insights import init_talent_insights
+from .dedup import init_dedup, dedup_mode, minhash_signature, find_duplicate, index_resume, forget_resume
+from .reranker import CrossEncoderReranker, default_latency_budget_ms, reranker_enabled
+
+EMBEDDED_FIELDS = ("summary", "skills", "experience", "education", "contact")
+
+logger = get_logger(__name__)
+
+
+def embedding_text(resume_data: Dict[str, Any]) -> str:
+    """Create a more comprehensive text blob for embedding."""
+    text_parts = [
+        resume_data.get('summary') or '',
+        ' '.join(resume_data.get('skills') or []),
+        resume_data.get('experience') or '',
+        resume_data.get('education') or '',
+        ' '.join(str(v) for v in (resume_data.get('contact') or {}).values())
+    ]
+    return ' '.join(filter(None, text_parts))
+
 
 class SearchEngine:
     def __init__(self, db_path: str = "data/resumes.db"):
+        # Construction is cheap on purpose: the database is initialized by
+        # initialize() and the model is loaded on first use or by warm_up(),
+        # both driven from the application lifespan.
         self.db_path = db_path
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
-        # Ensure data directory exists
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-        self._init_db()
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self.db_ready = False
+        self.model_ready = False
+        # In-memory vector index, built on first search and kept current by row_version
+        self.index = None
+        self._index_version = 0
+        self._index_lock = threading.Lock()
+        self.reranker = CrossEncoderReranker()
+        # Optional memory-mapped embedding store shared with the other workers
+        self.store = EmbeddingStore.from_env()
+        self._store_position = (None, 0)
+        self.result_cache = SearchResultCache.from_env(db_path)
+        # RAG analyses run here, so those that outlive their request's deadline can finish;
+        # one slot per worker keeps analyses from queueing behind each other
+        analysis_workers = int(os.getenv("SEARCH_ANALYSIS_WORKERS", "4"))
+        self._analysis_pool = ThreadPoolExecutor(max_workers=analysis_workers, thread_name_prefix="analysis")
+        self._analysis_slots = threading.BoundedSemaphore(analysis_workers)
+
+    def initialize(self):
+        """Create the data directory and database schema. Safe to call more than once."""
+        with self._init_lock:
+            if self.db_ready:
+                return
+            # Ensure data directory exists
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._init_db()
+            self.db_ready = True
+
+    @property
+    def model(self):
+        """The text encoder (local model or embedding service client), loaded on first access."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = load_encoder()
+                    # Also covers a lazy load when warm-up is disabled
+                    self.model_ready = True
+        return self._model
+
+    def embedding_stats(self) -> Dict[str, Any]:
+        """Batching metrics of the embedding service, when one is in use."""
+        if self._model is not None and hasattr(self._model, "stats"):
+            return {"mode": "service", **self._model.stats()}
+        return {"mode": "local"}
+
+    def warm_up(self):
+        """Load the model, backfill missing embeddings and build the vector index so the first request does not pay for them."""
+        try:
+            self.model.encode("warm up")
+            self.model_ready = True
+            logger.info("Embedding model warmed up")
+            # Backfill rows stored without an embedding before the index is built from them
+            self.verify_database()
+            self._sync_index()
+            logger.info("Vector index built", extra={"resumes": len(self.index)})
+            if reranker_enabled():
+                try:
+                    self.reranker.warm_up()
+                    logger.info("Re-ranker model warmed up")
+                except Exception:
+                    # Searches fall back to the first-stage order; not a reason to fail warm-up
+                    logger.exception("Error warming up re-ranker")
+        except Exception:
+            logger.exception("Error warming up search engine")
+            raise
+
+    def readiness(self) -> Dict[str, bool]:
+        """Report whether the database, the embedding model and the vector index are ready to serve."""
+        return {
+            "database": self.db_ready,
+            "model": self.model_ready,
+            "index": self.index is not None,
+        }
+
+    def _exact_vectors(self, ids: List[int]) -> Dict[int, np.ndarray]:
+        """Float32 embeddings from SQLite, used to re-score compressed index candidates."""
+        found_ids, vectors = load_embeddings(self.db_path, ids)
+        return dict(zip(found_ids, vectors))
+
+    def _sync_index(self) -> VectorIndex:
+        """Build the vector index on first use, then fold in rows written since the last sync.
+
+        row_version comes from a sequence allocated inside each write transaction,
+        so every row committed after the last sync has a larger version.
+        """
+        with self._index_lock:
+            if self.store is not None:
+                return self._sync_index_from_store()
+            if self.index is None:
+                return self._build_index()
+
+            conn = sqlite3.connect(self.db_path)
+            c = conn.cursor()
+            # Deletes first: a reused id is always re-inserted at a later version
+            deleted = tombstones_since(c, self._index_version)
+            if deleted is None:
+                # Deletes since the last sync were pruned; start over from the table
+                conn.close()
+                logger.info("Vector index fell behind the tombstone horizon, rebuilding")
+                return self._build_index()
+            c.execute("""
+                SELECT id, embedding, row_version FROM resumes
+                WHERE row_version > ? AND embedding IS NOT NULL AND embedding != ''
+            """, (self._index_version,))
+            rows = c.fetchall()
+            conn.close()
+            if deleted:
+                self.index.remove([row[0] for row in deleted])
+                self._index_version = max(self._index_version, deleted[-1][1])
+            if rows:
+                self.index.upsert(
+                    [row[0] for row in rows],
+                    np.array([json.loads(row[1]) for row in rows], dtype=np.float32)
+                )
+                self._index_version = max(self._index_version, max(row[2] for row in rows))
+            return self.index
+
+    def _build_index(self) -> VectorIndex:
+        """Build the vector index from every stored embedding (caller holds _index_lock)."""
+        conn = sqlite3.connect(self.db_path)
+        c = conn.cursor()
+        c.execute("""
+            SELECT MAX(COALESCE((SELECT MAX(row_version) FROM resumes), 0),
+                       COALESCE((SELECT MAX(row_version) FROM resume_tombstones), 0))
+        """)
+        version = c.fetchone()[0]
+        conn.close()
+        index = VectorIndex.from_env(exact_vectors=self._exact_vectors)
+        ids, vectors = load_embeddings(self.db_path)
+        index.build(ids, vectors)
+        self.index, self._index_version = index, version
+        return self.index
+
+    def _sync_index_from_store(self) -> VectorIndex:
+        """Keep the vector index in step with the shared embedding store (caller holds _index_lock).
+
+        A new store generation means a rebuild over the freshly mapped base (for
+        the uncompressed index the mapped matrix is scanned in place); otherwise
+        only the ids logged since the last sync are applied.
+        """
+        store = self.store
+        store.sync_from_db(self.db_path)
+        generation, position = self._store_position
+        if self.index is None or generation != store.generation:
+            index = VectorIndex.from_env(exact_vectors=store.get)
+            index.build(store.base_ids, store.base_vectors, shared=True)
+            index.remove(store.shadowed)
+            if store.overlay:
+                index.upsert(list(store.overlay), np.stack(list(store.overlay.values())))
+            self.index = index
+        else:
+            changed = list(dict.fromkeys(store.changes[position:]))
+            current = store.get(changed)
+            index = self.index
+            index.remove([resume_id for resume_id in changed if resume_id not in current])
+            if current:
+                index.upsert(list(current), np.stack(list(current.values())))
+        self._store_position = (store.generation, len(store.changes))
+        return self.index
 
     def _init_db(self):
         """Initialize the database with the required schema."""
@@ -32,30 +229,37 @@ class SearchEngine:
                     contact TEXT,
                     summary TEXT,
                     embedding TEXT,
-                    created_at TEXT
+                    created_at TEXT,
+                    experience_years REAL,
+                    city TEXT,
+                    country TEXT,
+                    row_version INTEGER NOT NULL DEFAULT 1
                 )
             """)
+            init_profile_fields(conn)
+            init_row_version(conn)
+            init_aggregates(conn)
+            init_skill_index(conn)
+            init_saved_searches(conn)
+            init_tombstones(conn)
+            init_outbox(conn)
+            init_dedup(conn)
+            init_talent_insights(conn)
+            init_llm_telemetry(conn)
+            init_search_sessions(conn)
             conn.commit()
             conn.close()
-            print("Database initialized successfully")
-        except Exception as e:
-            print(f"Error initializing database: {str(e)}")
+            logger.info("Database initialized successfully")
+        except Exception:
+            logger.exception("Error initializing database")
             raise
 
     def store_resume(self, resume_data: Dict[str, Any]) -> int:
         """Store resume with its embedding in the database."""
         try:
-            # Create a more comprehensive text blob for embedding
-            text_parts = [
-                resume_data.get('summary', ''),
-                ' '.join(resume_data.get('skills', [])),
-                resume_data.get('experience', ''),
-                resume_data.get('education', ''),
-                ' '.join(str(v) for v in resume_data.get('contact', {}).values())
-            ]
-            text_blob = ' '.join(filter(None, text_parts))
-            print(f"Creating embedding for resume: {resume_data.get('name')}")
-            print(f"Text blob: {text_blob[:200]}...")  # Print first 200 chars for debugging
+            text_blob = embedding_text(resume_data)
+            logger.debug("Creating embedding for resume", extra={"resume_name": resume_data.get("name"),
+                                                                 "text": text_blob[:200]})
             
             # Generate and validate embedding
             embedding = self.model.encode(text_blob)
@@ -63,26 +267,46 @@ class SearchEngine:
                 raise ValueError("Failed to generate embedding")
             
             embedding_list = embedding.tolist()
-            print(f"Generated embedding of length: {len(embedding_list)}")
 
             # Validate the embedding before storing
             if not isinstance(embedding_list, list) or len(embedding_list) == 0:
                 raise ValueError("Invalid embedding format")
 
+            profile = derive_profile_fields(resume_data.get("experience"), resume_data.get("contact"))
+            minhash = minhash_signature(text_blob)
+
             conn = sqlite3.connect(self.db_path)
             c = conn.cursor()
             
             # First, check if resume already exists
             c.execute("SELECT id FROM resumes WHERE name = ?", (resume_data["name"],))
             existing = c.fetchone()
+
+            # Then whether it is a near-duplicate of another resume (e.g. a re-submitted CV)
+            duplicate_of = None
+            mode = dedup_mode()
+            if mode != "off":
+                duplicate = find_duplicate(c, embedding_list, minhash, exclude=existing[0] if existing else None)
+                if duplicate is not None:
+                    logger.info("Near-duplicate resume", extra={
+                        "resume_name": resume_data["name"], "duplicate_of": duplicate[0],
+                        "cosine": round(duplicate[1], 3), "jaccard": round(duplicate[2], 2)
+                    })
+                    if mode == "merge" and not existing:
+                        existing = (duplicate[0],)
+                    elif duplicate[0] != (existing[0] if existing else None):
+                        duplicate_of = duplicate[0]
             
+            row_version = new_row_version(c)
             if existing:
-                # Update existing resume
+                # Update existing resume, swapping its contribution to the dashboard aggregates
+                apply_resume_by_id(c, existing[0], sign=-1)
                 c.execute("""
                     UPDATE resumes 
                     SET skills = ?, experience = ?, education = ?, contact = ?, 
-                        summary = ?, embedding = ?, created_at = ?
-                    WHERE name = ?
+                        summary = ?, embedding = ?, created_at = ?,
+                        experience_years = ?, city = ?, country = ?, row_version = ?, duplicate_of = ?
+                    WHERE id = ?
                 """, (
                     json.dumps(resume_data["skills"]),
                     resume_data["experience"],
@@ -91,15 +315,23 @@ class SearchEngine:
                     resume_data.get("summary"),
                     json.dumps(embedding_list),
                     resume_data.get("created_at"),
-                    resume_data["name"]
+                    profile["experience_years"],
+                    profile["city"],
+                    profile["country"],
+                    row_version,
+                    duplicate_of,
+                    existing[0]
                 ))
                 resume_id = existing[0]
+                apply_resume_by_id(c, resume_id)
+                index_resume_skills(c, resume_id, resume_data["skills"])
             else:
                 # Insert new resume
                 c.execute("""
                     INSERT INTO resumes (
-                        name, skills, experience, education, contact, summary, embedding, created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        name, skills, experience, education, contact, summary, embedding, created_at,
+                        experience_years, city, country, row_version, duplicate_of
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     resume_data["name"],
                     json.dumps(resume_data["skills"]),
@@ -108,10 +340,20 @@ class SearchEngine:
                     json.dumps(resume_data.get("contact", {})),
                     resume_data.get("summary"),
                     json.dumps(embedding_list),
-                    resume_data.get("created_at")
+                    resume_data.get("created_at"),
+                    profile["experience_years"],
+                    profile["city"],
+                    profile["country"],
+                    row_version,
+                    duplicate_of
                 ))
                 resume_id = c.lastrowid
-            
+                apply_resume_by_id(c, resume_id)
+                index_resume_skills(c, resume_id, resume_data["skills"])
+
+            index_resume(c, resume_id, embedding_list, minhash)
+            # Score the new embedding against the saved searches only
+            match_resume(c, resume_id, embedding_list, row_version)
             conn.commit()
             
             # Verify the embedding was stored correctly
@@ -121,129 +363,239 @@ class SearchEngine:
                 raise ValueError("Failed to store embedding")
                 
             conn.close()
-            print(f"Successfully stored resume with ID: {resume_id}")
+            logger.info("Stored resume", extra={"resume_id": resume_id})
             return resume_id
-        except Exception as e:
-            print(f"Error storing resume: {str(e)}")
+        except Exception:
+            logger.exception("Error storing resume")
             raise
 
-    def semantic_search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Perform semantic search on resumes."""
-        try:
-            print(f"Starting semantic search for query: {query}")
-            # Create a more comprehensive query embedding
-            query_embedding = self.model.encode(query)
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
+    def _load_resumes(self, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Fetch and decode the search result fields of the given resumes in one query.
 
-            # Get all resumes with valid embeddings
-            c.execute("""
-                SELECT id, name, skills, experience, education, contact, summary, embedding 
-                FROM resumes 
-                WHERE embedding IS NOT NULL
-            """)
-            rows = c.fetchall()
-            print(f"Found {len(rows)} resumes with valid embeddings")
+        Flagged near-duplicates (duplicate_of set) are left out, so they never take
+        a place in the results.
+        """
+        if not ids:
+            return {}
+        conn = sqlite3.connect(self.db_path)
+        c = conn.cursor()
+        placeholders = ",".join(["?"] * len(ids))
+        c.execute(f"""
+            SELECT id, name, skills, experience, education, contact, summary
+            FROM resumes
+            WHERE id IN ({placeholders}) AND duplicate_of IS NULL
+        """, list(ids))
+        rows = c.fetchall()
+        conn.close()
 
-            if not rows:
-                print("No resumes found with valid embeddings")
-                return []
+        resumes = {}
+        for row in rows:
+            try:
+                resume_id, name, skills, experience, education, contact, summary = row
+                resumes[resume_id] = {
+                    "id": resume_id,
+                    "name": name,
+                    "skills": json.loads(skills) if skills else [],
+                    "experience": experience or "",
+                    "education": education or "",
+                    "contact": json.loads(contact) if contact else {},
+                    "summary": summary or ""
+                }
+            except (json.JSONDecodeError, TypeError) as e:
+                logger.warning("Error processing resume", extra={"resume_id": row[0], "error": str(e)})
+        return resumes
 
-            similarities = []
-            for row in rows:
-                try:
-                    resume_id, name, skills, experience, education, contact, summary, emb_json = row
-                    if not emb_json:  # Skip if embedding is NULL
-                        print(f"Skipping resume {resume_id} due to NULL embedding")
-                        continue
-                        
-                    resume_embedding = np.array(json.loads(emb_json))
-                    
-                    # Calculate cosine similarity
-                    similarity = np.dot(query_embedding, resume_embedding) / (
-                        np.linalg.norm(query_embedding) * np.linalg.norm(resume_embedding)
-                    )
-                    
-                    # Add a small boost for exact matches in skills or summary
-                    if isinstance(skills, str):
-                        skills_list = json.loads(skills)
-                    else:
-                        skills_list = skills
-                        
-                    # Check for keyword matches
-                    query_keywords = query.lower().split()
-                    skills_text = ' '.join(skills_list).lower()
-                    summary_text = summary.lower() if summary else ""
-                    
-                    # Print matching information
-                    print(f"\nResume {resume_id} ({name}):")
-                    print(f"Skills: {skills_text}")
-                    print(f"Summary: {summary_text}")
-                    print(f"Query keywords: {query_keywords}")
-                    
-                    if any(keyword in skills_text for keyword in query_keywords):
-                        print(f"Found keyword match in skills for resume {resume_id}")
-                        similarity += 0.1
-                        
-                    if summary and any(keyword in summary_text for keyword in query_keywords):
-                        print(f"Found keyword match in summary for resume {resume_id}")
-                        similarity += 0.1
-                    
-                    print(f"Final similarity score: {similarity}")
-                    similarities.append((similarity, resume_id))
-                except (json.JSONDecodeError, TypeError) as e:
-                    print(f"Error processing resume {resume_id}: {str(e)}")
-                    continue
-
-            if not similarities:
-                print("No similarities calculated")
+    def _rank_candidates(self, query: str, candidates: List, resumes: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Score (resume id, cosine) candidates with the keyword boosts and sort them, best first."""
+        query_keywords = query.lower().split()
+        results = []
+        for resume_id, similarity in candidates:
+            resume = resumes.get(resume_id)
+            if resume is None:
+                continue
+            # Add a small boost for exact matches in skills or summary
+            skills_text = ' '.join(resume["skills"]).lower()
+            summary_text = resume["summary"].lower()
+            if any(keyword in skills_text for keyword in query_keywords):
+                similarity += 0.1
+            if summary_text and any(keyword in summary_text for keyword in query_keywords):
+                similarity += 0.1
+            results.append({**resume, "similarity_score": float(similarity)})
+        results.sort(key=lambda r: r["similarity_score"], reverse=True)
+        return results
+
+    def semantic_search(self, query: str, top_k: int = 5, rerank: Optional[bool] = None,
+                        latency_budget_ms: Optional[float] = None,
+                        timings: Optional[Dict[str, Any]] = None,
+                        deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
+        """Perform semantic search on resumes.
+
+        Stage one ranks by bi-encoder cosine similarity (plus keyword boosts); stage
+        two re-ranks as many of those candidates with the cross-encoder as fit in
+        what is left of `latency_budget_ms`. Per-stage timings in milliseconds are
+        written to `timings` when a dict is passed.
+
+        With a `deadline`, a query encoded by the embedding service waits at most
+        the remaining budget, and re-ranking gets no more than what is left of it.
+        """
+        timings = {} if timings is None else timings
+        started = time.perf_counter()
+
+        try:
+            with span("encode", timings):
+                if deadline is not None and isinstance(self.model, EmbeddingClient):
+                    query_embedding = self.model.encode(query, timeout=deadline.remaining())
+                else:
+                    query_embedding = self.model.encode(query)
+
+            with span("retrieve", timings):
+                index = self._sync_index()
+                # Over-fetch from the vector index so the later stages can reorder the pool
+                candidates = index.search(query_embedding, k=max(top_k * 10, 50))
+            if not candidates:
+                logger.info("No resumes found with valid embeddings")
                 return []
 
-            # Get top matches
-            top_matches = sorted(similarities, reverse=True)[:top_k]
-            print(f"\nTop matches: {top_matches}")
-            matched_ids = [match[1] for match in top_matches]
-
-            # Fetch full resume data for matches
-            placeholders = ",".join(["?"] * len(matched_ids))
-            c.execute(f"""
-                SELECT id, name, skills, experience, education, contact, summary 
-                FROM resumes 
-                WHERE id IN ({placeholders})
-            """, matched_ids)
-            
+            with span("fetch", timings):
+                resumes = self._load_resumes([resume_id for resume_id, _ in candidates])
+            with span("score", timings):
+                results = self._rank_candidates(query, candidates, resumes)
+
+            use_reranker = reranker_enabled() if rerank is None else rerank
+            if use_reranker:
+                budget_ms = default_latency_budget_ms() if latency_budget_ms is None else latency_budget_ms
+                remaining = budget_ms / 1000 - (time.perf_counter() - started)
+                if deadline is not None:
+                    remaining = min(remaining, deadline.remaining())
+                with span("rerank", timings):
+                    try:
+                        results, reranked = self.reranker.rerank(query, results, top_k, remaining)
+                    except Exception:
+                        # Keep the first-stage order rather than failing the search
+                        logger.exception("Re-ranking failed", extra={"query": query})
+                        reranked = 0
+                timings["reranked_candidates"] = reranked
+
+            timings["total_ms"] = round(1000 * (time.perf_counter() - started), 2)
+            logger.debug("Semantic search", extra={
+                "query": query, "candidates": len(candidates), "indexed": len(index),
+                "results": min(len(results), top_k), "timings": timings
+            })
+            return results[:top_k]
+        except Exception:
+            logger.exception("Error in semantic search", extra={"query": query})
+            return []
+
+    def batch_search(self, queries: List[Dict[str, Any]], include_analysis: bool = False) -> Dict[str, Any]:
+        """Search many queries at once.
+
+        Each query is a dict with `query`, `top_k` and optional candidate filters
+        (see resume_listing.build_filters). All queries are encoded in one batch and
+        scored against the index in one scan; filters restrict each query's
+        candidates before the top-k is taken. The cross-encoder stage is not
+        applied, and the RAG analysis is only generated when `include_analysis` is set.
+        """
+        timings: Dict[str, Any] = {}
+        started = time.perf_counter()
+        texts = [q["query"] for q in queries]
+        with span("encode", timings):
+            embeddings = np.atleast_2d(self.model.encode(texts))
+
+        with span("filter", timings):
+            allowed = []
+            conn = sqlite3.connect(self.db_path)
+            for q in queries:
+                filters = build_filters(
+                    q.get("skills"), q.get("skill_mode", "any"), q.get("min_experience"),
+                    q.get("max_experience"), q.get("seniority"), q.get("city"), q.get("country")
+                )
+                allowed.append(set(matching_ids(conn, filters)) if filters else None)
+            conn.close()
+
+        with span("retrieve", timings):
+            index = self._sync_index()
+            pool = max(max(q.get("top_k", 5) for q in queries) * 10, 50)
+            candidate_lists = index.search_many(embeddings, k=pool, allowed=allowed)
+
+        with span("fetch", timings):
+            resumes = self._load_resumes(sorted({rid for hits in candidate_lists for rid, _ in hits}))
+        with span("score", timings):
             results = []
-            for row in c.fetchall():
-                try:
-                    # Find the similarity score for this resume
-                    similarity_score = next((score for score, rid in top_matches if rid == row[0]), 0)
-                    
-                    results.append({
-                        "id": row[0],
-                        "name": row[1],
-                        "skills": json.loads(row[2]) if row[2] else [],
-                        "experience": row[3] or "",
-                        "education": row[4] or "",
-                        "contact": json.loads(row[5]) if row[5] else {},
-                        "summary": row[6] or "",
-                        "similarity_score": similarity_score
-                    })
-                except json.JSONDecodeError as e:
-                    print(f"Error parsing JSON for resume {row[0]}: {str(e)}")
-                    continue
-            
+            for q, candidates in zip(queries, candidate_lists):
+                ranked = self._rank_candidates(q["query"], candidates, resumes)
+                results.append({"query": q["query"], "matches": ranked[:q.get("top_k", 5)]})
+
+        if include_analysis:
+            with span("rag", timings), ThreadPoolExecutor(max_workers=4) as pool_executor:
+                analyses = pool_executor.map(
+                    lambda r: self.generate_answer_with_rag(r["query"], r["matches"]), results
+                )
+                for result, analysis in zip(results, analyses):
+                    result["analysis"] = analysis
+
+        timings["total_ms"] = round(1000 * (time.perf_counter() - started), 2)
+        return {"results": results, "timings": timings}
+
+    def save_search(self, name: str, query: str, filters: Dict[str, Any],
+                    threshold: Optional[float] = None) -> int:
+        """Persist a saved search and record its matches over the current corpus.
+
+        Later resumes are matched incrementally as they are stored (see
+        saved_searches.match_resume).
+        """
+        embedding = self.model.encode(query)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            c = conn.cursor()
+            # Take the write lock first so no resume commits between the scan and the insert
+            c.execute("BEGIN IMMEDIATE")
+            c.execute("SELECT COALESCE(MAX(row_version), 0) FROM resumes")
+            seen_version = c.fetchone()[0]
+
+            index = self._sync_index()
+            clauses = build_filters(**filters)
+            allowed = [set(matching_ids(conn, clauses))] if clauses else None
+            hits = index.search_many(embedding, k=len(index), allowed=allowed)[0] if len(index) else []
+            cutoff = default_threshold() if threshold is None else threshold
+            hits = [(resume_id, score) for resume_id, score in hits if score >= cutoff]
+
+            versions = {}
+            for start in range(0, len(hits), 900):
+                chunk = [resume_id for resume_id, _ in hits[start:start + 900]]
+                c.execute(
+                    f"SELECT id, row_version FROM resumes WHERE id IN ({','.join(['?'] * len(chunk))})",
+                    chunk
+                )
+                versions.update(c.fetchall())
+
+            search_id = create_saved_search(
+                conn, name, query, embedding, filters, cutoff,
+                [(resume_id, score, versions[resume_id]) for resume_id, score in hits if resume_id in versions],
+                seen_version
+            )
+            conn.commit()
+            return search_id
+        finally:
+            # Roll back anything uncommitted; closing alone keeps the write lock
+            # while a cursor still holds an unfinished statement
+            conn.rollback()
             conn.close()
-            print(f"Returning {len(results)} results")
-            return results
-        except Exception as e:
-            print(f"Error in semantic search: {str(e)}")
-            return []
 
-    def generate_answer_with_rag(self, query: str, top_resumes: List[Dict[str, Any]]) -> str:
+    def generate_answer_with_rag(self, query: str, top_resumes: List[Dict[str, Any]],
+                                 timeout: Optional[float] = None) -> str:
         """Generate a response using RAG with the top matching resumes."""
+        try:
+            return self._rag_answer(query, top_resumes, timeout)
+        except Exception:
+            logger.exception("Error generating RAG response", extra={"query": query})
+            return "Error generating analysis. Please try again."
+
+    def _rag_answer(self, query: str, top_resumes: List[Dict[str, Any]],
+                    timeout: Optional[float] = None) -> str:
+        """The RAG answer; LLM errors (including a `timeout` in seconds running out) propagate."""
         if not top_resumes:
             return "No matching resumes found."
-            
+
         context = "\n\n".join([
             f"Name: {r['name']}\n"
             f"Skills: {', '.join(r['skills'])}\n"
@@ -266,56 +618,339 @@ class SearchEngine:
         2. Why they match the requirements
         3. Any potential concerns or missing qualifications
         """
-        
+        response, _ = call_groq(prompt, timeout=timeout, feature="rag", stream=True)
+        return response
+
+    def _run_analysis(self, search_token: str, query: str, matches: List[Dict[str, Any]],
+                      deadline: Deadline, defer: bool, timings: Dict[str, Any]) -> Dict[str, Any]:
+        """RAG analysis bounded by `deadline`; returns {"status", "analysis"} and records it in the session.
+
+        The analysis runs inline when enough budget is left. Otherwise, or when it
+        is still running at the deadline, it is either abandoned ("skipped") or,
+        with `defer`, left to finish in the background ("pending", for at most
+        SEARCH_DEFERRED_ANALYSIS_MS) and stored in the search session for
+        get_analysis(). Analyses do not queue: when every analysis worker is busy
+        the analysis is skipped.
+        """
+        def record(outcome: Dict[str, Any]) -> Dict[str, Any]:
+            self.result_cache.set_analysis(search_token, outcome)
+            return outcome
+
+        def finish(future) -> Dict[str, Any]:
+            try:
+                return record({"status": "complete", "analysis": future.result()})
+            except Exception:
+                logger.exception("Error generating RAG response", extra={"query": query})
+                return record({"status": "failed", "analysis": "Error generating analysis. Please try again."})
+
+        skipped = {"status": "skipped", "analysis": None}
+        remaining = deadline.remaining()
+        if remaining < analysis_min_seconds() and not defer:
+            return record(skipped)
+        if not self._analysis_slots.acquire(blocking=False):
+            logger.warning("Analysis workers busy, skipping analysis", extra={"query": query})
+            return record(skipped)
+
+        # A deferred analysis may run past the request; an inline one only for the budget
+        timeout = deferred_analysis_seconds() if defer else remaining
+        rag_started = time.perf_counter()
+        future = self._analysis_pool.submit(self._rag_answer, query, matches, timeout)
+        future.add_done_callback(lambda _: self._analysis_slots.release())
         try:
-            response, _ = call_groq(prompt)
-            return response
-        except Exception as e:
-            print(f"Error generating RAG response: {str(e)}")
-            return "Error generating analysis. Please try again."
+            if remaining >= analysis_min_seconds():
+                future.result(timeout=remaining)
+        except Exception:
+            # Timed out, or failed; finish() records which
+            pass
+        if future.done():
+            outcome = finish(future)
+            elapsed = time.perf_counter() - rag_started
+            STAGE_DURATION.observe(elapsed, stage="rag")
+            timings["rag_ms"] = round(1000 * elapsed, 2)
+            return outcome
+        if defer:
+            outcome = record({"status": "pending", "analysis": None})
+            future.add_done_callback(finish)
+            return outcome
+        future.cancel()
+        return record(skipped)
+
+    def get_analysis(self, search_token: str) -> Optional[Dict[str, Any]]:
+        """Status and text of a search's analysis, or None if the session expired."""
+        session = self.result_cache.get(search_token)
+        if session is None:
+            return None
+        return session.get("analysis", {"status": "skipped", "analysis": None})
+
+    def search(self, query: str, location: str = None, experience_years: int = None,
+               rerank: Optional[bool] = None, latency_budget_ms: Optional[float] = None,
+               top_k: int = 5, page_size: Optional[int] = None,
+               include_analysis: bool = True, deadline: Optional[Deadline] = None,
+               defer_analysis: bool = True) -> Dict[str, Any]:
+        """Main search function that combines semantic search with RAG.
 
-    def search(self, query: str, location: str = None, experience_years: int = None) -> Dict[str, Any]:
-        """Main search function that combines semantic search with RAG."""
+        Ranks up to `top_k` resumes and returns the first `page_size` of them
+        (default: all). The ranking is cached under `search_token`; later pages
+        come from search_page() without scoring again or calling the LLM.
+        Without `include_analysis` the RAG answer is skipped (analysis is None).
+
+        With a `deadline` every stage is bounded by it and the matches are returned
+        when it runs out; `analysis_status` then says whether the analysis is
+        "complete", "skipped", "failed" or "pending" (still being generated with
+        `defer_analysis`, retrievable later through get_analysis()).
+        """
         try:
-            print(f"\nStarting search for query: {query}")
+            page_size = page_size or top_k
             # Perform semantic search
-            top_resumes = self.semantic_search(query, top_k=5)  # Limit to top 5 matches
-            print(f"Found {len(top_resumes)} matching resumes")
+            timings: Dict[str, Any] = {}
+            top_resumes = self.semantic_search(
+                query, top_k=top_k, rerank=rerank, latency_budget_ms=latency_budget_ms, timings=timings,
+                deadline=deadline
+            )
+            logger.info("Search", extra={"query": query, "matches": len(top_resumes), "timings": timings})
             
             if not top_resumes:
-                print("No matches found")
                 return {
                     "matches": [],
-                    "analysis": "No matching resumes found for your query."
+                    "analysis": "No matching resumes found for your query.",
+                    "analysis_status": "complete",
+                    "timings": timings
                 }
+
+            # Keep only the ranking server-side; pages re-read their rows by id
+            ranking = [
+                (r["id"], r["similarity_score"], r.get("rerank_score")) for r in top_resumes
+            ]
+            session = {"query": query, "ranking": ranking}
+            search_token = self.result_cache.put(session)
+            first_page = top_resumes[:page_size]
             
-            # Sort matches by similarity score
-            sorted_matches = sorted(top_resumes, key=lambda x: x.get('similarity_score', 0), reverse=True)
-            
-            # Generate RAG response
-            rag_response = self.generate_answer_with_rag(query, sorted_matches)
+            # Generate RAG response for the first page; matches are already in final (re-ranked) order
+            rag_response, analysis_status = None, "skipped"
+            if include_analysis and deadline is not None:
+                outcome = self._run_analysis(search_token, query, first_page, deadline, defer_analysis, timings)
+                rag_response, analysis_status = outcome["analysis"], outcome["status"]
+            elif include_analysis:
+                with span("rag", timings):
+                    rag_response = self.generate_answer_with_rag(query, first_page)
+                analysis_status = "complete"
+                self.result_cache.set_analysis(search_token, {"status": analysis_status, "analysis": rag_response})
             
             return {
-                "matches": sorted_matches,
-                "analysis": rag_response
+                "matches": first_page,
+                "analysis": rag_response,
+                "analysis_status": analysis_status,
+                "timings": timings,
+                "search_token": search_token,
+                "total": len(ranking),
+                "next_cursor": page_size if page_size < len(ranking) else None
             }
         except Exception as e:
-            print(f"Error in search: {str(e)}")
+            logger.exception("Error in search", extra={"query": query})
             return {
                 "matches": [],
-                "analysis": f"Error performing search: {str(e)}"
+                "analysis": f"Error performing search: {str(e)}",
+                "analysis_status": "failed"
             }
 
+    @staticmethod
+    def _editable_fields(c, resume_id: int) -> Optional[Tuple[Dict[str, Any], Optional[str]]]:
+        """The user-editable fields of a resume and its stored embedding JSON, or None if it does not exist."""
+        c.execute("""
+            SELECT name, skills, experience, education, contact, summary, embedding
+            FROM resumes WHERE id = ?
+        """, (resume_id,))
+        row = c.fetchone()
+        if not row:
+            return None
+        return {
+            "name": row[0],
+            "skills": json.loads(row[1]) if row[1] else [],
+            "experience": row[2],
+            "education": row[3],
+            "contact": json.loads(row[4]) if row[4] else {},
+            "summary": row[5],
+        }, row[6]
+
+    def update_resume(self, resume_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply a partial update to one resume; returns the updated fields, or None if it does not exist.
+
+        Every derived structure is updated in the same transaction: the embedding
+        (only re-encoded when an embedded field changed, along with its LSH buckets),
+        profile fields, dashboard aggregates, skill index and saved-search matches.
+        The vector index slot is overwritten in place on the next sync.
+
+        The new embedding is encoded before the write lock is taken; it is only
+        encoded again under the lock if another update changed the embedded text
+        in the meantime.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            c = conn.cursor()
+            found = self._editable_fields(c, resume_id)
+            conn.rollback()
+            if found is None:
+                return None
+            current, stored_embedding = found
+            updated = {**current, **changes}
+            encoded_text = None
+            if not stored_embedding or any(updated[field] != current[field] for field in EMBEDDED_FIELDS):
+                encoded_text = embedding_text(updated)
+                encoded = self.model.encode(encoded_text).tolist()
+
+            c.execute("BEGIN IMMEDIATE")
+            # Re-read under the lock: the row may have changed while encoding
+            found = self._editable_fields(c, resume_id)
+            if found is None:
+                return None
+            current, stored_embedding = found
+            updated = {**current, **changes}
+
+            if updated["name"] != current["name"]:
+                # store_resume upserts by name, so names must stay unique
+                c.execute("SELECT 1 FROM resumes WHERE name = ? AND id != ? LIMIT 1", (updated["name"], resume_id))
+                if c.fetchone():
+                    raise ValueError(f"Another resume is already stored under the name {updated['name']}")
+
+            if stored_embedding and all(updated[field] == current[field] for field in EMBEDDED_FIELDS):
+                embedding = json.loads(stored_embedding)
+            else:
+                text = embedding_text(updated)
+                embedding = encoded if text == encoded_text else self.model.encode(text).tolist()
+                minhash = minhash_signature(text)
+                # The edit may make it a near-duplicate of another resume, or stop it being one
+                duplicate = None
+                if dedup_mode() != "off":
+                    duplicate = find_duplicate(c, embedding, minhash, exclude=resume_id)
+                    if duplicate is not None and duplicate[0] == resume_id:
+                        # Matched one of its own duplicates, so it stays canonical
+                        duplicate = None
+                if duplicate is not None:
+                    logger.info("Near-duplicate resume", extra={
+                        "resume_name": updated["name"], "duplicate_of": duplicate[0],
+                        "cosine": round(duplicate[1], 3), "jaccard": round(duplicate[2], 2)
+                    })
+                    # Its own duplicates follow it to the new canonical
+                    c.execute("UPDATE resumes SET duplicate_of = ? WHERE duplicate_of = ?", (duplicate[0], resume_id))
+                c.execute("UPDATE resumes SET duplicate_of = ? WHERE id = ?",
+                          (duplicate[0] if duplicate else None, resume_id))
+                index_resume(c, resume_id, embedding, minhash)
+
+            profile = derive_profile_fields(updated["experience"], updated["contact"])
+            row_version = new_row_version(c)
+            apply_resume_by_id(c, resume_id, sign=-1)
+            c.execute("""
+                UPDATE resumes
+                SET name = ?, skills = ?, experience = ?, education = ?, contact = ?, summary = ?,
+                    embedding = ?, experience_years = ?, city = ?, country = ?, row_version = ?
+                WHERE id = ?
+            """, (
+                updated["name"],
+                json.dumps(updated["skills"]),
+                updated["experience"],
+                updated["education"],
+                json.dumps(updated["contact"]),
+                updated["summary"],
+                json.dumps(embedding),
+                profile["experience_years"],
+                profile["city"],
+                profile["country"],
+                row_version,
+                resume_id
+            ))
+            apply_resume_by_id(c, resume_id)
+            index_resume_skills(c, resume_id, updated["skills"])
+            match_resume(c, resume_id, embedding, row_version)
+            conn.commit()
+        finally:
+            # Roll back anything uncommitted; closing alone keeps the write lock
+            # while a cursor still holds an unfinished statement
+            conn.rollback()
+            conn.close()
+
+        if self.index is not None:
+            self._sync_index()
+        return {"id": resume_id, **updated}
+
+    def delete_resume(self, resume_id: int) -> bool:
+        """Delete one resume and everything derived from it; returns False if it does not exist.
+
+        The row, its skill index rows, LSH buckets and saved-search matches are
+        removed and the aggregates decremented in one transaction, which also records
+        a tombstone so every worker's vector index drops the embedding on its next sync.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            c.execute("SELECT 1 FROM resumes WHERE id = ?", (resume_id,))
+            if not c.fetchone():
+                return False
+            apply_resume_by_id(c, resume_id, sign=-1)
+            c.execute("DELETE FROM resume_skills WHERE resume_id = ?", (resume_id,))
+            c.execute("DELETE FROM saved_search_matches WHERE resume_id = ?", (resume_id,))
+            forget_resume(c, resume_id)
+            c.execute("DELETE FROM resumes WHERE id = ?", (resume_id,))
+            record_tombstone(c, resume_id, new_row_version(c))
+            conn.commit()
+        finally:
+            # Roll back anything uncommitted; closing alone keeps the write lock
+            # while a cursor still holds an unfinished statement
+            conn.rollback()
+            conn.close()
+
+        if self.index is not None:
+            self._sync_index()
+        return True
+
+    def search_page(self, search_token: str, cursor: int = 0, page_size: int = 5) -> Optional[Dict[str, Any]]:
+        """Return a page of a cached search ranking, or None if the session expired."""
+        session = self.result_cache.get(search_token)
+        if session is None:
+            return None
+        ranking = session["ranking"]
+        page = ranking[cursor:cursor + page_size]
+        resumes = self._load_resumes([resume_id for resume_id, _, _ in page])
+
+        matches = []
+        for resume_id, similarity, rerank_score in page:
+            # Resumes deleted since the search ran are skipped
+            if resume_id not in resumes:
+                continue
+            match = {**resumes[resume_id], "similarity_score": similarity}
+            if rerank_score is not None:
+                match["rerank_score"] = rerank_score
+            matches.append(match)
+
+        end = cursor + page_size
+        return {
+            "query": session["query"],
+            "matches": matches,
+            "total": len(ranking),
+            "next_cursor": end if end < len(ranking) else None
+        }
+
     def clear_index(self):
         """Clear all resumes from the database."""
         try:
             conn = sqlite3.connect(self.db_path)
             c = conn.cursor()
+            # Tombstone every row so other workers drop them from their vector index too
+            c.execute("SELECT id FROM resumes")
+            for (resume_id,) in c.fetchall():
+                record_tombstone(c, resume_id, new_row_version(c))
             c.execute("DELETE FROM resumes")
+            c.execute("DELETE FROM resume_skills")
+            c.execute("DELETE FROM saved_search_matches")
+            c.execute("DELETE FROM lsh_buckets")
+            rebuild_aggregates(conn)
             conn.commit()
             conn.close()
-        except Exception as e:
-            print(f"Error clearing index: {str(e)}")
+            with self._index_lock:
+                self.index = None
+            self.result_cache.clear()
+        except Exception:
+            logger.exception("Error clearing index")
             raise
 
     def verify_database(self):
@@ -330,7 +965,7 @@ class SearchEngine:
                 WHERE type='table' AND name='resumes'
             """)
             if not c.fetchone():
-                print("Creating resumes table...")
+                logger.info("Creating resumes table")
                 self._init_db()
             
             # Check for resumes without embeddings
@@ -341,9 +976,9 @@ class SearchEngine:
             missing_embeddings = c.fetchall()
             
             if missing_embeddings:
-                print(f"Found {len(missing_embeddings)} resumes without embeddings")
+                logger.info("Resumes without embeddings", extra={"count": len(missing_embeddings)})
                 for resume_id, name in missing_embeddings:
-                    print(f"Fixing embedding for resume {resume_id} ({name})")
+                    logger.info("Fixing embedding for resume", extra={"resume_id": resume_id, "resume_name": name})
                     
                     # Get resume data
                     c.execute("""
@@ -354,26 +989,34 @@ class SearchEngine:
                     
                     if resume_data:
                         # Create new embedding
-                        text_parts = [
-                            resume_data[5] or '',  # summary
-                            ' '.join(json.loads(resume_data[1])),  # skills
-                            resume_data[2] or '',  # experience
-                            resume_data[3] or '',  # education
-                            ' '.join(str(v) for v in json.loads(resume_data[4] or '{}').values())  # contact
-                        ]
-                        text_blob = ' '.join(filter(None, text_parts))
+                        text_blob = embedding_text({
+                            "summary": resume_data[5],
+                            "skills": json.loads(resume_data[1]) if resume_data[1] else [],
+                            "experience": resume_data[2],
+                            "education": resume_data[3],
+                            "contact": json.loads(resume_data[4] or '{}')
+                        })
                         embedding = self.model.encode(text_blob).tolist()
+                        minhash = minhash_signature(text_blob)
+                        # The near-duplicate check store_resume does at ingest (an existing
+                        # row cannot be merged away, so "merge" only flags it here)
+                        duplicate = None
+                        if dedup_mode() != "off":
+                            duplicate = find_duplicate(c, embedding, minhash, exclude=resume_id)
                         
-                        # Update embedding
+                        # Update embedding, bumping row_version so the vector index picks it up
+                        row_version = new_row_version(c)
                         c.execute("""
                             UPDATE resumes 
-                            SET embedding = ? 
+                            SET embedding = ?, row_version = ?, duplicate_of = ?
                             WHERE id = ?
-                        """, (json.dumps(embedding), resume_id))
+                        """, (json.dumps(embedding), row_version, duplicate[0] if duplicate else None, resume_id))
+                        index_resume(c, resume_id, embedding, minhash)
+                        match_resume(c, resume_id, embedding, row_version)
             
             conn.commit()
             conn.close()
-            print("Database verification complete")
-        except Exception as e:
-            print(f"Error verifying database: {str(e)}")
+            logger.debug("Database verification complete")
+        except Exception:
+            logger.exception("Error verifying database")
             raise 
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""Normalized resume_skills table used for skill filters and facet counts.
+
+Skills are still stored on the resume row as a JSON array; this table keeps one
+(resume_id, skill_canonical) row per skill so filters and facets are index
+lookups instead of LIKE scans over the JSON text.
+
+Rebuild from scratch with:
+
+    python -m app.services.skill_index [--db data/resumes.db]
+"""
+import argparse
+import json
+import re
+import sqlite3
+from typing import Iterable, List, Optional, Tuple
+from .migrations import run_once
+
+SKILL_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS resume_skills (
+        skill_canonical TEXT NOT NULL,
+        resume_id INTEGER NOT NULL,
+        PRIMARY KEY (skill_canonical, resume_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_resume_skills_resume ON resume_skills (resume_id, skill_canonical)",
+]
+
+SKILL_MODES = ("any", "all")
+
+
+def canonical_skill(skill: str) -> str:
+    """Normalize a skill for matching ("  React   JS " -> "react js")."""
+    return re.sub(r"\s+", " ", str(skill)).strip().lower()
+
+
+def canonical_skills(skills: Optional[Iterable[str]]) -> List[str]:
+    """Canonicalize and de-duplicate a list of skills, keeping their order."""
+    result = []
+    for skill in skills or []:
+        skill = canonical_skill(skill)
+        if skill and skill not in result:
+            result.append(skill)
+    return result
+
+
+def init_skill_index(conn) -> None:
+    """Create the resume_skills table and backfill it from existing resumes once."""
+    c = conn.cursor()
+    for statement in SKILL_SCHEMA:
+        c.execute(statement)
+    run_once(conn, "backfill_resume_skills", rebuild_skill_index)
+
+
+def index_resume_skills(c, resume_id: int, skills) -> None:
+    """Replace the resume_skills rows of one resume."""
+    if isinstance(skills, str):
+        skills = json.loads(skills) if skills else []
+    c.execute("DELETE FROM resume_skills WHERE resume_id = ?", (resume_id,))
+    c.executemany(
+        "INSERT INTO resume_skills (skill_canonical, resume_id) VALUES (?, ?)",
+        [(skill, resume_id) for skill in canonical_skills(skills)]
+    )
+
+
+def rebuild_skill_index(conn) -> None:
+    """Recompute resume_skills from the skills column of every resume."""
+    c = conn.cursor()
+    c.execute("DELETE FROM resume_skills")
+    rows = conn.cursor()
+    rows.execute("SELECT id, skills FROM resumes")
+    for resume_id, skills in rows:
+        try:
+            index_resume_skills(c, resume_id, skills)
+        except (json.JSONDecodeError, TypeError):
+            continue
+
+
+def skill_filter_clause(skills: Iterable[str], mode: str = "any", column: str = "id") -> Tuple[str, list]:
+    """Build a `<column> IN (...)` predicate selecting resumes with any or all of the skills."""
+    if mode not in SKILL_MODES:
+        raise ValueError(f"Unknown skill mode: {mode}")
+    skills = canonical_skills(skills)
+    placeholders = ",".join(["?"] * len(skills))
+    if mode == "all":
+        return (
+            f"{column} IN (SELECT resume_id FROM resume_skills WHERE skill_canonical IN ({placeholders}) "
+            f"GROUP BY resume_id HAVING COUNT(*) = ?)",
+            skills + [len(skills)]
+        )
+    return (
+        f"{column} IN (SELECT resume_id FROM resume_skills WHERE skill_canonical IN ({placeholders}))",
+        skills
+    )
+
+
+def skill_facets(conn, skills: Optional[Iterable[str]] = None, mode: str = "any",
+                 limit: int = 20) -> List[dict]:
+    """Count resumes per skill, optionally restricted to resumes matching a skill filter."""
+    c = conn.cursor()
+    if skills:
+        clause, params = skill_filter_clause(skills, mode, column="resume_id")
+        c.execute(f"""
+            SELECT skill_canonical, COUNT(*) FROM resume_skills
+            WHERE {clause}
+            GROUP BY skill_canonical
+            ORDER BY COUNT(*) DESC, skill_canonical
+            LIMIT ?
+        """, params + [limit])
+    else:
+        c.execute("""
+            SELECT skill_canonical, COUNT(*) FROM resume_skills
+            GROUP BY skill_canonical
+            ORDER BY COUNT(*) DESC, skill_canonical
+            LIMIT ?
+        """, (limit,))
+    return [{"skill": skill, "count": count} for skill, count in c.fetchall()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the resume_skills table.")
+    parser.add_argument("--db", default="data/resumes.db", help="Path to the resumes SQLite database")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    for statement in SKILL_SCHEMA:
+        conn.execute(statement)
+    rebuild_skill_index(conn)
+    conn.commit()
+    conn.close()
+    print(f"resume_skills rebuilt for {args.db}")
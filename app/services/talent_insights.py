@@ -0,0 +1,473 @@
+"""Offline talent clusters and skill gaps against job requisitions, for the dashboard.
+
+Both need every resume, so they are not computed per request. A scheduled job
+(TalentInsightsScheduler, or the CLI below) recomputes them and replaces the
+contents of small tables that the dashboard reads:
+
+- talent_clusters: mini-batch k-means over the normalized embedding matrix;
+  per cluster its size, average experience, most common skills and the
+  resumes closest to the centroid;
+- skill_gaps: for every skill required by an open requisition, the number of
+  openings that need it (demand) against the number of resumes that have it
+  (supply), plus per requisition the number of candidates covering most of
+  its required skills.
+
+Supply, per-cluster skill counts and coverage are counted over the (resume,
+skill) pairs of resume_skills; flagged near-duplicates are left out. A run is
+skipped when neither the resumes nor the requisitions changed since the last.
+
+    python -m app.services.talent_insights [--db data/resumes.db] [--clusters 8] [--force]
+
+Configuration (environment):
+    TALENT_CLUSTERS                    number of clusters (default 8)
+    TALENT_INSIGHTS_INTERVAL_SECONDS   how often the scheduler runs (default 3600, 0 disables it)
+    REQUISITION_MATCH_COVERAGE         share of required skills a candidate must have (default 0.8)
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .observability import get_logger
+from .skill_index import canonical_skills
+from .vector_index import normalize
+
+logger = get_logger(__name__)
+
+INSIGHTS_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS job_requisitions (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        required_skills TEXT NOT NULL,
+        openings INTEGER NOT NULL DEFAULT 1,
+        status TEXT NOT NULL DEFAULT 'open',
+        created_at TEXT,
+        updated_at REAL NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS skill_gaps (
+        skill TEXT PRIMARY KEY,
+        demand INTEGER NOT NULL,
+        supply INTEGER NOT NULL,
+        gap INTEGER NOT NULL,
+        coverage REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS requisition_matches (
+        requisition_id INTEGER PRIMARY KEY,
+        qualified INTEGER NOT NULL,
+        missing_skills TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS talent_clusters (
+        cluster_id INTEGER PRIMARY KEY,
+        size INTEGER NOT NULL,
+        average_experience REAL,
+        top_skills TEXT NOT NULL,
+        representative_ids TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS talent_insights_runs (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        started_at REAL NOT NULL DEFAULT 0,
+        computed_at REAL,
+        row_version INTEGER NOT NULL DEFAULT 0,
+        requisitions_version REAL NOT NULL DEFAULT 0,
+        resumes INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "INSERT OR IGNORE INTO talent_insights_runs (id) VALUES (1)",
+]
+
+REQUISITION_FIELDS = ["id", "title", "required_skills", "openings", "status", "created_at"]
+
+
+def init_talent_insights(conn) -> None:
+    """Create the requisition and precomputed insight tables."""
+    c = conn.cursor()
+    for statement in INSIGHTS_SCHEMA:
+        c.execute(statement)
+
+
+# -- requisitions -----------------------------------------------------------
+
+def _requisition(row: tuple) -> Dict[str, Any]:
+    requisition = dict(zip(REQUISITION_FIELDS, row))
+    requisition["required_skills"] = json.loads(requisition["required_skills"])
+    return requisition
+
+
+def create_requisition(conn, title: str, required_skills: Sequence[str], openings: int = 1) -> int:
+    """Save a requisition; its skills are stored canonicalized. The caller commits."""
+    c = conn.cursor()
+    c.execute("""
+        INSERT INTO job_requisitions (title, required_skills, openings, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+    """, (title, json.dumps(canonical_skills(required_skills)), openings, str(int(time.time())), time.time()))
+    return c.lastrowid
+
+
+def list_requisitions(conn) -> List[Dict[str, Any]]:
+    c = conn.cursor()
+    c.execute(f"SELECT {', '.join(REQUISITION_FIELDS)} FROM job_requisitions ORDER BY id")
+    return [_requisition(row) for row in c.fetchall()]
+
+
+def close_requisition(conn, requisition_id: int) -> bool:
+    """Mark a requisition closed so it stops counting as demand. The caller commits."""
+    c = conn.cursor()
+    c.execute(
+        "UPDATE job_requisitions SET status = 'closed', updated_at = ? WHERE id = ? AND status = 'open'",
+        (time.time(), requisition_id)
+    )
+    return c.rowcount > 0
+
+
+# -- computation ------------------------------------------------------------
+
+def minibatch_kmeans(vectors: np.ndarray, k: int, batch_size: int = 256, iterations: int = 100,
+                     seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Mini-batch k-means (Sculley, 2010) with greedy k-means++ seeding; returns (centroids, labels)."""
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    k = min(k, n)
+    vectors64 = vectors.astype(np.float64)
+    squared = (vectors64 ** 2).sum(axis=1)
+    centroids = [vectors[rng.integers(n)]]
+    closest = np.sum((vectors64 - centroids[0]) ** 2, axis=1)
+    # Greedy seeding: of several D^2-sampled candidates keep the one that lowers the potential most
+    trials = 2 + int(np.log(k))
+    for _ in range(1, k):
+        probabilities = closest / closest.sum() if closest.sum() else None
+        candidates = rng.choice(n, size=trials, p=probabilities)
+        distances = np.minimum(closest[None, :], np.maximum(
+            squared[candidates][:, None] - 2 * vectors64[candidates] @ vectors64.T + squared[None, :], 0
+        ))
+        best = int(np.argmin(distances.sum(axis=1)))
+        centroids.append(vectors[candidates[best]])
+        closest = distances[best]
+    centroids = np.array(centroids, dtype=np.float32)
+
+    counts = np.zeros(k)
+    for _ in range(iterations):
+        batch = vectors[rng.choice(n, size=min(batch_size, n), replace=False)]
+        # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2; the first term does not change the argmin
+        assignment = np.argmin((centroids ** 2).sum(axis=1) - 2 * batch @ centroids.T, axis=1)
+        for cluster in np.unique(assignment):
+            members = batch[assignment == cluster]
+            counts[cluster] += len(members)
+            # Per-centroid learning rate 1 / count, applied to the batch mean
+            rate = len(members) / counts[cluster]
+            centroids[cluster] += rate * (members.mean(axis=0) - centroids[cluster])
+
+    labels = np.argmin((centroids ** 2).sum(axis=1) - 2 * vectors @ centroids.T, axis=1)
+    return centroids, labels
+
+
+def _skill_pairs(c, resume_ids: np.ndarray) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Vocabulary and the (resume row, skill column) pairs of every resume in sorted resume_ids."""
+    c.execute("""
+        SELECT rs.resume_id, rs.skill_canonical FROM resume_skills rs
+        JOIN resumes r ON r.id = rs.resume_id
+        WHERE r.duplicate_of IS NULL
+    """)
+    pairs = c.fetchall()
+    if not pairs or not len(resume_ids):
+        return [], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    ids = np.array([p[0] for p in pairs], dtype=np.int64)
+    vocabulary, skill_index = np.unique(np.array([p[1] for p in pairs], dtype=object), return_inverse=True)
+    # resume_ids is sorted; skills of resumes without an embedding are dropped
+    rows = np.minimum(np.searchsorted(resume_ids, ids), len(resume_ids) - 1)
+    known = resume_ids[rows] == ids
+    return list(vocabulary), rows[known], skill_index[known]
+
+
+def load_snapshot(conn) -> Dict[str, Any]:
+    """Read everything the insights are computed from in one read transaction.
+
+    Only raw rows are fetched here; decoding and the computation happen after
+    the transaction ends, so writers are not held up by them.
+    """
+    c = conn.cursor()
+    c.execute("BEGIN")
+    try:
+        versions = _versions(c)
+        c.execute("""
+            SELECT id, embedding, experience_years FROM resumes
+            WHERE embedding IS NOT NULL AND embedding != '' AND duplicate_of IS NULL
+            ORDER BY id
+        """)
+        rows = c.fetchall()
+        resume_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        vocabulary, pair_rows, pair_skills = _skill_pairs(c, resume_ids)
+        c.execute("SELECT id, required_skills, openings FROM job_requisitions WHERE status = 'open'")
+        requisitions = c.fetchall()
+    finally:
+        conn.rollback()
+    return {
+        "versions": tuple(versions),
+        "resume_ids": resume_ids,
+        "embeddings": [row[1] for row in rows],
+        "years": np.array([row[2] if row[2] is not None else np.nan for row in rows], dtype=np.float64),
+        "vocabulary": vocabulary,
+        "pair_rows": pair_rows,
+        "pair_skills": pair_skills,
+        "requisitions": [(rid, json.loads(required), openings) for rid, required, openings in requisitions],
+    }
+
+
+def compute_insights(snapshot: Dict[str, Any], k: Optional[int] = None) -> Dict[str, Any]:
+    """Clusters, skill gaps and requisition matches of a snapshot, as rows for store_insights."""
+    k = k or int(os.getenv("TALENT_CLUSTERS", "8"))
+    coverage_needed = float(os.getenv("REQUISITION_MATCH_COVERAGE", "0.8"))
+    resume_ids, years = snapshot["resume_ids"], snapshot["years"]
+    vocabulary, pair_rows, pair_skills = snapshot["vocabulary"], snapshot["pair_rows"], snapshot["pair_skills"]
+    requisitions = snapshot["requisitions"]
+    column = {skill: j for j, skill in enumerate(vocabulary)}
+    # Resumes per skill, counted over the (resume, skill) pairs
+    supply_by_skill = np.bincount(pair_skills, minlength=len(vocabulary))
+
+    # Clusters
+    clusters = []
+    if len(resume_ids):
+        vectors = normalize(np.array([json.loads(e) for e in snapshot["embeddings"]], dtype=np.float32))
+        centroids, labels = minibatch_kmeans(vectors, k)
+        k = len(centroids)
+        sizes = np.bincount(labels, minlength=k)
+        skill_counts = np.bincount(
+            labels[pair_rows] * len(vocabulary) + pair_skills, minlength=k * len(vocabulary)
+        ).reshape(k, len(vocabulary))
+        known_years = ~np.isnan(years)
+        year_sums = np.bincount(labels[known_years], weights=years[known_years], minlength=k)
+        year_counts = np.bincount(labels[known_years], minlength=k)
+        similarity = vectors @ centroids.T
+        for cluster in range(k):
+            if not sizes[cluster]:
+                continue
+            members = np.flatnonzero(labels == cluster)
+            nearest = members[np.argsort(-similarity[members, cluster])[:5]]
+            top = np.argsort(-skill_counts[cluster])[:5]
+            clusters.append((
+                cluster,
+                int(sizes[cluster]),
+                round(float(year_sums[cluster] / year_counts[cluster]), 1) if year_counts[cluster] else None,
+                json.dumps([
+                    {"skill": vocabulary[j], "count": int(skill_counts[cluster, j])}
+                    for j in top if skill_counts[cluster, j] > 0
+                ]),
+                json.dumps([int(resume_ids[i]) for i in nearest]),
+            ))
+
+    # Skill gaps against open requisitions
+    gaps, matches = [], []
+    if requisitions:
+        demanded = sorted({skill for _, required, _ in requisitions for skill in required})
+        demand_index = {skill: j for j, skill in enumerate(demanded)}
+        required = np.zeros((len(requisitions), len(demanded)), dtype=np.float32)
+        for i, (_, skills_needed, _) in enumerate(requisitions):
+            required[i, [demand_index[skill] for skill in skills_needed]] = 1
+        openings = np.array([o for _, _, o in requisitions], dtype=np.float32)
+
+        demand = openings @ required
+        supply = np.array([supply_by_skill[column[skill]] if skill in column else 0 for skill in demanded])
+        for j, skill in enumerate(demanded):
+            gaps.append((skill, int(demand[j]), int(supply[j]), int(max(demand[j] - supply[j], 0)),
+                         round(float(min(supply[j] / demand[j], 1.0)), 3) if demand[j] else 1.0))
+
+        # Pairs of demanded skills, with the skill as a column of `required`
+        to_demanded = np.full(len(vocabulary), -1, dtype=np.int64)
+        for skill, j in demand_index.items():
+            if skill in column:
+                to_demanded[column[skill]] = j
+        demanded_skill = to_demanded[pair_skills]
+        wanted = demanded_skill >= 0
+        rows_wanted, demanded_skill = pair_rows[wanted], demanded_skill[wanted]
+        for i, (rid, skills_needed, _) in enumerate(requisitions):
+            # Required skills each resume has, for this requisition
+            hits = np.bincount(rows_wanted[required[i, demanded_skill] > 0], minlength=len(resume_ids))
+            qualified = int((hits / max(len(skills_needed), 1) >= coverage_needed).sum())
+            missing = [skill for skill in skills_needed if supply[demand_index[skill]] == 0]
+            matches.append((rid, qualified, json.dumps(missing)))
+
+    return {
+        "clusters": clusters,
+        "gaps": gaps,
+        "matches": matches,
+        "summary": {"resumes": len(resume_ids), "clusters": len(clusters), "skills": len(gaps),
+                    "requisitions": len(requisitions)},
+    }
+
+
+def store_insights(conn, insights: Dict[str, Any]) -> None:
+    """Replace the contents of the insight tables. The caller commits."""
+    c = conn.cursor()
+    c.execute("DELETE FROM talent_clusters")
+    c.executemany("""
+        INSERT INTO talent_clusters (cluster_id, size, average_experience, top_skills, representative_ids)
+        VALUES (?, ?, ?, ?, ?)
+    """, insights["clusters"])
+    c.execute("DELETE FROM skill_gaps")
+    c.executemany(
+        "INSERT INTO skill_gaps (skill, demand, supply, gap, coverage) VALUES (?, ?, ?, ?, ?)", insights["gaps"]
+    )
+    c.execute("DELETE FROM requisition_matches")
+    c.executemany(
+        "INSERT INTO requisition_matches (requisition_id, qualified, missing_skills) VALUES (?, ?, ?)",
+        insights["matches"]
+    )
+
+
+def _versions(c) -> Tuple[int, float]:
+    c.execute("""
+        SELECT MAX(COALESCE((SELECT MAX(row_version) FROM resumes), 0),
+                   COALESCE((SELECT MAX(row_version) FROM resume_tombstones), 0)),
+               COALESCE((SELECT MAX(updated_at) FROM job_requisitions), 0)
+    """)
+    return c.fetchone()
+
+
+def refresh_insights(db_path: str, min_interval: float = 0, force: bool = False,
+                     k: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Recompute the insights unless nothing changed or another process ran them recently.
+
+    The run is claimed under the write lock, so with several workers only one
+    recomputes per interval. The computation itself runs on a read snapshot
+    outside any transaction; the write lock is taken again only to swap in the
+    results. Returns the run summary, or None when skipped.
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        c.execute("SELECT started_at, row_version, requisitions_version FROM talent_insights_runs WHERE id = 1")
+        started_at, row_version, requisitions_version = c.fetchone()
+        versions = _versions(c)
+        now = time.time()
+        if not force and (now - started_at < min_interval or tuple(versions) == (row_version, requisitions_version)):
+            c.execute("ROLLBACK")
+            return None
+        c.execute("UPDATE talent_insights_runs SET started_at = ? WHERE id = 1", (now,))
+        c.execute("COMMIT")
+
+        snapshot = load_snapshot(conn)
+        insights = compute_insights(snapshot, k)
+        summary = insights["summary"]
+
+        c.execute("BEGIN IMMEDIATE")
+        store_insights(conn, insights)
+        # The versions read with the snapshot: anything written since triggers the next run
+        c.execute("""
+            UPDATE talent_insights_runs
+            SET computed_at = ?, row_version = ?, requisitions_version = ?, resumes = ?
+            WHERE id = 1
+        """, (time.time(), snapshot["versions"][0], snapshot["versions"][1], summary["resumes"]))
+        c.execute("COMMIT")
+        summary["seconds"] = round(time.time() - now, 3)
+        return summary
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.close()
+
+
+# -- reads ------------------------------------------------------------------
+
+def read_skill_gaps(conn, limit: int = 20) -> List[Dict[str, Any]]:
+    """Precomputed skill gaps, largest shortfall first."""
+    c = conn.cursor()
+    c.execute("""
+        SELECT skill, demand, supply, gap, coverage FROM skill_gaps
+        ORDER BY gap DESC, coverage, skill
+        LIMIT ?
+    """, (limit,))
+    return [
+        {"skill": skill, "demand": demand, "supply": supply, "gap": gap, "coverage": coverage}
+        for skill, demand, supply, gap, coverage in c.fetchall()
+    ]
+
+
+def read_talent_insights(conn) -> Dict[str, Any]:
+    """Clusters, per-requisition matches and the time of the last run."""
+    c = conn.cursor()
+    c.execute("""
+        SELECT cluster_id, size, average_experience, top_skills, representative_ids
+        FROM talent_clusters ORDER BY size DESC
+    """)
+    clusters = [
+        {"cluster_id": cid, "size": size, "average_experience": avg,
+         "top_skills": json.loads(top), "representative_ids": json.loads(reps)}
+        for cid, size, avg, top, reps in c.fetchall()
+    ]
+    c.execute("""
+        SELECT j.id, j.title, j.openings, m.qualified, m.missing_skills
+        FROM requisition_matches m JOIN job_requisitions j ON j.id = m.requisition_id
+        ORDER BY j.id
+    """)
+    requisitions = [
+        {"id": rid, "title": title, "openings": openings, "qualified_candidates": qualified,
+         "missing_skills": json.loads(missing)}
+        for rid, title, openings, qualified, missing in c.fetchall()
+    ]
+    c.execute("SELECT computed_at, resumes FROM talent_insights_runs WHERE id = 1")
+    computed_at, resumes = c.fetchone() or (None, 0)
+    return {"computed_at": computed_at, "resumes": resumes, "clusters": clusters, "requisitions": requisitions}
+
+
+class TalentInsightsScheduler:
+    """Daemon thread that refreshes the insights every `interval` seconds."""
+
+    def __init__(self, db_path: str, interval: Optional[float] = None):
+        self.db_path = db_path
+        self.interval = interval if interval is not None else float(
+            os.getenv("TALENT_INSIGHTS_INTERVAL_SECONDS", "3600")
+        )
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="talent-insights", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                summary = refresh_insights(self.db_path, min_interval=self.interval)
+                if summary is not None:
+                    logger.info("Talent insights refreshed", extra=summary)
+            except Exception:
+                logger.exception("Error refreshing talent insights")
+            self._stop.wait(self.interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute talent clusters and skill gaps.")
+    parser.add_argument("--db", default="data/resumes.db", help="Path to the resumes SQLite database")
+    parser.add_argument("--clusters", type=int, default=None, help="Number of clusters (default TALENT_CLUSTERS)")
+    parser.add_argument("--force", action="store_true", help="Recompute even if nothing changed")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    init_talent_insights(conn)
+    conn.commit()
+    conn.close()
+    summary = refresh_insights(args.db, force=args.force, k=args.clusters)
+    print(f"Talent insights {'refreshed: ' + str(summary) if summary else 'unchanged, skipped'}")
@@ -0,0 +1,72 @@
+"""Tombstones of deleted resumes, for processes that keep derived in-memory state.
+
+A deleted row leaves nothing behind for `row_version > last seen` polling to
+find, so each delete records the resume id with a fresh row_version here. Every
+worker's vector index applies the tombstones newer than its last sync, then the
+rows written since, in that order (an id can be reused by a later insert, which
+always carries a larger version than its tombstone).
+
+Tombstones are only needed until every consumer has synced past them. Each
+delete prunes the ones more than TOMBSTONE_RETENTION_VERSIONS (default 10000)
+row versions old and records the highest pruned version as the horizon; a
+consumer that last synced below the horizon may have missed deletes, so
+tombstones_since() tells it to rebuild from the resumes table instead.
+"""
+import os
+from typing import List, Optional
+
+
+def init_tombstones(conn) -> None:
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS resume_tombstones (
+            resume_id INTEGER NOT NULL,
+            row_version INTEGER PRIMARY KEY
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS resume_tombstone_horizon (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            row_version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    c.execute("INSERT OR IGNORE INTO resume_tombstone_horizon (id) VALUES (1)")
+
+
+def record_tombstone(c, resume_id: int, row_version: int) -> None:
+    """Record a delete and prune the tombstones that fell out of the retention window."""
+    c.execute(
+        "INSERT INTO resume_tombstones (resume_id, row_version) VALUES (?, ?)",
+        (resume_id, row_version)
+    )
+    prune_tombstones(c, row_version - int(os.getenv("TOMBSTONE_RETENTION_VERSIONS", "10000")))
+
+
+def prune_tombstones(c, through_version: int) -> int:
+    """Drop tombstones up to `through_version` and raise the horizon to it; returns the number dropped."""
+    if through_version <= 0:
+        return 0
+    c.execute("DELETE FROM resume_tombstones WHERE row_version <= ?", (through_version,))
+    dropped = c.rowcount
+    c.execute(
+        "UPDATE resume_tombstone_horizon SET row_version = MAX(row_version, ?) WHERE id = 1",
+        (through_version,)
+    )
+    return dropped
+
+
+def tombstones_since(c, row_version: int) -> Optional[List[tuple]]:
+    """(resume_id, row_version) of resumes deleted after `row_version`, oldest first.
+
+    None when tombstones after `row_version` have been pruned: the caller has to
+    rebuild its state from scratch.
+    """
+    c.execute("SELECT row_version FROM resume_tombstone_horizon WHERE id = 1")
+    horizon = c.fetchone()
+    if horizon is not None and row_version < horizon[0]:
+        return None
+    c.execute(
+        "SELECT resume_id, row_version FROM resume_tombstones WHERE row_version > ? ORDER BY row_version",
+        (row_version,)
+    )
+    return c.fetchall()
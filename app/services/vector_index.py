@@ -0,0 +1,475 @@
+"""In-memory vector index over resume embeddings with optional compression.
+
+The first pass scans a compact representation of every embedding:
+
+    none  float32 vectors (exact, 4 bytes per dimension)
+    int8  scalar quantization with a per-dimension scale (1 byte per dimension)
+    pq    product quantization, one uint8 code per sub-vector (e.g. 48 bytes for 384 dims)
+
+For int8 and pq the best `rerank_candidates` hits are then re-scored exactly
+against float32 vectors fetched on demand (from SQLite by default), so only
+the compressed codes have to stay resident in every worker.
+
+Removing a vector only tombstones its slot (it is masked out of every scan);
+once tombstones make up VECTOR_COMPACT_RATIO of the slots the live rows are
+copied down into fresh arrays. Neither path retrains the quantizer.
+
+Configuration (environment):
+    VECTOR_COMPRESSION        none (default), int8 or pq
+    VECTOR_RERANK_CANDIDATES  exact re-scoring pool for compressed indexes (default 200)
+    PQ_SUBVECTORS             number of PQ sub-vectors (default 48, must divide the dimension)
+    VECTOR_COMPACT_RATIO      fraction of tombstoned slots that triggers compaction (default 0.2)
+
+Compare memory and recall@k of the configurations with:
+
+    python -m app.services.vector_index evaluate [--db data/resumes.db | --synthetic 100000] [--k 10]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+COMPRESSIONS = ("none", "int8", "pq")
+SCAN_CHUNK = 16384  # rows scored per block, bounds the temporary float32 copy of compressed codes
+PQ_TRAIN_SAMPLE = 10000  # vectors used to train the PQ codebooks
+
+# Returns the exact float32 vectors for the requested ids (missing ids are left out)
+ExactVectors = Callable[[Sequence[int]], Dict[int, np.ndarray]]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize row vectors so dot products are cosine similarities."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        norm = np.linalg.norm(vectors)
+        return vectors / norm if norm else vectors
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """Plain Lloyd's k-means returning the centroids (used to train PQ codebooks)."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        # ||x||^2 is the same for every centroid, so it is left out of the argmin
+        distances = (centroids ** 2).sum(axis=1)[None, :] - 2 * data @ centroids.T
+        assign = distances.argmin(axis=1)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.stack([np.bincount(assign, weights=data[:, d], minlength=k) for d in range(data.shape[1])], axis=1)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+class VectorIndex:
+    """Cosine similarity index over (resume id, embedding) pairs."""
+
+    def __init__(self, compression: str = "none", rerank_candidates: int = 200,
+                 pq_subvectors: int = 48, exact_vectors: Optional[ExactVectors] = None,
+                 compact_ratio: float = 0.2):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown vector compression: {compression}")
+        if compression != "none" and exact_vectors is None:
+            raise ValueError("Compressed indexes need an exact_vectors source for re-scoring")
+        self.compression = compression
+        self.rerank_candidates = rerank_candidates
+        self.pq_subvectors = pq_subvectors
+        self.exact_vectors = exact_vectors
+        self.compact_ratio = compact_ratio
+        self.dim: Optional[int] = None
+
+        self._lock = threading.Lock()
+        # Rows live in two segments: the base written by build() (possibly a
+        # read-only memory map shared with other processes) and a growable delta
+        # for upserts. A slot number below len(base) is a base row, anything
+        # else is delta row (slot - len(base)).
+        self._base_ids = np.empty(0, dtype=np.int64)
+        self._base_codes: Optional[np.ndarray] = None
+        self._base_live = np.empty(0, dtype=bool)  # False marks a tombstoned slot
+        self._ids = np.empty(0, dtype=np.int64)
+        self._codes: Optional[np.ndarray] = None
+        self._live = np.empty(0, dtype=bool)
+        self._size = 0
+        self._slots: Dict[int, int] = {}
+        self._dead_base = 0
+        self._dead = 0
+
+        # Quantizer state
+        self._scale: Optional[np.ndarray] = None       # int8: per-dimension scale
+        self._codebooks: Optional[np.ndarray] = None   # pq: (subvectors, centroids, sub_dim)
+
+    @classmethod
+    def from_env(cls, exact_vectors: Optional[ExactVectors] = None) -> "VectorIndex":
+        return cls(
+            compression=os.getenv("VECTOR_COMPRESSION", "none"),
+            rerank_candidates=int(os.getenv("VECTOR_RERANK_CANDIDATES", "200")),
+            pq_subvectors=int(os.getenv("PQ_SUBVECTORS", "48")),
+            exact_vectors=exact_vectors,
+            compact_ratio=float(os.getenv("VECTOR_COMPACT_RATIO", "0.2"))
+        )
+
+    def __len__(self) -> int:
+        return len(self._base_ids) + self._size - self._dead_base - self._dead
+
+    # -- quantization -------------------------------------------------------
+
+    def _train(self, vectors: np.ndarray) -> None:
+        self.dim = vectors.shape[1]
+        if self.compression == "int8":
+            max_abs = np.abs(vectors).max(axis=0) if len(vectors) else np.ones(self.dim, dtype=np.float32)
+            self._scale = (np.where(max_abs == 0, 1, max_abs) / 127).astype(np.float32)
+        elif self.compression == "pq":
+            if self.dim % self.pq_subvectors:
+                raise ValueError(f"PQ_SUBVECTORS={self.pq_subvectors} does not divide dimension {self.dim}")
+            sub_dim = self.dim // self.pq_subvectors
+            sample = vectors
+            if len(sample) > PQ_TRAIN_SAMPLE:
+                sample = sample[np.random.default_rng(0).choice(len(sample), PQ_TRAIN_SAMPLE, replace=False)]
+            if not len(sample):
+                sample = np.zeros((1, self.dim), dtype=np.float32)
+            books = []
+            for m in range(self.pq_subvectors):
+                centroids = kmeans(sample[:, m * sub_dim:(m + 1) * sub_dim], 256, iterations=15)
+                # Pad to 256 centroids so every code is valid even for tiny training sets
+                padded = np.zeros((256, sub_dim), dtype=np.float32)
+                padded[:len(centroids)] = centroids
+                padded[len(centroids):] = centroids[0]
+                books.append(padded)
+            self._codebooks = np.stack(books)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.compression == "none":
+            return vectors.astype(np.float32)
+        if self.compression == "int8":
+            return np.clip(np.rint(vectors / self._scale), -127, 127).astype(np.int8)
+        sub_dim = self.dim // self.pq_subvectors
+        codes = np.empty((len(vectors), self.pq_subvectors), dtype=np.uint8)
+        for m in range(self.pq_subvectors):
+            sub = vectors[:, m * sub_dim:(m + 1) * sub_dim]
+            book = self._codebooks[m]
+            distances = (sub ** 2).sum(axis=1)[:, None] - 2 * sub @ book.T + (book ** 2).sum(axis=1)[None, :]
+            codes[:, m] = distances.argmin(axis=1)
+        return codes
+
+    # -- maintenance --------------------------------------------------------
+
+    def build(self, ids: Sequence[int], vectors: np.ndarray, shared: bool = False) -> None:
+        """Replace the index contents, (re)training the quantizer on `vectors`.
+
+        With `shared`, `vectors` must already be L2-normalized float32 (e.g. a
+        read-only memory map from EmbeddingStore) and, for the uncompressed
+        index, is scanned in place instead of copied.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(ids) and not shared:
+            vectors = normalize(vectors.reshape(len(ids), -1))
+        with self._lock:
+            if len(ids):
+                self._train(vectors)
+                base = vectors if shared and self.compression == "none" else self._encode(vectors)
+            else:
+                base = None
+            self._base_ids = np.asarray(ids, dtype=np.int64)
+            self._base_codes = base
+            self._base_live = np.ones(len(ids), dtype=bool)
+            self._ids = np.empty(0, dtype=np.int64)
+            self._codes = np.empty((0,) + base.shape[1:], dtype=base.dtype) if base is not None else None
+            self._live = np.empty(0, dtype=bool)
+            self._size = 0
+            self._slots = {int(i): row for row, i in enumerate(self._base_ids)}
+            self._dead_base = 0
+            self._dead = 0
+
+    def upsert(self, ids: Sequence[int], vectors: np.ndarray) -> None:
+        """Insert new vectors or overwrite existing ones in place."""
+        if not len(ids):
+            return
+        vectors = normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1))
+        if self._codes is None:
+            self.build(ids, vectors)
+            return
+        with self._lock:
+            codes = self._encode(vectors)
+            base_size = len(self._base_ids)
+            for resume_id, code in zip(ids, codes):
+                resume_id = int(resume_id)
+                row = self._slots.get(resume_id)
+                if row is not None and row < base_size:
+                    if self._base_codes.flags.writeable:
+                        self._base_codes[row] = code
+                        continue
+                    # A shared base is read-only: retire the old slot and append
+                    self._base_live[row] = False
+                    self._dead_base += 1
+                    row = None
+                if row is None:
+                    row = self._append_slot(resume_id)
+                self._codes[row - base_size] = code
+
+    def _append_slot(self, resume_id: int) -> int:
+        # Grow storage geometrically so appends are amortized O(1)
+        if self._size == len(self._ids):
+            capacity = max(16, 2 * len(self._ids))
+            ids = np.empty(capacity, dtype=np.int64)
+            ids[:self._size] = self._ids[:self._size]
+            codes = np.empty((capacity,) + self._codes.shape[1:], dtype=self._codes.dtype)
+            codes[:self._size] = self._codes[:self._size]
+            live = np.zeros(capacity, dtype=bool)
+            live[:self._size] = self._live[:self._size]
+            self._ids, self._codes, self._live = ids, codes, live
+        row = self._size
+        self._ids[row] = resume_id
+        self._live[row] = True
+        self._size += 1
+        slot = len(self._base_ids) + row
+        self._slots[resume_id] = slot
+        return slot
+
+    def remove(self, ids: Iterable[int]) -> int:
+        """Tombstone the given ids; returns how many were present."""
+        removed = 0
+        with self._lock:
+            base_size = len(self._base_ids)
+            for resume_id in ids:
+                slot = self._slots.pop(int(resume_id), None)
+                if slot is None:
+                    continue
+                if slot < base_size:
+                    self._base_live[slot] = False
+                    self._dead_base += 1
+                else:
+                    self._live[slot - base_size] = False
+                    self._dead += 1
+                removed += 1
+            compactable = self._dead + (self._dead_base if self._base_writable() else 0)
+            if compactable and compactable >= self.compact_ratio * (base_size + self._size):
+                self._compact()
+        return removed
+
+    def compact(self) -> None:
+        """Drop tombstoned slots now instead of waiting for the ratio to be reached."""
+        with self._lock:
+            self._compact()
+
+    def _base_writable(self) -> bool:
+        return self._base_codes is None or self._base_codes.flags.writeable
+
+    def _compact(self) -> None:
+        # Fresh arrays rather than in-place moves, so scans holding the old ones stay valid
+        keep = np.flatnonzero(self._live[:self._size])
+        ids, codes = self._ids[keep], self._codes[keep]
+        if self._base_writable():
+            # Private base: fold the live delta rows into it
+            base_keep = np.flatnonzero(self._base_live)
+            self._base_ids = np.concatenate([self._base_ids[base_keep], ids])
+            if self._base_codes is not None:
+                self._base_codes = np.concatenate([self._base_codes[base_keep], codes])
+            self._base_live = np.ones(len(self._base_ids), dtype=bool)
+            self._dead_base = 0
+            ids, codes = ids[:0], codes[:0]
+        # A shared base keeps its tombstones until the next generation is built
+        self._ids, self._codes = ids, codes
+        self._live = np.ones(len(ids), dtype=bool)
+        self._size = len(ids)
+        self._dead = 0
+        self._slots = {int(i): row for row, i in enumerate(self._base_ids) if self._base_live[row]}
+        self._slots.update({int(i): len(self._base_ids) + row for row, i in enumerate(self._ids)})
+
+    # -- search -------------------------------------------------------------
+
+    def _approx_scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Approximate cosine scores of (m, dim) normalized queries against a block of codes."""
+        if self.compression == "none":
+            return queries @ codes.T
+        if self.compression == "int8":
+            return (queries * self._scale) @ codes.T.astype(np.float32)
+        # Asymmetric distance: per-query lookup tables of sub-vector dot products
+        sub_dim = self.dim // self.pq_subvectors
+        sub_queries = queries.reshape(len(queries), self.pq_subvectors, sub_dim)
+        tables = np.einsum("qms,mcs->qmc", sub_queries, self._codebooks)
+        columns = np.arange(self.pq_subvectors)
+        return np.stack([table[columns, codes].sum(axis=1) for table in tables])
+
+    def _first_pass(self, queries: np.ndarray, k: int,
+                    allowed: Optional[List[Optional[Iterable[int]]]] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Top-k (ids, scores) per query from the compressed scan, best first."""
+        with self._lock:
+            segments = [
+                (self._base_ids, self._base_codes, self._base_live.copy() if self._dead_base else None),
+                (self._ids[:self._size], self._codes[:self._size] if self._codes is not None else None,
+                 self._live[:self._size].copy() if self._dead else None),
+            ]
+        # Tombstoned rows and rows outside a query's allowed set score -inf and are dropped below
+        allowed_ids = [
+            None if subset is None else np.fromiter(subset, dtype=np.int64)
+            for subset in (allowed or [None] * len(queries))
+        ]
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        for ids, codes, live in segments:
+            for start in range(0, len(ids), SCAN_CHUNK):
+                block_ids = ids[start:start + SCAN_CHUNK]
+                block = self._approx_scores(queries, codes[start:start + SCAN_CHUNK])
+                if live is not None or any(a is not None for a in allowed_ids):
+                    mask = np.ones(block.shape, dtype=bool)
+                    if live is not None:
+                        mask &= live[start:start + SCAN_CHUNK]
+                    for row, subset in enumerate(allowed_ids):
+                        if subset is not None:
+                            mask[row] &= np.isin(block_ids, subset)
+                    block = np.where(mask, block, -np.inf)
+                scores = np.concatenate([best_scores, block], axis=1)
+                candidates = np.concatenate([best_ids, np.broadcast_to(block_ids, block.shape)], axis=1)
+                if scores.shape[1] > k:
+                    keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                    scores = np.take_along_axis(scores, keep, axis=1)
+                    candidates = np.take_along_axis(candidates, keep, axis=1)
+                best_scores, best_ids = scores, candidates
+
+        results = []
+        for scores, ids in zip(best_scores, best_ids):
+            order = np.argsort(-scores)
+            order = order[np.isfinite(scores[order])]
+            results.append((ids[order], scores[order]))
+        return results
+
+    def _rescore(self, query: np.ndarray, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        exact = self.exact_vectors([int(i) for i in ids])
+        found = [int(i) for i in ids if int(i) in exact]
+        if not found:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        vectors = normalize(np.stack([exact[i] for i in found]))
+        scores = vectors @ query
+        order = np.argsort(-scores)
+        return np.asarray(found, dtype=np.int64)[order], scores[order]
+
+    def search_many(self, queries: np.ndarray, k: int,
+                    allowed: Optional[List[Optional[Iterable[int]]]] = None) -> List[List[Tuple[int, float]]]:
+        """Top-k (resume id, cosine score) lists for a batch of queries, from one scan.
+
+        `allowed` optionally restricts each query to a set of resume ids (None means
+        no restriction for that query).
+        """
+        queries = normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        if not len(self):
+            return [[] for _ in queries]
+        pool = k if self.compression == "none" else max(k, self.rerank_candidates)
+        first_pass = self._first_pass(queries, min(pool, len(self._base_ids) + self._size), allowed)
+
+        results = []
+        for query, (ids, scores) in zip(queries, first_pass):
+            if self.compression != "none":
+                ids, scores = self._rescore(query, ids)
+            results.append([(int(i), float(s)) for i, s in zip(ids[:k], scores[:k])])
+        return results
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Top-k (resume id, cosine score) for one query."""
+        return self.search_many(np.asarray(query)[None, :], k)[0]
+
+    def memory_bytes(self) -> int:
+        """Bytes of the codes, ids and quantizer state (tombstoned slots and a shared base included)."""
+        rows = len(self._base_ids) + self._size
+        total = rows * 9  # int64 id and live flag
+        for codes, count in ((self._base_codes, len(self._base_ids)), (self._codes, self._size)):
+            if codes is not None:
+                total += count * int(np.prod(codes.shape[1:])) * codes.itemsize
+        if self._scale is not None:
+            total += self._scale.nbytes
+        if self._codebooks is not None:
+            total += self._codebooks.nbytes
+        return total
+
+
+def load_embeddings(db_path: str, ids: Optional[Iterable[int]] = None) -> Tuple[List[int], np.ndarray]:
+    """Read (ids, float32 matrix) of stored embeddings, optionally only for the given ids."""
+    conn = sqlite3.connect(db_path)
+    try:
+        c = conn.cursor()
+        if ids is None:
+            c.execute("SELECT id, embedding FROM resumes WHERE embedding IS NOT NULL AND embedding != ''")
+            rows = c.fetchall()
+        else:
+            ids = list(ids)
+            rows = []
+            # Stay under SQLite's bound parameter limit
+            for start in range(0, len(ids), 900):
+                chunk = ids[start:start + 900]
+                placeholders = ",".join(["?"] * len(chunk))
+                c.execute(f"""
+                    SELECT id, embedding FROM resumes
+                    WHERE id IN ({placeholders}) AND embedding IS NOT NULL AND embedding != ''
+                """, chunk)
+                rows.extend(c.fetchall())
+    finally:
+        conn.close()
+    if not rows:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    return [row[0] for row in rows], np.array([json.loads(row[1]) for row in rows], dtype=np.float32)
+
+
+def evaluate_compression(vectors: np.ndarray, queries: np.ndarray, k: int = 10,
+                         configs: Optional[List[Dict]] = None) -> List[Dict]:
+    """Report memory and recall@k (against exact search) for each index configuration."""
+    vectors = normalize(vectors)
+    ids = list(range(len(vectors)))
+    exact = VectorIndex("none")
+    exact.build(ids, vectors)
+    truth = [set(i for i, _ in hits) for hits in exact.search_many(queries, k)]
+    lookup = lambda wanted: {i: vectors[i] for i in wanted}
+
+    configs = configs or [
+        {"compression": "none"},
+        {"compression": "int8", "rerank_candidates": 0},
+        {"compression": "int8", "rerank_candidates": 200},
+        {"compression": "pq", "rerank_candidates": 0},
+        {"compression": "pq", "rerank_candidates": 200},
+    ]
+    report = []
+    for config in configs:
+        index = VectorIndex(exact_vectors=lookup, **config)
+        index.build(ids, vectors)
+        if config["compression"] != "none" and not config.get("rerank_candidates"):
+            # First pass only, to show what re-scoring buys
+            hits = [[int(i) for i in found[:k]] for found, _ in index._first_pass(normalize(queries), k)]
+        else:
+            hits = [[i for i, _ in found] for found in index.search_many(queries, k)]
+        recall = np.mean([len(truth_set & set(found)) / max(1, len(truth_set))
+                          for truth_set, found in zip(truth, hits)])
+        report.append({
+            **config,
+            "vectors": len(vectors),
+            "memory_bytes": index.memory_bytes(),
+            "bytes_per_vector": round(index.memory_bytes() / max(1, len(vectors)), 1),
+            f"recall@{k}": round(float(recall), 4),
+        })
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report memory and recall@k of vector index configurations.")
+    parser.add_argument("command", choices=["evaluate"])
+    parser.add_argument("--db", default="data/resumes.db")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Use this many random clustered vectors instead of stored embeddings")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.synthetic:
+        centers = rng.normal(size=(64, 384)).astype(np.float32)
+        vectors = centers[rng.integers(0, 64, args.synthetic)] + 0.5 * rng.normal(size=(args.synthetic, 384))
+    else:
+        _, vectors = load_embeddings(args.db)
+        if not len(vectors):
+            raise SystemExit(f"No embeddings found in {args.db}; use --synthetic N")
+    sample = vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)]
+    queries = sample + 0.1 * rng.normal(size=sample.shape)
+    print(json.dumps(evaluate_compression(vectors, queries.astype(np.float32), k=args.k), indent=2))
@@ -0,0 +1,5 @@
+"""Benchmark suite of the search engine, the listing and dashboard endpoints and the upload path.
+
+See __main__.py for the command line, suite.py for the benchmarks and
+corpus.py for the synthetic corpus generator.
+"""
@@ -0,0 +1,147 @@
+"""Command line driver of the benchmark suite.
+
+    python -m benchmarks run [--sizes 1000,10000] [--iterations 50] [--encoder hash|model]
+                             [--output benchmarks/baseline.json]
+    python -m benchmarks compare --baseline benchmarks/baseline.json [--current results.json]
+                                 [--threshold 0.2] [--metric p50_ms]
+
+`run` benchmarks every corpus size in its own subprocess and scratch directory
+(see suite.py) and writes the combined results as JSON. `compare` checks a
+result file against a baseline, running the suite first if no --current file
+is given with the baseline's own settings. It exits with status 1 when a
+benchmark got slower than the baseline by more than the threshold (a
+fraction: 0.2 means 20% slower).
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_suite(sizes: List[int], seed: int = 0, iterations: int = 50, encoder: str = "hash",
+              only: Optional[List[str]] = None, keep: bool = False) -> Dict[str, Any]:
+    """Run the suite for each size in a fresh subprocess and scratch directory."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")]))
+    runs = {}
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix=f"peoplegpt-bench-{size}-")
+        output = os.path.join(workdir, "result.json")
+        command = [sys.executable, "-m", "benchmarks.suite", "--size", str(size), "--seed", str(seed),
+                   "--iterations", str(iterations), "--encoder", encoder, "--output", output]
+        if only:
+            command += ["--only", *only]
+        print(f"Benchmarking {size} resumes in {workdir}", file=sys.stderr)
+        try:
+            subprocess.run(command, cwd=workdir, env=env, check=True)
+            with open(output) as f:
+                runs[str(size)] = json.load(f)
+        finally:
+            if not keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "iterations": iterations,
+            "encoder": encoder,
+        },
+        "runs": runs,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.2,
+            metric: str = "p50_ms") -> List[Dict[str, Any]]:
+    """One row per benchmark present in both result sets, flagged when it regressed past the threshold."""
+    rows = []
+    for size, run in current["runs"].items():
+        base_run = baseline["runs"].get(size)
+        if base_run is None:
+            continue
+        for name, stats in run["results"].items():
+            base = base_run["results"].get(name)
+            if base is None or not base.get(metric):
+                continue
+            change = stats[metric] / base[metric] - 1
+            rows.append({
+                "benchmark": name, "size": int(size), "baseline": base[metric], "current": stats[metric],
+                "change": round(change, 4), "regressed": change > threshold,
+            })
+    return rows
+
+
+def _print_table(rows: List[Dict[str, Any]], metric: str) -> None:
+    print(f"{'benchmark':<24}{'size':>10}{'baseline ' + metric:>20}{'current':>12}{'change':>10}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regressed"] else ""
+        print(f"{row['benchmark']:<24}{row['size']:>10}{row['baseline']:>20.3f}{row['current']:>12.3f}"
+              f"{row['change']:>+10.1%}{flag}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="PeopleGPT benchmark suite.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the suite and write the results as JSON")
+    run_parser.add_argument("--sizes", default="1000", help="comma separated corpus sizes (1000 to 1000000)")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--iterations", type=int, default=50, help="timed operations per benchmark")
+    run_parser.add_argument("--encoder", choices=["hash", "model"], default="hash",
+                            help="hash: model-free hashing encoder; model: the configured embedding model")
+    run_parser.add_argument("--only", nargs="*", help="run only these benchmarks")
+    run_parser.add_argument("--output", default=os.path.join("benchmarks", "baseline.json"))
+    run_parser.add_argument("--keep", action="store_true", help="keep the scratch directories")
+
+    compare_parser = commands.add_parser("compare", help="compare results against a baseline")
+    compare_parser.add_argument("--baseline", default=os.path.join("benchmarks", "baseline.json"))
+    compare_parser.add_argument("--current", help="result file to check (default: run the suite now)")
+    compare_parser.add_argument("--threshold", type=float, default=0.2,
+                                help="allowed slowdown as a fraction of the baseline (default 0.2)")
+    compare_parser.add_argument("--metric", default="p50_ms", choices=["mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+    compare_parser.add_argument("--output", help="also write the current results here")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        sizes = [int(size) for size in args.sizes.split(",")]
+        results = run_suite(sizes, args.seed, args.iterations, args.encoder, args.only, args.keep)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        meta = baseline["meta"]
+        current = run_suite([int(size) for size in baseline["runs"]], meta["seed"], meta["iterations"],
+                            meta["encoder"])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+
+    rows = compare(baseline, current, args.threshold, args.metric)
+    _print_table(rows, args.metric)
+    regressions = [row for row in rows if row["regressed"]]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
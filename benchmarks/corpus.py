@@ -0,0 +1,240 @@
+"""Deterministic synthetic resume corpus.
+
+`generate_resumes(n, seed)` yields the same n resumes for the same seed, in the
+shape store_resume takes: a role-dependent skill set, "N years" experience
+drawn from a seniority mix, education, a contact block with a city and
+country, and a summary. Skills, roles and locations follow skewed weights, so
+skill filters, facets and dashboard aggregates see realistic cardinalities
+rather than a uniform spread.
+
+`load_corpus` bulk-loads a corpus: rows are encoded in batches and inserted
+with executemany, then the derived tables (aggregates, skill index, LSH
+buckets) are rebuilt once. This is much faster than store_resume per row,
+which is benchmarked separately.
+"""
+import json
+import random
+import re
+import sqlite3
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+ROLES = [
+    # (title, weight, core skills, optional skills)
+    ("Backend Engineer", 18, ["Python", "SQL", "REST APIs"],
+     ["Django", "FastAPI", "Flask", "PostgreSQL", "Redis", "Docker", "Kubernetes", "AWS", "Go", "Java",
+      "Spring Boot", "Kafka", "gRPC", "Microservices"]),
+    ("Frontend Engineer", 14, ["JavaScript", "HTML", "CSS"],
+     ["React", "TypeScript", "Vue.js", "Angular", "Next.js", "Redux", "Tailwind CSS", "Webpack", "Jest",
+      "GraphQL", "Figma"]),
+    ("Full Stack Developer", 12, ["JavaScript", "Node.js", "SQL"],
+     ["React", "TypeScript", "MongoDB", "Express", "PostgreSQL", "Docker", "AWS", "GraphQL", "Python"]),
+    ("Data Scientist", 10, ["Python", "Machine Learning", "Statistics"],
+     ["Pandas", "NumPy", "Scikit-learn", "TensorFlow", "PyTorch", "SQL", "Deep Learning", "NLP", "Tableau",
+      "R", "Spark"]),
+    ("ML Engineer", 7, ["Python", "Machine Learning", "Deep Learning"],
+     ["PyTorch", "TensorFlow", "MLOps", "Kubernetes", "Docker", "AWS", "Spark", "NLP", "Computer Vision",
+      "ONNX", "CUDA"]),
+    ("DevOps Engineer", 9, ["Linux", "Docker", "CI/CD"],
+     ["Kubernetes", "Terraform", "AWS", "Azure", "GCP", "Ansible", "Jenkins", "Prometheus", "Bash",
+      "Python", "Helm"]),
+    ("Mobile Developer", 7, ["Mobile Development"],
+     ["Kotlin", "Swift", "Android", "iOS", "React Native", "Flutter", "Dart", "Firebase", "Java"]),
+    ("QA Engineer", 6, ["Testing", "Test Automation"],
+     ["Selenium", "Cypress", "Python", "Java", "JIRA", "Postman", "Jest", "CI/CD", "Performance Testing"]),
+    ("Data Engineer", 8, ["Python", "SQL", "ETL"],
+     ["Spark", "Airflow", "Kafka", "Snowflake", "AWS", "Hadoop", "Scala", "dbt", "PostgreSQL", "Databricks"]),
+    ("Financial Analyst", 5, ["Financial Modeling", "MS Excel"],
+     ["Valuation", "FactSet", "Bloomberg", "Reconciliation", "SQL", "Power BI", "Accounting", "Investran"]),
+    ("Product Manager", 4, ["Product Management", "Agile"],
+     ["Roadmapping", "JIRA", "SQL", "A/B Testing", "Stakeholder Management", "Scrum", "Analytics"]),
+]
+
+LOCATIONS = [
+    # (city, country, weight)
+    ("Bangalore", "India", 16), ("Hyderabad", "India", 10), ("Pune", "India", 7), ("Chennai", "India", 6),
+    ("Mumbai", "India", 6), ("Delhi", "India", 5), ("Noida", "India", 3), ("Gurgaon", "India", 4),
+    ("San Francisco", "USA", 5), ("New York", "USA", 5), ("Seattle", "USA", 3), ("Austin", "USA", 2),
+    ("London", "UK", 4), ("Berlin", "Germany", 3), ("Amsterdam", "Netherlands", 2), ("Toronto", "Canada", 3),
+    ("Singapore", "Singapore", 3), ("Sydney", "Australia", 2), ("Dubai", "UAE", 2), ("Remote", "", 1),
+]
+
+# (label, weight, min years, max years)
+SENIORITY = [("Junior", 35, 0, 2), ("Mid-level", 40, 2, 6), ("Senior", 20, 6, 12), ("Principal", 5, 12, 25)]
+
+FIRST_NAMES = ["Aarav", "Priya", "Rahul", "Ananya", "Vikram", "Sneha", "Arjun", "Kavya", "Rohan", "Meera",
+               "John", "Emily", "Michael", "Sarah", "David", "Olivia", "Wei", "Mei", "Carlos", "Sofia",
+               "Ahmed", "Fatima", "Lukas", "Anna", "Kenji", "Yuki", "Chaitanya", "Divya", "Karthik", "Nisha"]
+LAST_NAMES = ["Sharma", "Patel", "Reddy", "Iyer", "Nair", "Gupta", "Singh", "Rao", "Kumar", "Menon",
+              "Smith", "Johnson", "Brown", "Garcia", "Miller", "Chen", "Wang", "Müller", "Rossi", "Tanaka",
+              "Khan", "Silva", "Kowalski", "Novak", "Dubois"]
+UNIVERSITIES = ["IIT Bombay", "IIT Madras", "NIT Trichy", "BITS Pilani", "VIT Vellore", "Anna University",
+                "Stanford University", "MIT", "University of Toronto", "TU Munich", "University of London",
+                "National University of Singapore", "JNTU Hyderabad", "Pune University"]
+DEGREES = ["B.Tech in Computer Science", "B.E. in Information Technology", "M.Tech in Computer Science",
+           "M.S. in Data Science", "B.Sc in Mathematics", "MBA in Finance", "B.Com", "M.Sc in Statistics"]
+COMPANIES = ["Infosys", "TCS", "Wipro", "Flipkart", "Swiggy", "Google", "Microsoft", "Amazon", "Zoho",
+             "Freshworks", "Razorpay", "Accenture", "Deloitte", "Goldman Sachs", "a Series B startup"]
+
+
+def _weighted(rng: random.Random, items: Sequence, weight_index: int):
+    return rng.choices(items, weights=[item[weight_index] for item in items])[0]
+
+
+def generate_resume(index: int, seed: int = 0) -> Dict[str, Any]:
+    """The `index`-th resume of the corpus for `seed`; independent of every other index."""
+    rng = random.Random(f"{seed}:{index}")
+    title, _, core, optional = _weighted(rng, ROLES, 1)
+    level, _, low, high = _weighted(rng, SENIORITY, 1)
+    city, country, _ = _weighted(rng, LOCATIONS, 2)
+    years = rng.randint(low, high)
+    skills = core + rng.sample(optional, rng.randint(2, min(8, len(optional))))
+    rng.shuffle(skills)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    companies = rng.sample(COMPANIES, min(1 + years // 4, 3))
+    location = f"{city}, {country}" if country else city
+    return {
+        # The index keeps names unique; store_resume upserts by name
+        "name": f"{first} {last} {index:07d}",
+        "skills": skills,
+        "experience": f"{years} years" if years != 1 else "1 year",
+        "education": f"{rng.choice(DEGREES)}, {rng.choice(UNIVERSITIES)}",
+        "contact": {
+            "email": f"{first.lower()}.{last.lower()}{index}@example.com",
+            "phone": f"+91 9{rng.randint(100000000, 999999999)}",
+            "location": location,
+        },
+        "summary": (
+            f"{level} {title} with {years} years of experience at {', '.join(companies)}. "
+            f"Skilled in {', '.join(skills[:4])}; "
+            f"{rng.choice(['led', 'built', 'shipped', 'maintained', 'scaled'])} "
+            f"{rng.choice(['data pipelines', 'customer-facing products', 'internal platforms', 'APIs', 'dashboards', 'ML models'])} "
+            f"for {rng.choice(['fintech', 'e-commerce', 'healthcare', 'logistics', 'SaaS', 'media'])} teams."
+        ),
+        "created_at": str(1700000000 + index),
+    }
+
+
+def generate_resumes(n: int, seed: int = 0, start: int = 0) -> Iterator[Dict[str, Any]]:
+    for index in range(start, start + n):
+        yield generate_resume(index, seed)
+
+
+def resume_text(resume: Dict[str, Any]) -> str:
+    """Plain-text rendering of a resume, as it would be extracted from an uploaded PDF."""
+    contact = resume["contact"]
+    return "\n".join([
+        resume["name"],
+        f"{contact['email']} | {contact['phone']} | {contact['location']}",
+        "",
+        "SUMMARY",
+        resume["summary"],
+        "",
+        "SKILLS",
+        ", ".join(resume["skills"]),
+        "",
+        "EXPERIENCE",
+        resume["experience"],
+        "",
+        "EDUCATION",
+        resume["education"],
+    ])
+
+
+def search_queries(n: int, seed: int = 0) -> List[str]:
+    """Recruiter-style queries over the corpus vocabulary."""
+    rng = random.Random(f"{seed}:queries")
+    queries = []
+    for _ in range(n):
+        title, _, core, optional = _weighted(rng, ROLES, 1)
+        level = _weighted(rng, SENIORITY, 1)[0]
+        city = _weighted(rng, LOCATIONS, 2)[0]
+        skills = rng.sample(core + optional, 2)
+        queries.append(f"{level} {title} with {skills[0]} and {skills[1]} in {city}")
+    return queries
+
+
+class HashingEncoder:
+    """Model-free stand-in for the sentence encoder: signed feature hashing of words and bigrams.
+
+    Deterministic and fast, so benchmarks of the storage and retrieval code are
+    not dominated by (or dependent on downloading) the embedding model. Same
+    interface as SentenceTransformer.encode.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        words = re.findall(r"\w+", text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not features:
+            return vector
+        hashes = np.array([zlib.crc32(f.encode("utf-8")) for f in features], dtype=np.uint32)
+        signs = np.where(hashes & 1, 1.0, -1.0).astype(np.float32)
+        np.add.at(vector, (hashes >> 1) % self.dim, signs)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            return self._encode_one(texts)
+        return np.array([self._encode_one(text) for text in texts], dtype=np.float32).reshape(-1, self.dim)
+
+
+def load_corpus(engine, n: int, seed: int = 0, batch_size: int = 1000,
+                progress: Optional[Callable[[int], None]] = None) -> int:
+    """Bulk-load `n` generated resumes into the engine's database; returns the number of rows."""
+    # Imported here: the caller chooses the working directory before the app is imported
+    from app.services.dashboard_aggregates import rebuild_aggregates
+    from app.services.dedup import rebuild_lsh_index
+    from app.services.profile_fields import derive_profile_fields
+    from app.services.search_engine import embedding_text
+    from app.services.skill_index import rebuild_skill_index
+
+    engine.initialize()
+    conn = sqlite3.connect(engine.db_path)
+    try:
+        c = conn.cursor()
+        loaded = 0
+        batch: List[Dict[str, Any]] = []
+
+        def flush() -> None:
+            vectors = np.atleast_2d(engine.model.encode([embedding_text(r) for r in batch]))
+            rows = []
+            for resume, vector in zip(batch, vectors):
+                profile = derive_profile_fields(resume["experience"], resume["contact"])
+                rows.append((
+                    resume["name"], json.dumps(resume["skills"]), resume["experience"], resume["education"],
+                    json.dumps(resume["contact"]), resume["summary"], json.dumps(vector.tolist()),
+                    resume["created_at"], profile["experience_years"], profile["city"], profile["country"]
+                ))
+            c.executemany("""
+                INSERT INTO resumes (name, skills, experience, education, contact, summary, embedding,
+                                     created_at, experience_years, city, country, row_version)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+            """, rows)
+            conn.commit()
+
+        for resume in generate_resumes(n, seed):
+            batch.append(resume)
+            if len(batch) == batch_size:
+                flush()
+                loaded += len(batch)
+                batch = []
+                if progress:
+                    progress(loaded)
+        if batch:
+            flush()
+            loaded += len(batch)
+
+        rebuild_aggregates(conn)
+        rebuild_skill_index(conn)
+        rebuild_lsh_index(conn, flag=False)
+        conn.commit()
+        return loaded
+    finally:
+        conn.close()
@@ -0,0 +1,251 @@
+"""Benchmarks of one corpus size, run in a scratch working directory.
+
+The app keeps its database at the relative path data/resumes.db, so this
+module is run by the `python -m benchmarks` driver as a subprocess whose
+working directory is a fresh scratch directory: the corpus is generated there
+and the repository's own database is never opened. It can also be run by hand
+from an empty directory (with the repository on PYTHONPATH):
+
+    python -m benchmarks.suite --size 1000 --output result.json
+
+The LLM is replaced by a stub at the Groq client level (so call_groq, its
+telemetry and the response parsing still run); STUB_LLM_LATENCY_MS adds a
+fixed delay to every stubbed call.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .corpus import HashingEncoder, generate_resume, load_corpus, resume_text, search_queries
+
+# Defaults for a quiet, self-contained run; set before the app is imported
+BENCHMARK_ENVIRONMENT = {
+    "ENABLE_RERANKER": "0",
+    "WARM_UP_ON_STARTUP": "0",
+    "TALENT_INSIGHTS_INTERVAL_SECONDS": "0",
+    "LOG_LEVEL": "WARNING",
+    "GROQ_API_KEY": "benchmark-stub",
+}
+
+
+# -- LLM stub -----------------------------------------------------------------
+
+class _StubCompletions:
+    """Answers the resume parser prompt from the resume text it contains; anything else gets a canned reply."""
+
+    def create(self, messages, stream=False, **kwargs):
+        delay = float(os.getenv("STUB_LLM_LATENCY_MS", "0")) / 1000
+        if delay:
+            time.sleep(delay)
+        prompt = messages[0]["content"]
+        content = self._parse_reply(prompt) if "Resume text:" in prompt else "1. Stub analysis"
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4)
+        if stream:
+            return iter([
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))], x_groq=None),
+                SimpleNamespace(choices=[], x_groq=SimpleNamespace(usage=usage)),
+            ])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    @staticmethod
+    def _parse_reply(prompt: str) -> str:
+        text = prompt.split("Resume text:", 1)[1]
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+
+        def section(title: str) -> str:
+            return lines[lines.index(title) + 1] if title in lines[:-1] else ""
+
+        contact = (lines[1] if len(lines) > 1 else "").split(" | ")
+        return json.dumps({
+            "name": lines[0] if lines else "",
+            "skills": [s.strip() for s in section("SKILLS").split(",") if s.strip()],
+            "experience": section("EXPERIENCE"),
+            "education": section("EDUCATION"),
+            "contact": {
+                "email": contact[0] if contact else "",
+                "phone": contact[1] if len(contact) > 1 else "",
+                "location": contact[2] if len(contact) > 2 else "",
+            },
+            "summary": section("SUMMARY"),
+        })
+
+
+class StubGroq:
+    def __init__(self, **kwargs):
+        self.chat = SimpleNamespace(completions=_StubCompletions())
+
+
+def resume_pdf(resume: Dict[str, Any]) -> bytes:
+    """A one-page PDF of a resume, for the upload benchmark."""
+    import fitz  # PyMuPDF
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_textbox(fitz.Rect(50, 50, 545, 790), resume_text(resume), fontsize=10)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+# -- measurement ----------------------------------------------------------------
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency statistics (milliseconds) of per-operation timings in seconds."""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {
+        "iterations": len(ordered),
+        "mean_ms": round(1000 * total / len(ordered), 3),
+        "p50_ms": round(1000 * _percentile(ordered, 50), 3),
+        "p95_ms": round(1000 * _percentile(ordered, 95), 3),
+        "p99_ms": round(1000 * _percentile(ordered, 99), 3),
+        "ops_per_sec": round(len(ordered) / total, 2) if total else None,
+    }
+
+
+def timed(operations: Sequence[Callable[[], Any]], warmup: Sequence[Callable[[], Any]] = ()) -> List[float]:
+    """Run the `warmup` operations untimed, then time each of `operations` once."""
+    for operation in warmup:
+        operation()
+    samples = []
+    for operation in operations:
+        started = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+# -- benchmarks ----------------------------------------------------------------
+# Each takes the context built by run_size() and the iteration count, and
+# returns per-operation timings in seconds.
+
+def bench_semantic_search(ctx, iterations: int) -> List[float]:
+    engine = ctx.engine
+    searches = [
+        (lambda q=q: engine.semantic_search(q, top_k=10, rerank=False))
+        for q in search_queries(iterations, ctx.seed)
+    ]
+    return timed(searches, warmup=searches[:3])
+
+
+def bench_dashboard_metrics(ctx, iterations: int) -> List[float]:
+    request = lambda: ctx.client.get("/api/search/dashboard-metrics").raise_for_status()
+    return timed([request] * iterations, warmup=[request])
+
+
+def bench_all_listing(ctx, iterations: int) -> List[float]:
+    """Walk /all/ one page of 100 at a time, following X-Next-Cursor (wrapping at the end)."""
+    cursor = {"value": None}
+
+    def page():
+        params = {"limit": 100}
+        if cursor["value"] is not None:
+            params["cursor"] = cursor["value"]
+        response = ctx.client.get("/api/search/all/", params=params)
+        response.raise_for_status()
+        cursor["value"] = response.headers.get("X-Next-Cursor")
+
+    return timed([page] * iterations, warmup=[page])
+
+
+def bench_all_listing_filtered(ctx, iterations: int) -> List[float]:
+    params = {"limit": 100, "skills": ["Python", "SQL"], "skill_mode": "all", "min_experience": 3,
+              "fields": "id,name,skills,experience_years,city"}
+    request = lambda: ctx.client.get("/api/search/all/", params=params).raise_for_status()
+    return timed([request] * iterations, warmup=[request])
+
+
+def bench_store_resume(ctx, iterations: int) -> List[float]:
+    engine = ctx.engine
+    # New resumes past the end of the corpus, so every timed call is an insert
+    stores = [
+        (lambda i=i: engine.store_resume(generate_resume(i, ctx.seed)))
+        for i in range(ctx.size, ctx.size + iterations + 3)
+    ]
+    return timed(stores[3:], warmup=stores[:3])
+
+
+def bench_upload(ctx, iterations: int) -> List[float]:
+    """POST /api/resume/upload/: PDF text extraction, (stubbed) LLM parse and the SQLAlchemy insert."""
+    offset = ctx.size + 10 * iterations + 1000
+    files = [(f"resume_{i}.pdf", resume_pdf(generate_resume(i, ctx.seed)))
+             for i in range(offset, offset + iterations + 1)]
+
+    def upload(name, data):
+        response = ctx.client.post("/api/resume/upload/", files={"file": (name, io.BytesIO(data), "application/pdf")})
+        response.raise_for_status()
+
+    uploads = [(lambda name=name, data=data: upload(name, data)) for name, data in files]
+    return timed(uploads[1:], warmup=uploads[:1])
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    "semantic_search": bench_semantic_search,
+    "dashboard_metrics": bench_dashboard_metrics,
+    "all_listing": bench_all_listing,
+    "all_listing_filtered": bench_all_listing_filtered,
+    # Writers last: they grow the corpus the readers measure
+    "store_resume": bench_store_resume,
+    "upload": bench_upload,
+}
+
+
+def run_size(size: int, seed: int = 0, iterations: int = 50, encoder: str = "hash",
+             only: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Generate a corpus of `size` resumes in ./data and run the benchmarks against it."""
+    for key, value in BENCHMARK_ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+    os.makedirs("data", exist_ok=True)
+
+    # Imported only now, inside the scratch directory
+    from fastapi.testclient import TestClient
+    import app.services.llm_utils as llm_utils
+    from app.main import app
+    from app.routes import search
+
+    llm_utils.Groq = StubGroq
+    engine = search.search_engine
+    if encoder == "hash":
+        engine._model = HashingEncoder()
+
+    started = time.perf_counter()
+    load_corpus(engine, size, seed)
+    load_seconds = time.perf_counter() - started
+    engine.warm_up()
+
+    results = {}
+    with TestClient(app) as client:
+        ctx = SimpleNamespace(engine=engine, client=client, size=size, seed=seed)
+        for name, bench in BENCHMARKS.items():
+            if only and name not in only:
+                continue
+            results[name] = summarize(bench(ctx, iterations))
+    return {"size": size, "load_seconds": round(load_seconds, 2), "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the benchmarks for one corpus size in the current directory.")
+    parser.add_argument("--size", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--encoder", choices=["hash", "model"], default="hash")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS))
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    if os.path.exists(os.path.join("data", "resumes.db")):
+        sys.exit("Refusing to run: data/resumes.db exists in the working directory; use an empty directory")
+    result = run_size(args.size, args.seed, args.iterations, args.encoder, args.only)
+    result["python"] = platform.python_version()
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
@@ -0,0 +1,66 @@
+"""Near-duplicate detection on the PDF upload path (POST /api/resume/upload/).
+
+Runs the app in a scratch directory with the benchmark suite's Groq stub and
+hashing encoder, so no model or network is needed:
+
+    python -m pytest tests
+"""
+import io
+import os
+import sqlite3
+
+import pytest
+
+from benchmarks.corpus import HashingEncoder, generate_resume
+from benchmarks.suite import BENCHMARK_ENVIRONMENT, StubGroq, resume_pdf
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # The app keeps its database at data/resumes.db relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    for key, value in BENCHMARK_ENVIRONMENT.items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.setenv("DEDUP_MODE", "flag")
+
+    from fastapi.testclient import TestClient
+    import app.services.llm_utils as llm_utils
+    from app.main import app
+    from app.routes import search
+
+    monkeypatch.setattr(llm_utils, "Groq", StubGroq)
+    monkeypatch.setattr(search.search_engine, "_model", HashingEncoder())
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def upload(client, filename, resume):
+    return client.post(
+        "/api/resume/upload/",
+        files={"file": (filename, io.BytesIO(resume_pdf(resume)), "application/pdf")}
+    )
+
+
+def test_near_identical_uploads_are_flagged_at_ingest(client):
+    original = generate_resume(0, seed=0)
+    # The same CV re-submitted under another name with a new phone number
+    resubmitted = {**original, "name": original["name"] + " Jr",
+                   "contact": {**original["contact"], "phone": "+1 555 0100"}}
+
+    assert upload(client, "original.pdf", original).status_code == 200
+    assert upload(client, "resubmitted.pdf", resubmitted).status_code == 200
+
+    conn = sqlite3.connect(os.path.join("data", "resumes.db"))
+    try:
+        rows = conn.execute("SELECT id, name, duplicate_of FROM resumes ORDER BY id").fetchall()
+        indexed = {row[0] for row in conn.execute("SELECT DISTINCT resume_id FROM lsh_buckets")}
+    finally:
+        conn.close()
+
+    (first_id, first_name, first_duplicate_of), (second_id, second_name, second_duplicate_of) = rows
+    assert (first_name, second_name) == (original["name"], resubmitted["name"])
+    assert first_duplicate_of is None
+    assert second_duplicate_of == first_id
+    # Both are in the LSH index, so later uploads are matched against them too
+    assert indexed == {first_id, second_id}